@@ -62,6 +62,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.instrumentation.PerformanceMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -166,8 +167,36 @@ STATICFILES_DIRS = [BASE_DIR / 'static']
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Tamaño máximo de los archivos subidos por agentes y bridge (bytes); se corta la subida al superarlo
+MEDIA_UPLOAD_MAX_SIZE = int(os.environ.get('MEDIA_UPLOAD_MAX_SIZE', str(50 * 1024 * 1024)))
+
+# Lado mayor (px) de las miniaturas de imágenes y videos del chat
+MEDIA_THUMBNAIL_SIZE = int(os.environ.get('MEDIA_THUMBNAIL_SIZE', '320'))
+
+# Entrega de archivos de media por el servidor web tras comprobar permisos:
+#   '' (Django los sirve, con Range), 'x-accel' (nginx, location interna MEDIA_ACCEL_PREFIX) o 'x-sendfile'
+MEDIA_ACCEL_REDIRECT = os.environ.get('MEDIA_ACCEL_REDIRECT', '')
+MEDIA_ACCEL_PREFIX = os.environ.get('MEDIA_ACCEL_PREFIX', '/protected-media/')
+# Validez (segundos) de las URLs firmadas con las que el bridge descarga archivos
+MEDIA_SIGNED_URL_TTL = int(os.environ.get('MEDIA_SIGNED_URL_TTL', '3600'))
+
+# Retención de multimedia (media_gc): días tras los que los mensajes de cada tipo pierden el archivo
+# (0 = sin límite) y tamaño mínimo en bytes para aplicarla (p. ej. solo videos grandes)
+MEDIA_RETENTION = {
+    message_type: {
+        'days': int(os.environ.get(f'MEDIA_RETENTION_{message_type.upper()}_DAYS', '0')),
+        'min_size': int(os.environ.get(f'MEDIA_RETENTION_{message_type.upper()}_MIN_SIZE', '0')),
+    }
+    for message_type in ('image', 'video', 'audio', 'document')
+}
+# Horas que se conserva un archivo sin mensajes antes de considerarlo huérfano
+MEDIA_GC_GRACE_HOURS = int(os.environ.get('MEDIA_GC_GRACE_HOURS', '24'))
+
+# Días que una conversación cerrada conserva sus mensajes en la tabla caliente (archive_conversations)
+ARCHIVE_AFTER_DAYS = int(os.environ.get('ARCHIVE_AFTER_DAYS', '90'))
+
 # Configuración específica para red local
-MEDIA_DOMAIN = 'http://192.168.1.176:8000'  # Dominio base para archivos multimedia en red local
+MEDIA_DOMAIN = os.environ.get('MEDIA_DOMAIN', 'http://192.168.1.176:8000')  # Dominio base para archivos multimedia en red local
 
 
 # Default primary key field type
@@ -204,6 +233,22 @@ CHANNEL_LAYERS = {
     },
 }
 
+# Caché compartida entre procesos (estado del bridge de WhatsApp, etc.)
+# USE_LOCMEM_CACHE=1 usa memoria local (solo desarrollo con un único proceso)
+if os.environ.get('USE_LOCMEM_CACHE') == '1':
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        },
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': f"redis://{os.environ.get('REDIS_HOST', '127.0.0.1')}:6379/1",
+        },
+    }
+
 
 # Session Settings
 SESSION_COOKIE_AGE = 86400  # 24 hours
@@ -251,3 +296,81 @@ GOOGLE_OAUTH2_REDIRECT_URIS = [
     'https://8000-isd3q9b53rtrwh3wsth2s-29d03aeb.manusvm.computer/auth/google/callback/',
 ]
 
+
+# WhatsApp bridge (Baileys)
+WHATSAPP_BRIDGE_URL = os.environ.get('WHATSAPP_BRIDGE_URL', 'http://localhost:3000')
+WHATSAPP_BRIDGE_CONNECT_TIMEOUT = float(os.environ.get('WHATSAPP_BRIDGE_CONNECT_TIMEOUT', '3'))
+WHATSAPP_BRIDGE_RETRIES = int(os.environ.get('WHATSAPP_BRIDGE_RETRIES', '2'))
+WHATSAPP_BRIDGE_BACKOFF = float(os.environ.get('WHATSAPP_BRIDGE_BACKOFF', '0.3'))
+WHATSAPP_BRIDGE_POOL_SIZE = int(os.environ.get('WHATSAPP_BRIDGE_POOL_SIZE', '10'))
+# Cómo recibe el bridge los archivos salientes:
+#   'stream': Django envía el archivo por chunks en el cuerpo de la petición (por defecto)
+#   'path':   el bridge lo lee del MEDIA_ROOT compartido (SHARED_MEDIA_ROOT en el bridge)
+#   'url':    el bridge lo descarga de MEDIA_DOMAIN + MEDIA_URL
+WHATSAPP_MEDIA_HANDOFF = os.environ.get('WHATSAPP_MEDIA_HANDOFF', 'stream')
+WHATSAPP_MEDIA_STREAM_TIMEOUT = int(os.environ.get('WHATSAPP_MEDIA_STREAM_TIMEOUT', '120'))
+# Segundos que el estado del bridge (callbacks / bridge_heartbeat) se considera vigente
+BRIDGE_STATUS_TTL = int(os.environ.get('BRIDGE_STATUS_TTL', '30'))
+# Secreto que el bridge envía en X-Bridge-Secret en sus callbacks de estado (BRIDGE_CALLBACK_SECRET en el bridge)
+WHATSAPP_BRIDGE_CALLBACK_SECRET = os.environ.get('WHATSAPP_BRIDGE_CALLBACK_SECRET', '')
+
+# APIs externas (Telegram, Facebook): timeouts en segundos, pool y concurrencia de los lotes
+EXTERNAL_API_TIMEOUT = float(os.environ.get('EXTERNAL_API_TIMEOUT', '10'))
+EXTERNAL_API_CONNECT_TIMEOUT = float(os.environ.get('EXTERNAL_API_CONNECT_TIMEOUT', '3'))
+EXTERNAL_API_RETRIES = int(os.environ.get('EXTERNAL_API_RETRIES', '2'))
+EXTERNAL_API_POOL_SIZE = int(os.environ.get('EXTERNAL_API_POOL_SIZE', '10'))
+EXTERNAL_API_CONCURRENCY = int(os.environ.get('EXTERNAL_API_CONCURRENCY', '8'))
+
+# Segundos que un perfil de Facebook en caché se considera vigente (después se revalida en segundo plano)
+FACEBOOK_PROFILE_TTL = int(os.environ.get('FACEBOOK_PROFILE_TTL', str(24 * 3600)))
+# Segundos sin volver a consultar un perfil cuya consulta falló
+FACEBOOK_PROFILE_FAILURE_TTL = int(os.environ.get('FACEBOOK_PROFILE_FAILURE_TTL', '300'))
+
+# Base de la Bot API de Telegram (se puede apuntar a un servidor local o de pruebas)
+TELEGRAM_API_BASE = os.environ.get('TELEGRAM_API_BASE', 'https://api.telegram.org').rstrip('/')
+
+# Archivos de Telegram: segundos que se cachea la URL de descarga (Telegram la garantiza ~1 hora)
+# y si se transmiten por Django (True, no expone el token del bot) o se redirige a Telegram
+TELEGRAM_FILE_URL_TTL = int(os.environ.get('TELEGRAM_FILE_URL_TTL', '3000'))
+TELEGRAM_MEDIA_PROXY = os.environ.get('TELEGRAM_MEDIA_PROXY', 'True') == 'True'
+
+# Outbox de mensajes salientes (core.services.outbox_service)
+OUTBOX_MAX_ATTEMPTS = int(os.environ.get('OUTBOX_MAX_ATTEMPTS', '5'))
+OUTBOX_RETRY_BASE_SECONDS = int(os.environ.get('OUTBOX_RETRY_BASE_SECONDS', '5'))
+OUTBOX_LEASE_SECONDS = int(os.environ.get('OUTBOX_LEASE_SECONDS', '90'))
+# Intentar la entrega en un hilo justo después de encolar (además del worker process_outbox)
+OUTBOX_INLINE_DELIVERY = os.environ.get('OUTBOX_INLINE_DELIVERY', 'True') == 'True'
+
+# Campañas: límite por canal {'whatsapp': {'rate': msg/segundo, 'burst': ráfaga}}
+# (valores por defecto en core.services.campaign_service.DEFAULT_RATE_LIMITS)
+CAMPAIGN_RATE_LIMITS = {}
+if os.environ.get('CAMPAIGN_WHATSAPP_RATE'):
+    CAMPAIGN_RATE_LIMITS['whatsapp'] = {'rate': float(os.environ['CAMPAIGN_WHATSAPP_RATE'])}
+
+# Máximo de contactos por petición en /api/templates/<id>/render/
+TEMPLATE_RENDER_MAX_CONTACTS = int(os.environ.get('TEMPLATE_RENDER_MAX_CONTACTS', '5000'))
+
+# Segundos que se cachean las filas de Platform en cada proceso
+PLATFORM_REGISTRY_TTL = int(os.environ.get('PLATFORM_REGISTRY_TTL', '300'))
+
+# Enrutamiento de mensajes a departamentos (RoutingRule): segundos que se cachea la
+# tabla compilada en cada proceso y departamento cuando ninguna regla coincide
+ROUTING_TABLE_TTL = int(os.environ.get('ROUTING_TABLE_TTL', '300'))
+ROUTING_DEFAULT_DEPARTMENT = os.environ.get('ROUTING_DEFAULT_DEPARTMENT', 'support')
+
+# Asignación automática de conversaciones nuevas por departamento:
+# 'round_robin', 'least_loaded' o vacío (asignación manual)
+AUTO_ASSIGN_STRATEGIES = {
+    'sales': os.environ.get('AUTO_ASSIGN_SALES', ''),
+    'support': os.environ.get('AUTO_ASSIGN_SUPPORT', ''),
+}
+# Máximo de conversaciones abiertas por agente para recibir nuevas (0 = sin límite)
+AUTO_ASSIGN_MAX_OPEN = int(os.environ.get('AUTO_ASSIGN_MAX_OPEN', '0'))
+
+# Segundos que se cachea en cada proceso el autómata de reglas de etapa (StageRule)
+STAGE_RULES_TTL = int(os.environ.get('STAGE_RULES_TTL', '300'))
+
+
+# Instrumentación de rendimiento (core.instrumentation)
+# Número de requests más lentas que se conservan en memoria por proceso
+PERF_SLOW_REQUESTS_SIZE = int(os.environ.get('PERF_SLOW_REQUESTS_SIZE', '50'))
@@ -11,8 +11,7 @@ urlpatterns = [
     path('', include('core.urls')),
 ]
 
-# Servir archivos media en desarrollo
+# Servir archivos estáticos en desarrollo (los de media los sirve core.media_views)
 if settings.DEBUG:
-    urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
     urlpatterns += static(settings.STATIC_URL, document_root=settings.STATIC_ROOT)
 
@@ -2,7 +2,8 @@ from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
 from .models import (
     User, Platform, Contact, Lead, Conversation, 
-    Message, Template, Reminder, ActivityLog, APIConfiguration, RecoveryCase
+    Message, Template, Reminder, ActivityLog, APIConfiguration, RecoveryCase,
+    Campaign, CampaignRecipient, ScheduledMessage, MediaBlob, RoutingRule, StageRule, AgentLoad, ArchivedMessage
 )
 
 
@@ -49,8 +50,8 @@ class LeadAdmin(admin.ModelAdmin):
 
 @admin.register(Conversation)
 class ConversationAdmin(admin.ModelAdmin):
-    list_display = ['id', 'contact', 'status', 'funnel_type', 'funnel_stage', 'assigned_to', 'is_answered', 'created_at']
-    list_filter = ['status', 'funnel_type', 'funnel_stage', 'is_answered', 'created_at']
+    list_display = ['id', 'contact', 'status', 'department', 'funnel_type', 'funnel_stage', 'assigned_to', 'is_answered', 'archived_at', 'created_at']
+    list_filter = ['status', 'department', 'funnel_type', 'funnel_stage', 'is_answered', 'created_at']
     search_fields = ['contact__name']
     date_hierarchy = 'created_at'
     raw_id_fields = ['contact', 'assigned_to', 'lead']
@@ -140,3 +141,72 @@ class RecoveryCaseAdmin(admin.ModelAdmin):
     
     readonly_fields = ['created_at', 'updated_at']
 
+
+@admin.register(Campaign)
+class CampaignAdmin(admin.ModelAdmin):
+    list_display = ['id', 'name', 'template', 'status', 'total_recipients', 'created_by', 'created_at']
+    list_filter = ['status', 'created_at']
+    search_fields = ['name']
+    raw_id_fields = ['template', 'created_by']
+
+
+@admin.register(CampaignRecipient)
+class CampaignRecipientAdmin(admin.ModelAdmin):
+    list_display = ['id', 'campaign', 'contact', 'status', 'message', 'updated_at']
+    list_filter = ['status']
+    raw_id_fields = ['campaign', 'contact', 'message']
+
+
+@admin.register(ScheduledMessage)
+class ScheduledMessageAdmin(admin.ModelAdmin):
+    list_display = ['id', 'conversation', 'send_at', 'status', 'recovery_case', 'created_by', 'message']
+    list_filter = ['status', 'send_at']
+    search_fields = ['content']
+    raw_id_fields = ['conversation', 'recovery_case', 'created_by', 'message']
+
+
+@admin.register(MediaBlob)
+class MediaBlobAdmin(admin.ModelAdmin):
+    list_display = ['sha256', 'original_name', 'content_type', 'size', 'ref_count', 'derivatives_status', 'created_at']
+    list_filter = ['content_type', 'derivatives_status']
+    search_fields = ['sha256', 'original_name']
+    readonly_fields = ['sha256', 'path', 'size', 'ref_count', 'created_at', 'last_referenced_at',
+                       'thumbnail_path', 'width', 'height', 'derivatives_updated_at']
+    exclude = ['placeholder']
+
+
+@admin.register(RoutingRule)
+class RoutingRuleAdmin(admin.ModelAdmin):
+    list_display = ['name', 'phone_number', 'keyword', 'country', 'department', 'priority', 'is_active']
+    list_filter = ['department', 'is_active']
+    list_editable = ['priority', 'is_active']
+    search_fields = ['name', 'phone_number', 'keyword']
+
+
+@admin.register(StageRule)
+class StageRuleAdmin(admin.ModelAdmin):
+    list_display = ['name', 'funnel_type', 'target_stage', 'direction', 'mode', 'priority', 'is_active']
+    list_filter = ['funnel_type', 'mode', 'direction', 'is_active']
+    list_editable = ['priority', 'is_active']
+    search_fields = ['name', 'phrases']
+
+
+@admin.register(AgentLoad)
+class AgentLoadAdmin(admin.ModelAdmin):
+    list_display = ['user', 'department', 'is_available', 'open_conversations', 'last_assigned_at']
+    list_filter = ['department', 'is_available']
+    readonly_fields = ['user', 'department', 'is_available', 'open_conversations', 'last_assigned_at']
+
+
+@admin.register(ArchivedMessage)
+class ArchivedMessageAdmin(admin.ModelAdmin):
+    list_display = ['id', 'conversation', 'sender_type', 'message_type', 'content', 'created_at']
+    list_filter = ['sender_type', 'message_type']
+    search_fields = ['content', 'platform_message_id']
+    raw_id_fields = ['conversation', 'sender_user', 'media_blob']
+    
+    def has_add_permission(self, request):
+        return False
+    
+    def has_change_permission(self, request, obj=None):
+        return False
@@ -0,0 +1,33 @@
+from django.http import JsonResponse
+from django.views.decorators.http import require_http_methods
+from .decorators import admin_required
+from .services.archive_service import search_archive
+
+
+@admin_required
+@require_http_methods(["GET"])
+def api_search_archive(request):
+    """
+    API para buscar texto en los mensajes archivados
+
+    Query params: q (mínimo 3 caracteres), conversation_id (opcional), limit (máximo 200)
+    """
+    query = request.GET.get('q', '').strip()
+    if len(query) < 3:
+        return JsonResponse({'success': False, 'error': 'La búsqueda necesita al menos 3 caracteres'}, status=400)
+    try:
+        conversation_id = int(request.GET['conversation_id']) if request.GET.get('conversation_id') else None
+        limit = min(int(request.GET.get('limit', 50)), 200)
+    except ValueError:
+        return JsonResponse({'success': False, 'error': 'conversation_id y limit deben ser números'}, status=400)
+
+    results = [{
+        'id': message.id,
+        'conversation_id': message.conversation_id,
+        'contact': message.conversation.contact.display_name,
+        'sender_type': message.sender_type,
+        'message_type': message.message_type,
+        'content': message.content,
+        'created_at': message.created_at.isoformat(),
+    } for message in search_archive(query, conversation_id=conversation_id, limit=limit)]
+    return JsonResponse({'success': True, 'results': results})
@@ -0,0 +1,108 @@
+from django.http import JsonResponse
+from django.contrib.auth.decorators import login_required
+from django.shortcuts import get_object_or_404
+from django.views.decorators.http import require_http_methods
+from .decorators import admin_required
+from .models import Campaign, Template, ActivityLog
+from .services.campaign_service import (
+    CampaignError, build_segment_queryset, campaign_stats, set_campaign_status, start_campaign
+)
+import json
+
+
+def _campaign_data(campaign):
+    return {
+        'id': campaign.id,
+        'name': campaign.name,
+        'template_id': campaign.template_id,
+        'segment': campaign.segment,
+        'status': campaign.status,
+        'total_recipients': campaign.total_recipients,
+        'created_at': campaign.created_at.isoformat(),
+        'started_at': campaign.started_at.isoformat() if campaign.started_at else None,
+        'completed_at': campaign.completed_at.isoformat() if campaign.completed_at else None,
+    }
+
+
+@login_required
+@admin_required
+@require_http_methods(["GET"])
+def api_campaigns(request):
+    """API para listar campañas"""
+    campaigns = Campaign.objects.all()[:100]
+    return JsonResponse({'success': True, 'campaigns': [_campaign_data(c) for c in campaigns]})
+
+
+@login_required
+@admin_required
+@require_http_methods(["POST"])
+def api_create_campaign(request):
+    """
+    API para crear una campaña en borrador
+
+    Body JSON: name, template_id, segment (platform, department, funnel_stage,
+    country, active_within_days, inactive_for_days)
+    """
+    try:
+        data = json.loads(request.body)
+    except json.JSONDecodeError:
+        return JsonResponse({'success': False, 'error': 'JSON inválido'}, status=400)
+
+    if not data.get('name') or not data.get('template_id'):
+        return JsonResponse({'success': False, 'error': 'name y template_id son obligatorios'}, status=400)
+
+    template = get_object_or_404(Template, id=data['template_id'], is_active=True)
+    segment = data.get('segment') or {}
+
+    try:
+        audience = build_segment_queryset(segment).count()
+    except CampaignError as e:
+        return JsonResponse({'success': False, 'error': str(e)}, status=400)
+
+    campaign = Campaign.objects.create(
+        name=data['name'],
+        template=template,
+        segment=segment,
+        created_by=request.user,
+    )
+
+    return JsonResponse({'success': True, 'campaign': _campaign_data(campaign), 'audience': audience})
+
+
+@login_required
+@admin_required
+@require_http_methods(["GET"])
+def api_campaign_detail(request, campaign_id):
+    """API para consultar el estado y progreso de una campaña"""
+    campaign = get_object_or_404(Campaign, id=campaign_id)
+    return JsonResponse({'success': True, 'campaign': _campaign_data(campaign), 'stats': campaign_stats(campaign)})
+
+
+@login_required
+@admin_required
+@require_http_methods(["POST"])
+def api_campaign_action(request, campaign_id, action):
+    """API para iniciar, pausar, reanudar o cancelar una campaña"""
+    campaign = get_object_or_404(Campaign, id=campaign_id)
+
+    try:
+        if action == 'start':
+            start_campaign(campaign)
+        elif action == 'pause':
+            set_campaign_status(campaign, 'paused')
+        elif action == 'resume':
+            set_campaign_status(campaign, 'running')
+        elif action == 'cancel':
+            set_campaign_status(campaign, 'cancelled')
+        else:
+            return JsonResponse({'success': False, 'error': f'Acción no válida: {action}'}, status=400)
+    except CampaignError as e:
+        return JsonResponse({'success': False, 'error': str(e)}, status=400)
+
+    ActivityLog.objects.create(
+        user=request.user,
+        action=f'campaign_{action}',
+        description=f'Campaña "{campaign.name}" ({campaign.id}): {action}'
+    )
+
+    return JsonResponse({'success': True, 'campaign': _campaign_data(campaign)})
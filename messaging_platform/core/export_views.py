@@ -0,0 +1,42 @@
+from django.http import JsonResponse, StreamingHttpResponse
+from django.contrib.auth.decorators import login_required
+from django.views.decorators.http import require_http_methods
+from django.utils import timezone
+from .decorators import admin_required
+from .services.export_service import stream_export, ExportError
+
+
+EXPORT_CONTENT_TYPES = {
+    'csv': 'text/csv; charset=utf-8',
+    'ndjson': 'application/x-ndjson; charset=utf-8',
+}
+
+
+@login_required
+@admin_required
+@require_http_methods(["GET"])
+def export_data_view(request, dataset):
+    """
+    Exportación en streaming de conversaciones, mensajes o leads
+
+    Parámetros GET: format (csv|ndjson), from, to (YYYY-MM-DD), department, platform
+    """
+    export_format = request.GET.get('format', 'csv')
+    filters = {
+        'date_from': request.GET.get('from'),
+        'date_to': request.GET.get('to'),
+        'department': request.GET.get('department'),
+        'platform': request.GET.get('platform'),
+    }
+
+    try:
+        content = stream_export(dataset, export_format, **filters)
+    except ExportError as e:
+        return JsonResponse({'success': False, 'error': str(e)}, status=400)
+
+    filename = f"{dataset}_{timezone.now().strftime('%Y%m%d_%H%M%S')}.{export_format}"
+    response = StreamingHttpResponse(content, content_type=EXPORT_CONTENT_TYPES[export_format])
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    # Evitar que proxies intermedios acumulen la respuesta completa
+    response['X-Accel-Buffering'] = 'no'
+    return response
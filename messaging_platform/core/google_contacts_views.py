@@ -21,6 +21,7 @@ os.environ['OAUTHLIB_INSECURE_TRANSPORT'] = '1'
 
 from .models import GoogleContactsAuth, Contact
 from .services.google_contacts_service import GoogleContactsService
+from .instrumentation import outbound_call
 
 
 @login_required
@@ -147,7 +148,8 @@ def google_auth_callback(request):
         }
         
         print("🔍 DEBUG CALLBACK - Haciendo request manual para tokens...")
-        response = requests.post(token_url, data=data)
+        with outbound_call('google'):
+            response = requests.post(token_url, data=data)
         
         if response.status_code != 200:
             raise Exception(f"Error obteniendo tokens: {response.text}")
@@ -0,0 +1,154 @@
+"""
+Instrumentación de rendimiento por request
+
+Registra por cada request el número y tiempo de consultas SQL, el tiempo
+de Python y el tiempo en llamadas HTTP salientes (bridge, Google, Telegram,
+Facebook). Emite la cabecera Server-Timing y conserva en memoria las
+requests más lentas para consultarlas desde el panel de administración.
+"""
+import contextvars
+import heapq
+import itertools
+import threading
+import time
+from contextlib import ExitStack, contextmanager
+
+from django.conf import settings
+from django.db import connections
+from django.utils import timezone
+
+
+_current_metrics = contextvars.ContextVar('request_metrics', default=None)
+
+
+class RequestMetrics:
+    """Acumulador de tiempos de una request"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.sql_count = 0
+        self.sql_time = 0.0
+        self.outbound = {}  # servicio -> [llamadas, segundos]
+
+    def add_outbound(self, service, seconds):
+        entry = self.outbound.setdefault(service, [0, 0.0])
+        entry[0] += 1
+        entry[1] += seconds
+
+    @property
+    def outbound_time(self):
+        return sum(seconds for _, seconds in self.outbound.values())
+
+
+@contextmanager
+def outbound_call(service):
+    """
+    Mide una llamada HTTP saliente y la suma a la request en curso.
+    Fuera de una request (comandos, hilos) no registra nada.
+    """
+    metrics = _current_metrics.get()
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        if metrics is not None:
+            metrics.add_outbound(service, time.perf_counter() - started)
+
+
+def _sql_timer(metrics):
+    def wrapper(execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            metrics.sql_count += 1
+            metrics.sql_time += time.perf_counter() - started
+    return wrapper
+
+
+class SlowRequestLog:
+    """Conserva las N requests más lentas (min-heap acotado, thread-safe)"""
+
+    def __init__(self, size):
+        self.size = size
+        self._heap = []
+        self._counter = itertools.count()
+        self._lock = threading.Lock()
+
+    def record(self, entry):
+        item = (entry['total_ms'], next(self._counter), entry)
+        with self._lock:
+            if len(self._heap) < self.size:
+                heapq.heappush(self._heap, item)
+            elif item[0] > self._heap[0][0]:
+                heapq.heapreplace(self._heap, item)
+
+    def slowest(self, limit=None):
+        with self._lock:
+            entries = [entry for _, _, entry in sorted(self._heap, reverse=True)]
+        return entries[:limit] if limit else entries
+
+    def clear(self):
+        with self._lock:
+            self._heap = []
+
+
+slow_requests = SlowRequestLog(getattr(settings, 'PERF_SLOW_REQUESTS_SIZE', 50))
+
+
+def _ms(seconds):
+    return round(seconds * 1000, 2)
+
+
+class PerformanceMiddleware:
+    """
+    Mide cada request y añade la cabecera Server-Timing (solo para staff o con DEBUG).
+    En respuestas en streaming solo se mide hasta que la vista devuelve el iterador.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        metrics = RequestMetrics()
+        token = _current_metrics.set(metrics)
+        try:
+            with ExitStack() as stack:
+                for conn in connections.all():
+                    stack.enter_context(conn.execute_wrapper(_sql_timer(metrics)))
+                response = self.get_response(request)
+        finally:
+            _current_metrics.reset(token)
+
+        total = time.perf_counter() - metrics.started
+        python_time = max(total - metrics.sql_time - metrics.outbound_time, 0.0)
+
+        timings = [
+            f'db;dur={_ms(metrics.sql_time)};desc="SQL x{metrics.sql_count}"',
+            *(f'{service};dur={_ms(seconds)};desc="{calls} llamada(s)"'
+              for service, (calls, seconds) in metrics.outbound.items()),
+            f'app;dur={_ms(python_time)}',
+            f'total;dur={_ms(total)}',
+        ]
+        # Solo el usuario que ya cargó la vista: leer request.user costaría una consulta de sesión
+        user = getattr(request, '_cached_user', None)
+        # Los tiempos internos no se exponen a cualquier cliente
+        if settings.DEBUG or (user is not None and user.is_staff):
+            response['Server-Timing'] = ', '.join(timings)
+
+        slow_requests.record({
+            'timestamp': timezone.now().isoformat(),
+            'method': request.method,
+            'path': request.get_full_path(),
+            'status': response.status_code,
+            'user': user.username if user is not None and user.is_authenticated else None,
+            'total_ms': _ms(total),
+            'python_ms': _ms(python_time),
+            'sql_count': metrics.sql_count,
+            'sql_ms': _ms(metrics.sql_time),
+            'outbound': {
+                service: {'calls': calls, 'ms': _ms(seconds)}
+                for service, (calls, seconds) in metrics.outbound.items()
+            },
+        })
+        return response
@@ -0,0 +1,37 @@
+"""
+Archiva los mensajes de las conversaciones cerradas
+
+Mueve a archived_messages los mensajes de las conversaciones cerradas sin
+actividad desde hace más de ARCHIVE_AFTER_DAYS días (o --days), una
+conversación por transacción. Pensado para ejecutarse a diario desde cron.
+"""
+from django.core.management.base import BaseCommand
+from core.services.archive_service import archive_candidates, archive_conversation
+
+
+class Command(BaseCommand):
+    help = 'Mueve a la tabla de archivo los mensajes de las conversaciones cerradas'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=None, help='Días desde el cierre (ARCHIVE_AFTER_DAYS)')
+        parser.add_argument('--limit', type=int, default=1000, help='Máximo de conversaciones por ejecución')
+        parser.add_argument('--dry-run', action='store_true', help='Solo contar, sin archivar')
+
+    def handle(self, *args, **options):
+        candidates = archive_candidates(days=options['days']).order_by('updated_at')
+        conversation_ids = list(candidates.values_list('id', flat=True)[:options['limit']])
+
+        if options['dry_run']:
+            self.stdout.write(self.style.WARNING(f'🔍 {len(conversation_ids)} conversaciones por archivar'))
+            return
+
+        conversations = messages = 0
+        for conversation_id in conversation_ids:
+            archived = archive_conversation(conversation_id)
+            if archived is None:
+                # Se reabrió mientras tanto
+                continue
+            conversations += 1
+            messages += archived
+
+        self.stdout.write(self.style.SUCCESS(f'📦 {conversations} conversaciones archivadas ({messages} mensajes)'))
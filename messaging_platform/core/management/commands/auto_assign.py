@@ -0,0 +1,42 @@
+"""
+Asigna automáticamente las conversaciones activas sin agente
+
+Las conversaciones nuevas se asignan al crearse; este comando reparte las
+que quedaron sin agente (sin agentes disponibles en ese momento, o creadas
+antes de activar AUTO_ASSIGN_STRATEGIES). Con --rebuild-loads recalcula
+antes los contadores de AgentLoad.
+"""
+from django.core.management.base import BaseCommand
+from core.models import Conversation
+from core.services.assignment_service import auto_assign, rebuild_loads, strategy_for
+
+
+class Command(BaseCommand):
+    help = 'Asigna a agentes las conversaciones activas sin asignar'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rebuild-loads', action='store_true', help='Recalcular los contadores de carga de los agentes')
+        parser.add_argument('--limit', type=int, default=500, help='Máximo de conversaciones a asignar')
+
+    def handle(self, *args, **options):
+        if options['rebuild_loads']:
+            updated = rebuild_loads()
+            self.stdout.write(f'🔄 Contadores de carga recalculados ({updated} agentes corregidos)')
+
+        departments = [department for department, _ in Conversation.DEPARTMENT_CHOICES if strategy_for(department)]
+        if not departments:
+            self.stdout.write(self.style.WARNING('⚠️ Ningún departamento tiene estrategia en AUTO_ASSIGN_STRATEGIES'))
+            return
+
+        pending = Conversation.objects.filter(
+            status='active', assigned_to__isnull=True, department__in=departments
+        ).order_by('last_message_at')[:options['limit']]
+
+        assigned = skipped = 0
+        for conversation in pending:
+            if auto_assign(conversation):
+                assigned += 1
+            else:
+                skipped += 1
+
+        self.stdout.write(self.style.SUCCESS(f'✅ {assigned} conversaciones asignadas, {skipped} sin agente disponible'))
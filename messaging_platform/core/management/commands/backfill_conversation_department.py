@@ -0,0 +1,33 @@
+"""
+Rellena Conversation.department en las conversaciones existentes
+
+Recorre la tabla por rangos de id y actualiza cada rango con dos UPDATE
+(ventas y soporte), así no bloquea la tabla entera ni carga filas en
+memoria. Es idempotente: solo escribe las filas cuyo departamento cambia.
+"""
+from django.core.management.base import BaseCommand
+from django.db.models import Max
+from core.models import Conversation
+from core.services.classification_service import ContactClassificationService
+
+
+class Command(BaseCommand):
+    help = 'Calcula el departamento de las conversaciones existentes'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=5000, help='Conversaciones por rango de id')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        sales = ContactClassificationService.sales_filter()
+        last_id = Conversation.objects.aggregate(last_id=Max('id'))['last_id'] or 0
+
+        updated = {'sales': 0, 'support': 0}
+        for start in range(0, last_id + 1, batch_size):
+            batch = Conversation.objects.filter(id__gte=start, id__lt=start + batch_size)
+            updated['sales'] += batch.filter(sales).exclude(department='sales').update(department='sales')
+            updated['support'] += batch.exclude(sales).exclude(department='support').update(department='support')
+
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ Departamentos actualizados: {updated['sales']} a ventas, {updated['support']} a soporte"
+        ))
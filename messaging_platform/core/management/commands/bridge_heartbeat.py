@@ -0,0 +1,47 @@
+"""
+Heartbeat del bridge de WhatsApp: refresca periódicamente su estado en la caché
+
+Complementa los callbacks del bridge (connected / qr-updated) para que el
+estado cacheado no caduque y refleje caídas del bridge que no avisan.
+"""
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from core.services.bridge_status import refresh_bridge_status
+
+
+class Command(BaseCommand):
+    help = 'Consulta /status al bridge de WhatsApp y guarda el estado en la caché compartida'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--interval', type=float, default=10.0,
+                            help='Segundos entre consultas (menor que BRIDGE_STATUS_TTL)')
+        parser.add_argument('--once', action='store_true', help='Consultar una sola vez y salir')
+
+    def handle(self, *args, **options):
+        if options['interval'] >= settings.BRIDGE_STATUS_TTL and not options['once']:
+            self.stdout.write(self.style.WARNING(
+                f"⚠️ El intervalo ({options['interval']}s) no es menor que BRIDGE_STATUS_TTL "
+                f"({settings.BRIDGE_STATUS_TTL}s): el estado caducará entre consultas"
+            ))
+
+        self.stdout.write(self.style.SUCCESS('💓 Heartbeat del bridge iniciado'))
+        previous = None
+        try:
+            while True:
+                status = refresh_bridge_status()
+                current = (status['reachable'], status['connected'])
+                if current != previous or options['once']:
+                    if not status['reachable']:
+                        self.stdout.write('🔴 Bridge no disponible')
+                    elif status['connected']:
+                        self.stdout.write('🟢 WhatsApp conectado')
+                    else:
+                        self.stdout.write('🟡 Bridge activo, WhatsApp sin conectar')
+                    previous = current
+                if options['once']:
+                    break
+                time.sleep(options['interval'])
+        except KeyboardInterrupt:
+            self.stdout.write('⏹️ Heartbeat detenido')
@@ -0,0 +1,152 @@
+"""
+Comando para verificar los planes de ejecución (EXPLAIN) de las consultas críticas
+
+Explica las consultas de core/services/conversation_queries (las mismas que
+ejecutan las vistas) y falla (código de salida != 0) si alguna no usa el
+índice esperado o recorre con Seq Scan una de las tablas calientes. Los
+planes son los que elegiría el planner con los datos sintéticos de
+seed_synthetic_data, sin penalizar ningún tipo de nodo.
+
+Solo siembra con --seed (y entonces actualiza las estadísticas de las tablas
+sembradas con ANALYZE): pensado para CI o una base de desarrollo, nunca para
+la base de producción.
+"""
+import json
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Count
+from core.management.commands.seed_synthetic_data import SEED_PREFIX
+from core.models import Contact, Conversation, Reminder, User
+from core.services.conversation_queries import (
+    active_conversations, chat_conversations, contact_messages, dashboard_conversations, funnel_conversations,
+    pending_reminders, recent_conversations, unassigned_conversations, unread_contact_messages
+)
+from core.services.archive_service import conversation_messages
+
+
+# Tablas que nunca deben recorrerse completas en las vistas principales
+HOT_TABLES = {'conversations', 'messages', 'reminders'}
+# Tablas que escribe seed_synthetic_data (ANALYZE tras sembrar)
+SEEDED_TABLES = ('contacts', 'leads', 'conversations', 'messages', 'reminders')
+
+
+def hot_queries(conversation, reminder_user):
+    """
+    Consultas de las vistas principales, tal como las construyen las vistas
+
+    Returns:
+        list: tuplas (nombre, índice esperado, queryset)
+    """
+    sales, support = User(role='sales'), User(role='support')
+
+    return [
+        ('chat_view', 'conv_status_funnel_resp_idx', chat_conversations(sales)),
+        ('chat_view_needs_response', 'conv_status_funnel_resp_idx',
+         chat_conversations(support).filter(needs_response=True)),
+        ('dashboard_recent', 'conv_status_funnel_upd_idx',
+         recent_conversations(dashboard_conversations(sales), 100)),
+        ('dashboard_reminders', 'rem_user_done_date_idx', pending_reminders(reminder_user)),
+        ('inbox_view', 'conv_active_unassigned_idx', unassigned_conversations(support)),
+        ('funnels_view', 'conv_active_funnel_stage_idx', funnel_conversations('sales', 'sales_initial')),
+        ('webhook_active_conversation', 'conv_contact_status_idx',
+         active_conversations(conversation.contact_id)),
+        ('conversation_detail_messages', 'msg_conv_created_idx', conversation_messages(conversation)),
+        ('conversation_unread_messages', 'msg_conv_sender_created_idx',
+         unread_contact_messages(conversation)),
+        ('is_overdue_last_contact_message', 'msg_conv_sender_created_idx',
+         contact_messages(conversation)[:1]),
+    ]
+
+
+def find_seq_scans(plan, tables=HOT_TABLES):
+    """Devuelve las tablas calientes recorridas con Seq Scan dentro del plan"""
+    found = []
+    if plan.get('Node Type') == 'Seq Scan' and plan.get('Relation Name') in tables:
+        found.append(plan['Relation Name'])
+    for child in plan.get('Plans', []):
+        found.extend(find_seq_scans(child, tables))
+    return found
+
+
+def used_indexes(plan):
+    """Devuelve los índices utilizados dentro del plan"""
+    found = [plan['Index Name']] if plan.get('Index Name') else []
+    for child in plan.get('Plans', []):
+        found.extend(used_indexes(child))
+    return found
+
+
+class Command(BaseCommand):
+    help = 'Verifica con EXPLAIN sobre datos sintéticos que las consultas críticas usan su índice'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--seed',
+            action='store_true',
+            help='Sembrar con seed_synthetic_data los contactos que falten (solo CI o desarrollo)',
+        )
+        parser.add_argument(
+            '--contacts',
+            type=int,
+            default=5000,
+            help='Contactos sintéticos mínimos',
+        )
+        parser.add_argument(
+            '--show-plans',
+            action='store_true',
+            help='Imprimir el plan completo de cada consulta',
+        )
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'postgresql':
+            raise CommandError('Este comando requiere PostgreSQL')
+
+        seeded = Contact.objects.filter(platform_user_id__startswith=SEED_PREFIX).count()
+        if seeded < options['contacts']:
+            if not options['seed']:
+                raise CommandError(
+                    f'Hay {seeded} contactos sintéticos de {options["contacts"]}: '
+                    'usar --seed para sembrarlos (nunca sobre la base de producción)'
+                )
+            call_command('seed_synthetic_data', contacts=options['contacts'] - seeded, stdout=self.stdout)
+            # Estadísticas al día: el planner decide con el volumen sembrado
+            with connection.cursor() as cursor:
+                cursor.execute(f'ANALYZE {", ".join(SEEDED_TABLES)}')
+
+        # La conversación con más mensajes y el agente con más recordatorios: el peor caso de cada vista
+        conversation = Conversation.objects.filter(
+            contact__platform_user_id__startswith=SEED_PREFIX, archived_at__isnull=True
+        ).annotate(message_count=Count('messages')).order_by('-message_count', 'pk').first()
+        reminder_user = User.objects.filter(username__startswith=SEED_PREFIX).annotate(
+            reminder_count=Count('reminders')
+        ).order_by('-reminder_count', 'pk').first()
+        if conversation is None or reminder_user is None:
+            raise CommandError('No hay datos sintéticos suficientes (aumentar --contacts)')
+        queries = hot_queries(conversation, reminder_user)
+
+        failures = []
+        for name, expected_index, queryset in queries:
+            plan = json.loads(queryset.explain(format='json'))[0]['Plan']
+            seq_scans = find_seq_scans(plan)
+            indexes = list(dict.fromkeys(used_indexes(plan)))
+
+            if options['show_plans']:
+                self.stdout.write(queryset.explain())
+
+            if seq_scans:
+                failures.append(name)
+                self.stdout.write(self.style.ERROR(f'❌ {name}: Seq Scan en {", ".join(sorted(set(seq_scans)))}'))
+            elif expected_index not in indexes:
+                failures.append(name)
+                self.stdout.write(self.style.ERROR(
+                    f'❌ {name}: usa {", ".join(indexes) or plan["Node Type"]} en lugar de {expected_index}'
+                ))
+            else:
+                self.stdout.write(self.style.SUCCESS(f'✅ {name}: {", ".join(indexes)}'))
+
+        if failures:
+            raise CommandError(f'{len(failures)} consulta(s) sin su índice: {", ".join(failures)}')
+
+        self.stdout.write(self.style.SUCCESS(f'✅ {len(queries)} consultas verificadas'))
@@ -0,0 +1,38 @@
+"""
+Dispatcher de mensajes programados: pasa al outbox los que vencieron
+
+Se pueden ejecutar varios en paralelo (las filas se reservan con
+SELECT ... FOR UPDATE SKIP LOCKED). Entre lotes duerme hasta el siguiente
+vencimiento, con un máximo de --max-sleep segundos para recoger los
+mensajes programados mientras tanto.
+"""
+import time
+
+from django.core.management.base import BaseCommand
+from core.services.scheduler_service import dispatch_due, seconds_until_next_due
+
+
+class Command(BaseCommand):
+    help = 'Envía al outbox los mensajes programados cuya hora de envío ya llegó'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=100, help='Mensajes reservados por lote')
+        parser.add_argument('--max-sleep', type=float, default=15.0,
+                            help='Espera máxima entre consultas (latencia de un mensaje recién programado)')
+        parser.add_argument('--once', action='store_true', help='Despachar los vencidos y salir')
+
+    def handle(self, *args, **options):
+        self.stdout.write(self.style.SUCCESS('⏰ Dispatcher de mensajes programados iniciado'))
+        try:
+            while True:
+                dispatched = dispatch_due(limit=options['batch_size'])
+                if dispatched:
+                    self.stdout.write(f'📨 {dispatched} mensajes programados enviados al outbox')
+                    if dispatched == options['batch_size']:
+                        # Puede haber más vencidos: siguiente lote sin esperar
+                        continue
+                if options['once']:
+                    break
+                time.sleep(seconds_until_next_due(options['max_sleep']))
+        except KeyboardInterrupt:
+            self.stdout.write('⏹️ Dispatcher detenido')
@@ -0,0 +1,53 @@
+"""
+Comando para exportar conversaciones, mensajes o leads en CSV / NDJSON
+"""
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+from core.services.export_service import (
+    stream_export, ExportError, EXPORT_DATASETS, EXPORT_FORMATS, EXPORT_CHUNK_SIZE
+)
+
+
+class Command(BaseCommand):
+    help = 'Exporta datos en streaming (memoria constante) para BI'
+
+    def add_arguments(self, parser):
+        parser.add_argument('dataset', choices=sorted(EXPORT_DATASETS.keys()))
+        parser.add_argument('--format', choices=EXPORT_FORMATS, default='csv')
+        parser.add_argument('--from', dest='date_from', help='Fecha inicial YYYY-MM-DD (inclusive)')
+        parser.add_argument('--to', dest='date_to', help='Fecha final YYYY-MM-DD (inclusive)')
+        parser.add_argument('--department', choices=['sales', 'support', 'recovery'])
+        parser.add_argument('--platform', choices=['whatsapp', 'facebook', 'telegram'])
+        parser.add_argument('--chunk-size', type=int, default=EXPORT_CHUNK_SIZE)
+        parser.add_argument('--output', '-o', help='Archivo de salida (por defecto stdout)')
+
+    def handle(self, *args, **options):
+        try:
+            content = stream_export(
+                options['dataset'],
+                options['format'],
+                chunk_size=options['chunk_size'],
+                date_from=options['date_from'],
+                date_to=options['date_to'],
+                department=options['department'],
+                platform=options['platform'],
+            )
+        except ExportError as e:
+            raise CommandError(str(e))
+
+        output = options['output']
+        handle = open(output, 'w', encoding='utf-8', newline='') if output else sys.stdout
+        rows = 0
+        try:
+            for line in content:
+                handle.write(line)
+                rows += 1
+        finally:
+            if output:
+                handle.close()
+
+        if output:
+            # Restar el encabezado en CSV
+            total = rows - 1 if options['format'] == 'csv' else rows
+            self.stderr.write(self.style.SUCCESS(f'✅ {total} filas exportadas a {output}'))
@@ -0,0 +1,41 @@
+"""
+Worker de miniaturas: genera miniatura y placeholder de las imágenes y
+videos del almacén multimedia
+
+Se pueden ejecutar varios en paralelo (cada archivo se reserva con una
+actualización condicional). Con --once procesa la cola pendiente,
+incluidos los archivos guardados antes de existir las miniaturas, y sale.
+"""
+import time
+
+from django.core.management.base import BaseCommand
+from core.services.media_derivatives import process_pending, requeue_stale
+
+
+class Command(BaseCommand):
+    help = 'Genera miniaturas y placeholders de la multimedia del chat'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=20, help='Archivos reservados por lote')
+        parser.add_argument('--sleep', type=float, default=5.0, help='Espera cuando la cola está vacía')
+        parser.add_argument('--once', action='store_true', help='Procesar lo pendiente y salir')
+
+    def handle(self, *args, **options):
+        self.stdout.write(self.style.SUCCESS('🖼️ Worker de miniaturas iniciado'))
+        requeued = requeue_stale()
+        if requeued:
+            self.stdout.write(f'↩️ {requeued} archivos reservados por un worker anterior vuelven a la cola')
+        try:
+            while True:
+                counts = process_pending(limit=options['batch_size'])
+                processed = sum(counts.values())
+                if processed:
+                    self.stdout.write(
+                        f"🖼️ {counts['ready']} miniaturas, {counts['skipped']} sin miniatura, {counts['failed']} fallidas"
+                    )
+                    continue
+                if options['once']:
+                    break
+                time.sleep(options['sleep'])
+        except KeyboardInterrupt:
+            self.stdout.write('⏹️ Worker de miniaturas detenido')
@@ -0,0 +1,62 @@
+"""
+Limpieza de multimedia: políticas de retención y archivos huérfanos
+
+Aplica MEDIA_RETENTION (por tipo de mensaje, antigüedad y tamaño), borra
+los archivos del almacén que ningún mensaje usa y los archivos de
+attachments/ que ningún Message.media_url referencia. Recorre la base de
+datos y el disco en lotes, con memoria acotada. Con --dry-run solo informa.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from core.services.media_gc import (
+    MediaReport, apply_retention, collect_unreferenced_blobs, retention_policies, sweep_storage
+)
+
+
+def _human_size(size):
+    for unit in ('B', 'KB', 'MB', 'GB'):
+        if size < 1024:
+            return f'{size:.0f} {unit}'
+        size /= 1024
+    return f'{size:.1f} TB'
+
+
+class Command(BaseCommand):
+    help = 'Aplica la retención de multimedia y borra archivos huérfanos'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help='Solo informar, sin borrar nada')
+        parser.add_argument('--grace-hours', type=int, default=None,
+                            help='Antigüedad mínima de un archivo sin mensajes para borrarlo (MEDIA_GC_GRACE_HOURS)')
+        parser.add_argument('--skip-retention', action='store_true', help='No aplicar MEDIA_RETENTION')
+
+    def handle(self, *args, **options):
+        dry_run = options['dry_run']
+        grace_hours = options['grace_hours']
+        if grace_hours is None:
+            grace_hours = getattr(settings, 'MEDIA_GC_GRACE_HOURS', 24)
+        grace = timedelta(hours=grace_hours)
+        report = MediaReport()
+
+        if dry_run:
+            self.stdout.write(self.style.WARNING('🔍 Modo simulación: no se borra nada'))
+
+        if not options['skip_retention']:
+            policies = retention_policies()
+            for message_type, (days, min_size) in policies.items():
+                condition = f' y de más de {_human_size(min_size)}' if min_size else ''
+                self.stdout.write(f'📅 Retención {message_type}: {days} días{condition}')
+            apply_retention(report, dry_run=dry_run)
+
+        collect_unreferenced_blobs(report, grace, dry_run=dry_run)
+        sweep_storage(report, grace, dry_run=dry_run)
+
+        total_files = total_bytes = 0
+        for category, files, size in report.lines():
+            self.stdout.write(f'  {category}: {files} archivos, {_human_size(size)}')
+            total_files += files
+            total_bytes += size
+        verb = 'se liberarían' if dry_run else 'liberados'
+        self.stdout.write(self.style.SUCCESS(f'🧹 {total_files} archivos, {_human_size(total_bytes)} {verb}'))
@@ -0,0 +1,37 @@
+"""
+Worker del outbox: entrega los mensajes salientes en cola
+
+Se pueden ejecutar varios en paralelo (las filas se reservan con
+SELECT ... FOR UPDATE SKIP LOCKED). El límite por canal de las campañas
+(CAMPAIGN_RATE_LIMITS) se guarda en la base y lo comparten todos los workers.
+"""
+import time
+
+from django.core.management.base import BaseCommand
+from core.services.outbox_service import process_outbox
+
+
+class Command(BaseCommand):
+    help = 'Entrega los mensajes en cola (outbox) con reintentos y orden por conversación'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=20, help='Mensajes reservados por lote')
+        parser.add_argument('--interval', type=float, default=1.0, help='Segundos de espera cuando no hay trabajo')
+        parser.add_argument('--once', action='store_true', help='Procesar un solo lote y salir')
+
+    def handle(self, *args, **options):
+        self.stdout.write(self.style.SUCCESS('📤 Worker de outbox iniciado'))
+        try:
+            while True:
+                counts = process_outbox(limit=options['batch_size'])
+                processed = sum(counts.values())
+                if processed:
+                    self.stdout.write(
+                        f"📨 Enviados: {counts['sent']} · Reintentos: {counts['retry']} · Fallidos: {counts['failed']}"
+                    )
+                if options['once']:
+                    break
+                if not processed:
+                    time.sleep(options['interval'])
+        except KeyboardInterrupt:
+            self.stdout.write('⏹️ Worker detenido')
@@ -0,0 +1,45 @@
+"""
+Resuelve en segundo plano las URLs de los archivos de Telegram recientes
+
+Los webhooks solo guardan el file_id; este comando llama a getFile en
+paralelo para los mensajes recientes y deja las URLs en la caché, de modo
+que al abrir el chat los archivos no esperan a la API de Telegram.
+"""
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from core.models import Message
+from core.services.telegram_media import warm_file_urls
+
+
+class Command(BaseCommand):
+    help = 'Precarga en caché las URLs de los archivos de Telegram recibidos recientemente'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--minutes', type=int, default=30, help='Antigüedad máxima de los mensajes')
+        parser.add_argument('--limit', type=int, default=500, help='Máximo de archivos por pasada')
+        parser.add_argument('--interval', type=float, default=60.0, help='Segundos entre pasadas')
+        parser.add_argument('--once', action='store_true', help='Hacer una sola pasada y salir')
+
+    def handle(self, *args, **options):
+        self.stdout.write(self.style.SUCCESS('📎 Resolución de archivos de Telegram iniciada'))
+        try:
+            while True:
+                since = timezone.now() - timedelta(minutes=options['minutes'])
+                file_ids = list(
+                    Message.objects.filter(
+                        media_file_id__isnull=False,
+                        created_at__gte=since,
+                        conversation__contact__platform__name='telegram',
+                    ).order_by('-created_at').values_list('media_file_id', flat=True)[:options['limit']]
+                )
+                resolved = warm_file_urls(file_ids)
+                if resolved:
+                    self.stdout.write(f'✅ {resolved} URLs resueltas ({len(file_ids)} archivos recientes)')
+                if options['once']:
+                    break
+                time.sleep(options['interval'])
+        except KeyboardInterrupt:
+            self.stdout.write('⏹️ Resolución detenida')
@@ -0,0 +1,21 @@
+"""
+Devuelve a la tabla messages los mensajes archivados de una o varias conversaciones
+"""
+from django.core.management.base import BaseCommand, CommandError
+from core.models import Conversation
+from core.services.archive_service import restore_conversation
+
+
+class Command(BaseCommand):
+    help = 'Restaura los mensajes archivados de conversaciones'
+
+    def add_arguments(self, parser):
+        parser.add_argument('conversation_ids', nargs='+', type=int, help='IDs de las conversaciones')
+
+    def handle(self, *args, **options):
+        for conversation_id in options['conversation_ids']:
+            try:
+                restored = restore_conversation(conversation_id)
+            except Conversation.DoesNotExist:
+                raise CommandError(f'Conversación {conversation_id} no encontrada')
+            self.stdout.write(self.style.SUCCESS(f'♻️ Conversación {conversation_id}: {restored} mensajes restaurados'))
@@ -0,0 +1,187 @@
+"""
+Comando para medir el rendimiento de los endpoints críticos
+
+Ejecuta los endpoints (webhooks, chat, bandeja, dashboard, embudos y polling
+de mensajes) con el cliente de pruebas de Django dentro del mismo proceso y
+reporta throughput, latencias p50/p95 y número de consultas SQL en JSON.
+Correr sobre una base sembrada con seed_synthetic_data.
+
+Cada webhook se procesa dentro de una transacción que se revierte: el
+benchmark no deja contactos, conversaciones ni mensajes en la base que mide
+(la medición no incluye el COMMIT y cuenta los SAVEPOINT de las transacciones
+internas). Los usuarios del benchmark llevan el prefijo de los datos
+sintéticos y se eliminan con seed_synthetic_data --purge.
+"""
+import contextlib
+import io
+import json
+import math
+import platform as py_platform
+import subprocess
+import time
+import uuid
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from core.management.commands.seed_synthetic_data import SEED_PREFIX
+from core.models import User, Conversation, Contact, Message
+
+
+BENCHMARK_USER = f'{SEED_PREFIX}bench_admin'
+
+# Números de prueba para el webhook (se reutilizan entre iteraciones)
+WEBHOOK_NUMBERS = [f'57310{n:07d}' for n in range(50)]
+
+
+def percentile(values, pct):
+    """Percentil por rango más cercano sobre una lista ya ordenada"""
+    if not values:
+        return 0.0
+    index = max(0, math.ceil(pct / 100 * len(values)) - 1)
+    return values[index]
+
+
+class Command(BaseCommand):
+    help = 'Mide throughput, latencias p50/p95 y consultas SQL de los endpoints críticos'
+
+    ENDPOINTS = ['webhook_whatsapp', 'chat', 'inbox', 'dashboard', 'funnels', 'messages_polling']
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=20, help='Peticiones medidas por endpoint')
+        parser.add_argument('--warmup', type=int, default=2, help='Peticiones de calentamiento (no medidas)')
+        parser.add_argument('--endpoints', nargs='+', choices=self.ENDPOINTS, default=self.ENDPOINTS)
+        parser.add_argument('--role', choices=['admin', 'support', 'sales'], default='admin',
+                            help='Rol del usuario con el que se hacen las peticiones')
+        parser.add_argument('--output', '-o', help='Archivo JSON de salida (por defecto stdout)')
+
+    def handle(self, *args, **options):
+        conversation = Conversation.objects.filter(status='active').order_by('-last_message_at').first()
+        if not conversation:
+            raise CommandError('No hay conversaciones activas. Ejecuta primero seed_synthetic_data')
+
+        client = Client()
+        client.force_login(self._benchmark_user(options['role']))
+
+        requests_by_endpoint = {
+            'webhook_whatsapp': lambda i: self._rolled_back(lambda: client.post(
+                '/webhooks/whatsapp/', data=json.dumps(self._webhook_payload(i)), content_type='application/json'
+            )),
+            'chat': lambda i: client.get('/chat/'),
+            'inbox': lambda i: client.get('/inbox/'),
+            'dashboard': lambda i: client.get('/dashboard/'),
+            'funnels': lambda i: client.get('/funnels/?type=sales'),
+            'messages_polling': lambda i: client.get(f'/api/conversations/{conversation.id}/messages/'),
+        }
+
+        results = {}
+        for name in options['endpoints']:
+            results[name] = self._measure(requests_by_endpoint[name], options['iterations'], options['warmup'])
+            self.stderr.write(
+                f'⏱️ {name}: p50={results[name]["p50_ms"]}ms p95={results[name]["p95_ms"]}ms '
+                f'queries={results[name]["queries_mean"]}'
+            )
+
+        report = {
+            'timestamp': timezone.now().isoformat(),
+            'git_revision': self._git_revision(),
+            'python': py_platform.python_version(),
+            'database': connection.vendor,
+            'debug': settings.DEBUG,
+            'dataset': {
+                'contacts': Contact.objects.count(),
+                'conversations': Conversation.objects.count(),
+                'messages': Message.objects.count(),
+            },
+            'iterations': options['iterations'],
+            'role': options['role'],
+            'endpoints': results,
+        }
+
+        output = json.dumps(report, indent=2)
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as f:
+                f.write(output)
+            self.stderr.write(self.style.SUCCESS(f'✅ Reporte guardado en {options["output"]}'))
+        else:
+            self.stdout.write(output)
+
+    def _measure(self, do_request, iterations, warmup):
+        """Ejecuta las peticiones y calcula estadísticas"""
+        latencies = []
+        query_counts = []
+        statuses = {}
+        sink = io.StringIO()
+
+        # Las vistas imprimen trazas de depuración: se descartan durante la medición
+        with contextlib.redirect_stdout(sink):
+            for i in range(warmup):
+                do_request(i)
+                sink.seek(0)
+                sink.truncate()
+
+            started = time.perf_counter()
+            for i in range(warmup, warmup + iterations):
+                with CaptureQueriesContext(connection) as queries:
+                    t0 = time.perf_counter()
+                    response = do_request(i)
+                    latencies.append((time.perf_counter() - t0) * 1000)
+                query_counts.append(len(queries))
+                statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+                sink.seek(0)
+                sink.truncate()
+            elapsed = time.perf_counter() - started
+
+        latencies.sort()
+        return {
+            'requests': iterations,
+            'throughput_rps': round(iterations / elapsed, 2) if elapsed else None,
+            'p50_ms': round(percentile(latencies, 50), 2),
+            'p95_ms': round(percentile(latencies, 95), 2),
+            'min_ms': round(latencies[0], 2),
+            'max_ms': round(latencies[-1], 2),
+            'queries_mean': round(sum(query_counts) / len(query_counts), 1),
+            'queries_max': max(query_counts),
+            'status_codes': {str(code): count for code, count in sorted(statuses.items())},
+        }
+
+    def _rolled_back(self, do_request):
+        """Ejecuta la petición en una transacción que se revierte (no deja datos)"""
+        with transaction.atomic():
+            response = do_request()
+            transaction.set_rollback(True)
+        return response
+
+    def _benchmark_user(self, role):
+        user, created = User.objects.get_or_create(
+            username=f'{BENCHMARK_USER}_{role}' if role != 'admin' else BENCHMARK_USER,
+            defaults={'role': role, 'email': f'{BENCHMARK_USER}_{role}@example.com',
+                      'is_staff': role == 'admin', 'is_superuser': role == 'admin'}
+        )
+        if created:
+            user.set_unusable_password()
+            user.save(update_fields=['password'])
+        return user
+
+    def _webhook_payload(self, i):
+        """Mensaje entrante con la misma forma que envía el bridge de Baileys"""
+        return {
+            'from': f'{WEBHOOK_NUMBERS[i % len(WEBHOOK_NUMBERS)]}@s.whatsapp.net',
+            'received_at': '573022620031',
+            'message_id': f'bench_{uuid.uuid4().hex}',
+            'timestamp': int(time.time()),
+            'type': 'text',
+            'content': 'Hola, quisiera información sobre el curso',
+            'media_url': None,
+        }
+
+    def _git_revision(self):
+        try:
+            return subprocess.check_output(
+                ['git', 'rev-parse', '--short', 'HEAD'], cwd=settings.BASE_DIR, stderr=subprocess.DEVNULL
+            ).decode().strip()
+        except (OSError, subprocess.CalledProcessError):
+            return None
@@ -0,0 +1,49 @@
+"""
+Runner de campañas: pasa destinatarios al outbox respetando el límite por canal
+
+El token bucket de cada canal ('dispatch:<canal>') se guarda en la base y
+lo comparten todos los runners; limita lo que entra al outbox. La entrega
+la hace process_outbox, que aplica el límite del canal con su propio
+bucket compartido ('delivery:<canal>').
+"""
+import time
+
+from django.core.management.base import BaseCommand
+from core.services.campaign_service import (
+    channel_bucket, rate_limits, dispatch_batch, complete_finished_campaigns
+)
+
+
+class Command(BaseCommand):
+    help = 'Envía las campañas en curso con límite de velocidad (token bucket) por canal'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tick', type=float, default=0.5, help='Segundos entre rondas')
+        parser.add_argument('--max-batch', type=int, default=500, help='Máximo de destinatarios por lote')
+        parser.add_argument('--once', action='store_true', help='Ejecutar una sola ronda y salir')
+
+    def handle(self, *args, **options):
+        buckets = {channel: channel_bucket('dispatch', channel) for channel in rate_limits()}
+        for channel, bucket in buckets.items():
+            self.stdout.write(f'🚦 {channel}: {bucket.rate}/s (ráfaga {int(bucket.burst)})')
+
+        try:
+            while True:
+                for channel, bucket in buckets.items():
+                    reserved = bucket.take(options['max_batch'])
+                    if not reserved:
+                        continue
+                    processed = dispatch_batch(channel, reserved)
+                    bucket.refund(reserved - processed)
+                    if processed:
+                        self.stdout.write(f'📣 {channel}: {processed} mensajes de campaña en cola')
+
+                completed = complete_finished_campaigns()
+                if completed:
+                    self.stdout.write(self.style.SUCCESS(f'✅ {completed} campaña(s) completada(s)'))
+
+                if options['once']:
+                    break
+                time.sleep(options['tick'])
+        except KeyboardInterrupt:
+            self.stdout.write('⏹️ Runner detenido')
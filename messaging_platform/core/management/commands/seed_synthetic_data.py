@@ -0,0 +1,253 @@
+"""
+Comando para sembrar datos sintéticos con volúmenes y distribuciones realistas
+
+Genera contactos, conversaciones, mensajes, leads y recordatorios
+repartidos por plataforma, departamento y país usando inserciones masivas. Todos los registros quedan
+marcados con el prefijo SEED_PREFIX para poder borrarlos con --purge.
+"""
+import random
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+from core.models import Platform, Contact, Conversation, Message, Lead, Reminder, User
+from core.utils.international_phone import formatear_numero_internacional, obtener_info_pais
+
+
+SEED_PREFIX = 'seed_'
+
+# Pesos aproximados observados en producción
+PLATFORM_WEIGHTS = {'whatsapp': 80, 'facebook': 12, 'telegram': 8}
+DEPARTMENT_WEIGHTS = {'support': 50, 'sales': 30, 'recovery': 8, 'none': 12}
+STATUS_WEIGHTS = {'active': 70, 'closed': 25, 'pending': 5}
+MESSAGE_TYPE_WEIGHTS = {'text': 86, 'image': 7, 'audio': 4, 'document': 2, 'video': 1}
+
+# (código de país, prefijo móvil, dígitos restantes, peso)
+COUNTRY_NUMBERING = [
+    ('57', '3', 9, 70),     # Colombia
+    ('52', '55', 8, 8),     # México
+    ('51', '9', 8, 5),      # Perú
+    ('593', '99', 7, 4),    # Ecuador
+    ('58', '414', 7, 4),    # Venezuela
+    ('34', '6', 8, 4),      # España
+    ('1', '415', 7, 3),     # USA/Canadá
+    ('56', '9', 8, 2),      # Chile
+]
+
+FUNNEL_STAGES = {
+    'sales': ['sales_initial', 'sales_negotiation', 'sales_debate', 'sales_closing'],
+    'support': ['support_initial', 'support_process', 'support_closing'],
+    'recovery': ['recovery_initial', 'recovery_evaluation', 'recovery_proposal', 'recovery_followup', 'recovery_closing'],
+    'none': ['none'],
+}
+
+FIRST_NAMES = ['Ana', 'Luis', 'María', 'Carlos', 'Laura', 'Jorge', 'Sofía', 'Andrés', 'Valentina', 'Diego',
+               'Camila', 'Juan', 'Daniela', 'Felipe', 'Paula', 'Santiago', 'Isabella', 'Mateo']
+LAST_NAMES = ['Gómez', 'Rodríguez', 'López', 'Martínez', 'García', 'Pérez', 'Sánchez', 'Ramírez',
+              'Torres', 'Díaz', 'Vargas', 'Castro', 'Rojas', 'Moreno']
+
+CONTACT_PHRASES = [
+    'Hola, quisiera información sobre el curso',
+    '¿Cuál es el precio?',
+    'No puedo ingresar a la plataforma',
+    'Gracias por la respuesta',
+    '¿Tienen descuento si pago de contado?',
+    'Ya hice el pago, adjunto comprobante',
+    'Me interesa, ¿cómo me inscribo?',
+    'Buenas tardes',
+]
+AGENT_PHRASES = [
+    'Hola, con gusto te ayudo',
+    'Te comparto la información del programa',
+    'Ya revisamos tu caso, en un momento te confirmamos',
+    '¿Me confirmas tu correo registrado?',
+    'Quedamos atentos a cualquier inquietud',
+]
+
+
+def weighted_choice(rng, weights):
+    """Elige una clave de un diccionario {valor: peso}"""
+    return rng.choices(list(weights.keys()), weights=list(weights.values()))[0]
+
+
+class Command(BaseCommand):
+    help = 'Siembra contactos, conversaciones y mensajes sintéticos para pruebas de carga'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--contacts', type=int, default=1000, help='Número de contactos a crear')
+        parser.add_argument('--messages-per-conversation', type=int, default=20,
+                            help='Mediana de mensajes por conversación (distribución log-normal)')
+        parser.add_argument('--days', type=int, default=180, help='Ventana de tiempo de la actividad generada')
+        parser.add_argument('--batch-size', type=int, default=2000)
+        parser.add_argument('--seed', type=int, default=42, help='Semilla para resultados reproducibles')
+        parser.add_argument('--purge', action='store_true', help='Eliminar los datos sintéticos existentes y salir')
+
+    def handle(self, *args, **options):
+        if options['purge']:
+            deleted, _ = Contact.objects.filter(platform_user_id__startswith=SEED_PREFIX).delete()
+            User.objects.filter(username__startswith=SEED_PREFIX).delete()
+            self.stdout.write(self.style.SUCCESS(f'🗑️ {deleted} registros sintéticos eliminados'))
+            return
+
+        rng = random.Random(options['seed'])
+        batch_size = options['batch_size']
+        now = timezone.now()
+        window = timedelta(days=options['days'])
+
+        platforms = {}
+        for name in PLATFORM_WEIGHTS:
+            platforms[name], _ = Platform.objects.get_or_create(name=name, defaults={'is_active': True})
+
+        agents = self._ensure_agents()
+        run_tag = f"{SEED_PREFIX}{now.strftime('%Y%m%d%H%M%S')}_"
+
+        self.stdout.write(f'🌱 Sembrando {options["contacts"]} contactos ({run_tag})...')
+
+        totals = {'contacts': 0, 'conversations': 0, 'messages': 0, 'leads': 0, 'reminders': 0}
+        remaining = options['contacts']
+        offset = 0
+        while remaining > 0:
+            size = min(batch_size, remaining)
+            counts = self._seed_batch(rng, platforms, agents, run_tag, offset, size,
+                                      options['messages_per_conversation'], now, window, batch_size)
+            for key in totals:
+                totals[key] += counts[key]
+            remaining -= size
+            offset += size
+            self.stdout.write(f'  ↳ {offset} contactos, {totals["messages"]} mensajes')
+
+        self.stdout.write(self.style.SUCCESS(
+            f'✅ Creados: {totals["contacts"]} contactos, {totals["conversations"]} conversaciones, '
+            f'{totals["messages"]} mensajes, {totals["leads"]} leads, {totals["reminders"]} recordatorios'
+        ))
+
+    def _ensure_agents(self):
+        """Crea agentes sintéticos de soporte y ventas si no existen"""
+        agents = {'support': [], 'sales': []}
+        for role in agents:
+            for i in range(1, 4):
+                user, created = User.objects.get_or_create(
+                    username=f'{SEED_PREFIX}{role}_{i}',
+                    defaults={'role': role, 'email': f'{SEED_PREFIX}{role}_{i}@example.com', 'is_active_chat': True}
+                )
+                if created:
+                    user.set_unusable_password()
+                    user.save(update_fields=['password'])
+                agents[role].append(user)
+        agents['recovery'] = agents['sales']
+        return agents
+
+    def _random_phone(self, rng):
+        """Número móvil formateado con distribución por país"""
+        code, prefix, digits, _ = rng.choices(COUNTRY_NUMBERING, weights=[c[3] for c in COUNTRY_NUMBERING])[0]
+        raw = code + prefix + ''.join(str(rng.randint(0, 9)) for _ in range(digits))
+        return raw, formatear_numero_internacional(raw) or f'+{raw}'
+
+    @transaction.atomic
+    def _seed_batch(self, rng, platforms, agents, run_tag, offset, size, median_messages, now, window, batch_size):
+        contacts = []
+        contact_dates = []
+        for i in range(size):
+            platform_name = weighted_choice(rng, PLATFORM_WEIGHTS)
+            raw_phone, phone = self._random_phone(rng)
+            country = obtener_info_pais(raw_phone)
+            created_at = now - window * rng.random()
+            contacts.append(Contact(
+                platform=platforms[platform_name],
+                platform_user_id=f'{run_tag}{offset + i}_{raw_phone}',
+                name=f'{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}',
+                phone=phone if platform_name == 'whatsapp' else None,
+                country=country['name'] if country else 'Desconocido',
+            ))
+            contact_dates.append(created_at)
+        Contact.objects.bulk_create(contacts, batch_size=batch_size)
+
+        conversations = []
+        leads = []
+        for contact, created_at in zip(contacts, contact_dates):
+            contact.created_at = created_at
+            department = weighted_choice(rng, DEPARTMENT_WEIGHTS)
+            status = weighted_choice(rng, STATUS_WEIGHTS)
+            assigned_to = None
+            if department in agents and rng.random() < 0.7:
+                assigned_to = rng.choice(agents[department])
+            conversation = Conversation(
+                contact=contact,
+                assigned_to=assigned_to,
+                status=status,
+                funnel_type=department,
+                funnel_stage=rng.choice(FUNNEL_STAGES[department]),
+                department='sales' if department == 'sales' else 'support',
+            )
+            conversation.created_at = created_at
+            conversations.append(conversation)
+            if department in ('sales', 'recovery'):
+                leads.append(Lead(contact=contact, assigned_to=assigned_to, case_type=department, status='new',
+                                  notes='Lead sintético'))
+        Contact.objects.bulk_update(contacts, ['created_at'], batch_size=batch_size)
+        Conversation.objects.bulk_create(conversations, batch_size=batch_size)
+        Lead.objects.bulk_create(leads, batch_size=batch_size)
+
+        # Recordatorios de los agentes (dashboard): pasados casi todos completados
+        reminders = []
+        for lead in leads:
+            if lead.assigned_to is not None and rng.random() < 0.5:
+                reminder_date = now + timedelta(days=rng.uniform(-30, 30))
+                reminders.append(Reminder(
+                    lead=lead,
+                    user=lead.assigned_to,
+                    title='Recordatorio sintético',
+                    reminder_date=reminder_date,
+                    is_completed=reminder_date < now and rng.random() < 0.8,
+                ))
+        Reminder.objects.bulk_create(reminders, batch_size=batch_size)
+
+        messages = []
+        for conversation in conversations:
+            # Log-normal: la mayoría de conversaciones son cortas y unas pocas muy largas
+            count = max(1, min(int(rng.lognormvariate(0, 0.9) * median_messages), median_messages * 20))
+            elapsed = now - conversation.created_at
+            timestamps = sorted(conversation.created_at + elapsed * rng.random() for _ in range(count))
+            sender = 'contact'
+            for n, created_at in enumerate(timestamps):
+                message_type = weighted_choice(rng, MESSAGE_TYPE_WEIGHTS)
+                message = Message(
+                    conversation=conversation,
+                    platform_message_id=f'{run_tag}{conversation.contact.platform_user_id}_{n}',
+                    sender_type=sender,
+                    sender_user=conversation.assigned_to if sender == 'agent' else None,
+                    message_type=message_type,
+                    content=rng.choice(CONTACT_PHRASES if sender == 'contact' else AGENT_PHRASES),
+                    media_url=f'/media/attachments/{SEED_PREFIX}{message_type}.bin' if message_type != 'text' else None,
+                    is_read=created_at < now - timedelta(hours=1),
+                )
+                message.created_at = created_at
+                messages.append(message)
+                if rng.random() < 0.6:
+                    sender = 'agent' if sender == 'contact' else 'contact'
+
+            last = messages[-1]
+            conversation.last_message_at = last.created_at
+            conversation.needs_response = last.sender_type == 'contact'
+            conversation.is_answered = any(m.sender_type == 'agent' for m in messages[-count:])
+            agent_times = [m.created_at for m in messages[-count:] if m.sender_type == 'agent']
+            conversation.first_response_at = agent_times[0] if agent_times else None
+            conversation.last_response_at = agent_times[-1] if agent_times else None
+
+        Message.objects.bulk_create(messages, batch_size=batch_size)
+        # auto_now_add sobrescribe created_at en la inserción: se corrige en bloque
+        Message.objects.bulk_update(messages, ['created_at'], batch_size=batch_size)
+        Conversation.objects.bulk_update(
+            conversations,
+            ['created_at', 'last_message_at', 'needs_response', 'is_answered', 'first_response_at', 'last_response_at'],
+            batch_size=batch_size,
+        )
+
+        return {
+            'contacts': len(contacts),
+            'conversations': len(conversations),
+            'messages': len(messages),
+            'leads': len(leads),
+            'reminders': len(reminders),
+        }
@@ -0,0 +1,77 @@
+"""
+Ingesta de Telegram por long polling (alternativa al webhook)
+
+Pide los updates con getUpdates en lotes y los procesa con la misma lógica
+que el webhook (process_updates, con inserciones masivas). El offset se
+guarda en APIConfiguration después de cada lote, así que al reiniciar se
+continúa donde se quedó; sirve también para recuperar los updates
+pendientes tras una caída (Telegram los conserva 24 horas).
+"""
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from core.models import APIConfiguration
+from core.services.telegram_service import TelegramService
+
+
+class Command(BaseCommand):
+    help = 'Recibe los mensajes de Telegram por long polling (getUpdates) en lugar de webhook'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--limit', type=int, default=100, help='Updates por lote (máximo 100)')
+        parser.add_argument('--timeout', type=int, default=25, help='Segundos de espera del long polling')
+        parser.add_argument('--delete-webhook', action='store_true',
+                            help='Eliminar el webhook configurado (getUpdates no funciona con webhook activo)')
+        parser.add_argument('--once', action='store_true', help='Procesar los updates pendientes y salir')
+
+    def handle(self, *args, **options):
+        service = TelegramService()
+        if not service.is_configured():
+            raise CommandError('Telegram no configurado (falta telegram_bot_token)')
+
+        if options['delete_webhook']:
+            result = service.delete_webhook()
+            if not result['success']:
+                raise CommandError(f"No se pudo eliminar el webhook: {result['error']}")
+            self.stdout.write('🔌 Webhook eliminado')
+
+        offset = service.config.telegram_update_offset
+        limit = max(1, min(options['limit'], 100))
+        errors = 0
+        self.stdout.write(self.style.SUCCESS(f'📡 Long polling de Telegram iniciado (offset {offset})'))
+
+        try:
+            while True:
+                # En modo --once no se espera: solo se vacía lo pendiente
+                result = service.get_updates(offset, limit=limit, timeout=0 if options['once'] else options['timeout'])
+                if not result['success']:
+                    errors += 1
+                    delay = min(60, 2 ** errors)
+                    self.stdout.write(self.style.ERROR(f"❌ getUpdates falló: {result['error']} (reintento en {delay}s)"))
+                    time.sleep(delay)
+                    continue
+                errors = 0
+
+                updates = result['data']
+                if updates:
+                    processed = service.process_updates(updates)
+                    if not processed['success']:
+                        # Un update defectuoso no debe bloquear el lote: se procesan de a uno
+                        self.stdout.write(self.style.WARNING(
+                            f"⚠️ Lote fallido ({processed['error']}), procesando updates de a uno"
+                        ))
+                        for update in updates:
+                            single = service.process_updates([update])
+                            if not single['success']:
+                                self.stdout.write(self.style.ERROR(
+                                    f"❌ Update {update.get('update_id')} descartado: {single['error']}"
+                                ))
+
+                    offset = updates[-1]['update_id'] + 1
+                    APIConfiguration.objects.filter(pk=service.config.pk).update(telegram_update_offset=offset)
+                    self.stdout.write(f'📥 {len(updates)} updates procesados (offset {offset})')
+
+                if options['once'] and len(updates) < limit:
+                    break
+        except KeyboardInterrupt:
+            self.stdout.write('⏹️ Long polling detenido')
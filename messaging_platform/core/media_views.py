@@ -0,0 +1,205 @@
+"""
+Archivos multimedia del chat (MEDIA_URL)
+
+Solo se sirven a quien puede ver alguna conversación con un mensaje que
+referencie el archivo (o con un token temporal, para el bridge). Soporta
+peticiones condicionales (ETag / Last-Modified → 304) y Range (206), así
+los audios y videos empiezan a reproducirse sin descargarse enteros.
+
+Con MEDIA_ACCEL_REDIRECT el servidor web entrega el archivo
+(X-Accel-Redirect de nginx o X-Sendfile de Apache/lighttpd): Django solo
+comprueba permisos y el worker queda libre.
+"""
+import mimetypes
+import os
+import re
+from urllib.parse import quote
+
+from django.conf import settings
+from django.contrib.auth.views import redirect_to_login
+from django.db.models import Q
+from django.http import FileResponse, Http404, HttpResponse, StreamingHttpResponse
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, quote_etag
+from django.views.decorators.http import require_http_methods
+
+from .models import ArchivedMessage, MediaBlob, Message
+from .services.media_store import CAS_DIR, TMP_DIR, valid_media_token
+
+
+_CAS_FILE_RE = re.compile(CAS_DIR + r'/[0-9a-f]{2}/[0-9a-f]{2}/([0-9a-f]{64})(?:\.[a-z0-9.]+)?$')
+_RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+STREAM_CHUNK = 64 * 1024
+# Embudos que ve cada rol en el chat (chat_view, api_search_conversations) y en
+# funnels_view (ventas también abre recuperación), además de las asignadas al usuario
+ROLE_FUNNELS = {
+    'support': ['support'],
+    'sales': ['sales', 'recovery'],
+}
+# Bandeja de entrada (api_search_unassigned): conversaciones sin embudo, visibles para todos
+UNASSIGNED_FUNNELS = ['none', '']
+
+
+def _is_admin(user):
+    return user.role == 'admin' or user.is_superuser
+
+
+def _visible_messages(model, user):
+    """Mensajes (Message o ArchivedMessage) de las conversaciones que el usuario puede ver en el chat"""
+    return model.objects.filter(
+        Q(conversation__assigned_to=user) |
+        Q(conversation__funnel_type__in=ROLE_FUNNELS.get(user.role, []) + UNASSIGNED_FUNNELS)
+    )
+
+
+def can_view_message_media(user, **lookup):
+    """True si el usuario puede ver un mensaje (vivo o archivado) que cumple lookup (admin: cualquiera que exista)"""
+    return any(
+        (model.objects.all() if _is_admin(user) else _visible_messages(model, user)).filter(**lookup).exists()
+        for model in (Message, ArchivedMessage)
+    )
+
+
+def _can_view(request, relative_path, blob):
+    if _is_admin(request.user):
+        return True
+    if blob is not None:
+        lookup = {'media_blob': blob}
+    else:
+        # Archivos anteriores al almacén: el mensaje guarda la URL relativa o absoluta
+        url = f"{settings.MEDIA_URL}{relative_path}"
+        lookup = {'media_url__in': {url, f"{settings.MEDIA_DOMAIN}{url}", request.build_absolute_uri(url)}}
+    return can_view_message_media(request.user, **lookup)
+
+
+def _resolve(relative_path):
+    """Ruta absoluta dentro de MEDIA_ROOT (Http404 si sale de él, es un temporal o no existe)"""
+    media_root = os.path.realpath(settings.MEDIA_ROOT)
+    absolute = os.path.realpath(os.path.join(media_root, relative_path))
+    if not absolute.startswith(media_root + os.sep) or not os.path.isfile(absolute):
+        raise Http404('Archivo no encontrado')
+    if os.path.relpath(absolute, media_root).startswith(TMP_DIR + os.sep):
+        raise Http404('Archivo no encontrado')
+    return absolute
+
+
+def _byte_range(range_header, size):
+    """(inicio, fin) inclusivos del Range, None si no aplica, o 'invalid' si no se puede satisfacer"""
+    match = _RANGE_RE.match(range_header.strip())
+    if not match:
+        # Varios rangos u otras unidades: se responde el archivo completo
+        return None
+    first, last = match.groups()
+    if not first and not last:
+        return None
+    if not first:
+        # Sufijo: los últimos N bytes
+        length = int(last)
+        if length == 0:
+            return 'invalid'
+        return max(size - length, 0), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or start > end:
+        return 'invalid'
+    return start, end
+
+
+def _file_range(absolute, start, length):
+    with open(absolute, 'rb') as media_file:
+        media_file.seek(start)
+        while length > 0:
+            chunk = media_file.read(min(STREAM_CHUNK, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+
+
+def _accel_response(relative_path, absolute, content_type):
+    mode = getattr(settings, 'MEDIA_ACCEL_REDIRECT', '')
+    if mode == 'x-accel':
+        response = HttpResponse(content_type=content_type)
+        # nginx entrega el archivo y atiende él mismo Range y las condicionales
+        response['X-Accel-Redirect'] = f"{settings.MEDIA_ACCEL_PREFIX}{quote(relative_path)}"
+        return response
+    if mode == 'x-sendfile':
+        response = HttpResponse(content_type=content_type)
+        response['X-Sendfile'] = absolute
+        return response
+    return None
+
+
+@require_http_methods(["GET", "HEAD"])
+def serve_media(request, path):
+    """Archivo de MEDIA_ROOT con control de acceso, Range y peticiones condicionales"""
+    match = _CAS_FILE_RE.match(path)
+    blob = MediaBlob.objects.filter(sha256=match.group(1)).first() if match else None
+
+    token = request.GET.get('token')
+    if token:
+        if not valid_media_token(path, token):
+            return HttpResponse('Token no válido o caducado', status=403)
+    elif not request.user.is_authenticated:
+        return redirect_to_login(request.get_full_path())
+    elif not _can_view(request, path, blob):
+        return HttpResponse('No tienes acceso a este archivo', status=403)
+
+    absolute = _resolve(path)
+    stat = os.stat(absolute)
+    is_thumbnail = path.endswith('.thumb.webp')
+    if blob is not None and not is_thumbnail:
+        content_type = blob.content_type or 'application/octet-stream'
+    else:
+        content_type = mimetypes.guess_type(absolute)[0] or 'application/octet-stream'
+
+    if blob is not None:
+        # En el almacén el nombre es el hash: el contenido de una ruta no cambia
+        etag = quote_etag(f"{blob.sha256}-thumb" if is_thumbnail else blob.sha256)
+    else:
+        etag = quote_etag(f"{int(stat.st_mtime)}-{stat.st_size}")
+
+    def finish(response):
+        response['ETag'] = etag
+        response['Last-Modified'] = http_date(stat.st_mtime)
+        response['Accept-Ranges'] = 'bytes'
+        if blob is not None:
+            patch_cache_control(response, private=True, max_age=365 * 24 * 3600, immutable=True)
+        else:
+            patch_cache_control(response, private=True, max_age=3600)
+        return response
+
+    not_modified = get_conditional_response(request, etag=etag, last_modified=int(stat.st_mtime))
+    if not_modified is not None:
+        return finish(not_modified)
+
+    accel = _accel_response(path, absolute, content_type)
+    if accel is not None:
+        return finish(accel)
+
+    size = stat.st_size
+    range_header = request.META.get('HTTP_RANGE')
+    if_range = request.META.get('HTTP_IF_RANGE')
+    byte_range = None
+    if range_header and (not if_range or if_range == etag):
+        byte_range = _byte_range(range_header, size)
+
+    if byte_range == 'invalid':
+        response = HttpResponse(status=416)
+        response['Content-Range'] = f'bytes */{size}'
+        return finish(response)
+
+    if request.method == 'HEAD':
+        response = HttpResponse(content_type=content_type)
+        response['Content-Length'] = str(size)
+        return finish(response)
+
+    if byte_range is None:
+        return finish(FileResponse(open(absolute, 'rb'), content_type=content_type))
+
+    start, end = byte_range
+    length = end - start + 1
+    response = StreamingHttpResponse(_file_range(absolute, start, length), status=206, content_type=content_type)
+    response['Content-Range'] = f'bytes {start}-{end}/{size}'
+    response['Content-Length'] = str(length)
+    return finish(response)
@@ -0,0 +1,45 @@
+# Generated by Django 5.2.7 on 2026-10-19 16:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_remove_contact_google_contact_checked_and_more'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='conversation',
+            index=models.Index(fields=['status', 'funnel_type', '-needs_response', '-last_message_at'], name='conv_status_funnel_resp_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='conversation',
+            index=models.Index(fields=['status', 'funnel_type', '-updated_at'], name='conv_status_funnel_upd_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='conversation',
+            index=models.Index(fields=['contact', 'status'], name='conv_contact_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='conversation',
+            index=models.Index(condition=models.Q(('status', 'active')), fields=['funnel_type', 'funnel_stage', '-last_message_at'], name='conv_active_funnel_stage_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='conversation',
+            index=models.Index(condition=models.Q(('assigned_to__isnull', True), ('status', 'active')), fields=['funnel_type', '-last_message_at'], name='conv_active_unassigned_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='message',
+            index=models.Index(fields=['conversation', 'created_at'], name='msg_conv_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='message',
+            index=models.Index(fields=['conversation', 'sender_type', 'created_at'], name='msg_conv_sender_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='reminder',
+            index=models.Index(fields=['user', 'is_completed', 'reminder_date'], name='rem_user_done_date_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.7 on 2026-10-19 16:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0011_campaigns'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='contact',
+            name='custom_fields',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 5.2.7 on 2026-10-19 16:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0012_contact_custom_fields'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='message',
+            name='media_file_id',
+            field=models.CharField(blank=True, max_length=255, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='message',
+            index=models.Index(condition=models.Q(('media_file_id__isnull', False)), fields=['media_file_id'], name='msg_media_file_id_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.7 on 2026-10-19 16:29
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0013_message_media_file_id'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='apiconfiguration',
+            name='telegram_update_offset',
+            field=models.BigIntegerField(default=0),
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.2.7 on 2026-10-19 16:30
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0014_telegram_update_offset'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ScheduledMessage',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('content', models.TextField()),
+                ('send_at', models.DateTimeField()),
+                ('status', models.CharField(choices=[('pending', 'Pendiente'), ('dispatched', 'Enviado al outbox'), ('cancelled', 'Cancelado')], default='pending', max_length=12)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('conversation', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='scheduled_messages', to='core.conversation')),
+                ('created_by', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='scheduled_messages', to=settings.AUTH_USER_MODEL)),
+                ('message', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='scheduled_from', to='core.message')),
+                ('recovery_case', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='scheduled_messages', to='core.recoverycase')),
+            ],
+            options={
+                'db_table': 'scheduled_messages',
+                'ordering': ['send_at'],
+                'indexes': [models.Index(condition=models.Q(('status', 'pending')), fields=['send_at', 'id'], name='sched_msg_pending_idx'), models.Index(fields=['conversation', 'status'], name='sched_msg_conv_status_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.7 on 2026-10-19 16:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0015_scheduled_messages'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MediaBlob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('sha256', models.CharField(max_length=64, unique=True)),
+                ('path', models.CharField(max_length=255)),
+                ('size', models.BigIntegerField()),
+                ('content_type', models.CharField(blank=True, max_length=100)),
+                ('original_name', models.CharField(blank=True, max_length=255)),
+                ('ref_count', models.PositiveIntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('last_referenced_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'db_table': 'media_blobs',
+                'indexes': [models.Index(condition=models.Q(('ref_count', 0)), fields=['created_at'], name='media_blob_unref_idx')],
+            },
+        ),
+    ]
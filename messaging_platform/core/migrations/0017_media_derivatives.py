@@ -0,0 +1,47 @@
+# Generated by Django 5.2.7 on 2026-10-19 16:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0016_media_blobs'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='mediablob',
+            name='derivatives_status',
+            field=models.CharField(choices=[('pending', 'Pendiente'), ('processing', 'Procesando'), ('ready', 'Lista'), ('skipped', 'No aplica'), ('failed', 'Fallida')], default='pending', max_length=10),
+        ),
+        migrations.AddField(
+            model_name='mediablob',
+            name='derivatives_updated_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='mediablob',
+            name='height',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='mediablob',
+            name='placeholder',
+            field=models.TextField(blank=True),
+        ),
+        migrations.AddField(
+            model_name='mediablob',
+            name='thumbnail_path',
+            field=models.CharField(blank=True, max_length=255),
+        ),
+        migrations.AddField(
+            model_name='mediablob',
+            name='width',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='mediablob',
+            index=models.Index(condition=models.Q(('derivatives_status__in', ['pending', 'processing'])), fields=['derivatives_status', 'id'], name='media_blob_deriv_queue_idx'),
+        ),
+    ]
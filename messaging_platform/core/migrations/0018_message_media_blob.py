@@ -0,0 +1,32 @@
+# Generated by Django 5.2.7 on 2026-10-19 16:43
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def link_existing_messages(apps, schema_editor):
+    """Enlaza los mensajes ya guardados con su archivo del almacén"""
+    MediaBlob = apps.get_model('core', 'MediaBlob')
+    Message = apps.get_model('core', 'Message')
+    for blob_id, sha256 in MediaBlob.objects.values_list('id', 'sha256').iterator():
+        Message.objects.filter(media_url__contains=sha256).update(media_blob_id=blob_id)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0017_media_derivatives'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='message',
+            name='media_blob',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='messages', to='core.mediablob'),
+        ),
+        migrations.AddIndex(
+            model_name='message',
+            index=models.Index(condition=models.Q(('media_url__isnull', False)), fields=['media_url'], name='msg_media_url_idx'),
+        ),
+        migrations.RunPython(link_existing_messages, migrations.RunPython.noop),
+    ]
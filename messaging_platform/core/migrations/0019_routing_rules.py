@@ -0,0 +1,40 @@
+# Generated by Django 5.2.7 on 2026-10-19 16:49
+
+from django.db import migrations, models
+
+
+def seed_rules(apps, schema_editor):
+    """Reglas de las dos líneas que antes estaban fijas en ContactClassificationService"""
+    RoutingRule = apps.get_model('core', 'RoutingRule')
+    RoutingRule.objects.create(name='Línea de ventas', phone_number='573243230276', department='sales')
+    RoutingRule.objects.create(name='Línea de soporte', phone_number='573022620031', department='support')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0018_message_media_blob'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RoutingRule',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100)),
+                ('phone_number', models.CharField(blank=True, help_text='Número del negocio (solo dígitos, con código de país); vacío = todas las líneas', max_length=30)),
+                ('keyword', models.CharField(blank=True, help_text='Solo si el mensaje contiene este texto', max_length=100)),
+                ('country', models.CharField(blank=True, help_text='Solo si el país del contacto coincide', max_length=100)),
+                ('department', models.CharField(choices=[('sales', 'Ventas'), ('support', 'Soporte'), ('recovery', 'Recuperación'), ('none', 'Ninguno')], max_length=20)),
+                ('priority', models.PositiveIntegerField(default=100, help_text='Menor valor = se evalúa antes')),
+                ('is_active', models.BooleanField(default=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'db_table': 'routing_rules',
+                'ordering': ['priority', 'id'],
+            },
+        ),
+        migrations.RunPython(seed_rules, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 5.2.7 on 2026-10-19 16:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0019_routing_rules'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='conversation',
+            name='department',
+            field=models.CharField(choices=[('support', 'Soporte'), ('sales', 'Ventas')], default='support', max_length=20),
+        ),
+        migrations.AddIndex(
+            model_name='conversation',
+            index=models.Index(fields=['department', 'status', '-last_message_at'], name='conv_department_status_idx'),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.7 on 2026-10-19 16:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0020_conversation_department'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StageRule',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100)),
+                ('funnel_type', models.CharField(choices=[('sales', 'Ventas'), ('support', 'Soporte'), ('recovery', 'Recuperación'), ('none', 'Ninguno')], max_length=20)),
+                ('target_stage', models.CharField(choices=[('sales_initial', 'Chat Inicial'), ('sales_negotiation', 'Negociación'), ('sales_debate', 'Debate'), ('sales_closing', 'Finalización'), ('support_initial', 'Contacto Inicial'), ('support_process', 'Proceso de Soporte'), ('support_closing', 'Finalización'), ('recovery_initial', 'Contacto Inicial'), ('recovery_evaluation', 'Evaluación'), ('recovery_proposal', 'Propuesta'), ('recovery_followup', 'Seguimiento'), ('recovery_closing', 'Cierre'), ('none', 'Sin Embudo')], max_length=30)),
+                ('phrases', models.TextField(help_text='Una palabra o frase por línea (sin distinguir mayúsculas ni tildes)')),
+                ('direction', models.CharField(choices=[('inbound', 'Mensajes del contacto'), ('outbound', 'Mensajes del agente'), ('both', 'Ambos')], default='both', max_length=10)),
+                ('mode', models.CharField(choices=[('suggest', 'Sugerir'), ('apply', 'Aplicar')], default='suggest', max_length=10)),
+                ('priority', models.PositiveIntegerField(default=100, help_text='Menor valor = gana si varias reglas coinciden')),
+                ('is_active', models.BooleanField(default=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'db_table': 'stage_rules',
+                'ordering': ['funnel_type', 'priority', 'id'],
+            },
+        ),
+    ]
@@ -0,0 +1,51 @@
+# Generated by Django 5.2.7 on 2026-10-19 16:55
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def create_loads(apps, schema_editor):
+    """Filas de carga de los agentes existentes con sus conversaciones activas"""
+    AgentLoad = apps.get_model('core', 'AgentLoad')
+    Conversation = apps.get_model('core', 'Conversation')
+    User = apps.get_model('core', 'User')
+    counts = dict(
+        Conversation.objects.filter(status='active', assigned_to__isnull=False)
+        .values_list('assigned_to').annotate(total=Count('id')).order_by()
+    )
+    AgentLoad.objects.bulk_create([
+        AgentLoad(
+            user_id=user.id,
+            department=user.role,
+            is_available=user.is_active and user.is_active_chat,
+            open_conversations=counts.get(user.id, 0),
+        )
+        for user in User.objects.filter(role__in=['sales', 'support'])
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0021_stage_rules'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AgentLoad',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='load', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('department', models.CharField(choices=[('support', 'Soporte'), ('sales', 'Ventas')], max_length=20)),
+                ('is_available', models.BooleanField(default=False)),
+                ('open_conversations', models.PositiveIntegerField(default=0)),
+                ('last_assigned_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'db_table': 'agent_loads',
+                'indexes': [models.Index(models.F('department'), models.F('open_conversations'), models.OrderBy(models.F('last_assigned_at'), nulls_first=True), models.F('user_id'), condition=models.Q(('is_available', True)), name='agent_load_least_idx'), models.Index(models.F('department'), models.OrderBy(models.F('last_assigned_at'), nulls_first=True), models.F('user_id'), condition=models.Q(('is_available', True)), name='agent_load_rr_idx')],
+            },
+        ),
+        migrations.RunPython(create_loads, migrations.RunPython.noop),
+    ]
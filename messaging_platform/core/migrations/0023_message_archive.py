@@ -0,0 +1,69 @@
+# Generated by Django 5.2.7 on 2026-10-19 16:57
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0022_agent_loads'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedMessage',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('platform_message_id', models.CharField(max_length=255)),
+                ('sender_type', models.CharField(choices=[('contact', 'Contacto'), ('agent', 'Agente')], max_length=10)),
+                ('message_type', models.CharField(choices=[('text', 'Texto'), ('image', 'Imagen'), ('video', 'Video'), ('audio', 'Audio'), ('document', 'Documento'), ('location', 'Ubicación')], default='text', max_length=20)),
+                ('content', models.TextField()),
+                ('media_url', models.URLField(blank=True, null=True)),
+                ('media_file_id', models.CharField(blank=True, max_length=255, null=True)),
+                ('is_read', models.BooleanField(default=False)),
+                ('created_at', models.DateTimeField()),
+                ('delivery_status', models.CharField(blank=True, choices=[('queued', 'En cola'), ('sending', 'Enviando'), ('sent', 'Enviado'), ('failed', 'Fallido')], max_length=10, null=True)),
+                ('delivery_attempts', models.PositiveSmallIntegerField(default=0)),
+                ('delivery_error', models.TextField(blank=True, null=True)),
+                ('next_attempt_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'db_table': 'archived_messages',
+                'ordering': ['created_at'],
+            },
+        ),
+        migrations.AddField(
+            model_name='conversation',
+            name='archived_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='conversation',
+            index=models.Index(condition=models.Q(('archived_at__isnull', True), ('status', 'closed')), fields=['updated_at'], name='conv_closed_unarchived_idx'),
+        ),
+        migrations.AddField(
+            model_name='archivedmessage',
+            name='conversation',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_messages', to='core.conversation'),
+        ),
+        migrations.AddField(
+            model_name='archivedmessage',
+            name='media_blob',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='archived_messages', to='core.mediablob'),
+        ),
+        migrations.AddField(
+            model_name='archivedmessage',
+            name='sender_user',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='archived_messages', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddIndex(
+            model_name='archivedmessage',
+            index=models.Index(fields=['conversation', 'created_at'], name='archived_msg_conv_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='archivedmessage',
+            index=models.Index(condition=models.Q(('media_url__isnull', False)), fields=['media_url'], name='archived_msg_media_url_idx'),
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.2.7 on 2026-10-19 17:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0023_message_archive'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='conversation',
+            name='conv_closed_unarchived_idx',
+        ),
+        migrations.AddIndex(
+            model_name='conversation',
+            index=models.Index(condition=models.Q(('status', 'closed'), models.Q(('archived_at__isnull', True), ('archived_at__lt', models.F('updated_at')), _connector='OR')), fields=['updated_at'], name='conv_closed_unarchived_idx'),
+        ),
+    ]
@@ -1,3 +1,4 @@
+from django.conf import settings
 from django.db import models
 from django.contrib.auth.models import AbstractUser
 from django.utils import timezone
@@ -44,6 +45,9 @@ class Contact(models.Model):
     google_contact_id = models.CharField(max_length=255, blank=True, null=True, help_text="ID del contacto en Google Contacts")
     google_last_sync = models.DateTimeField(blank=True, null=True, help_text="Última vez que se sincronizó con Google Contacts")
     
+    # Datos adicionales usados en plantillas como {{campo.<clave>}}
+    custom_fields = models.JSONField(default=dict, blank=True)
+    
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
@@ -364,6 +368,13 @@ class Conversation(models.Model):
         ('none', 'Ninguno')
     ]
     
+    # Cola de trabajo (ventas o soporte), resuelta al guardar a partir del
+    # embudo, el lead y el número (ver ContactClassificationService.resolve_department)
+    DEPARTMENT_CHOICES = [
+        ('support', 'Soporte'),
+        ('sales', 'Ventas')
+    ]
+    
     FUNNEL_STAGE_CHOICES = [
         # Ventas
         ('sales_initial', 'Chat Inicial'),
@@ -390,6 +401,9 @@ class Conversation(models.Model):
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='active')
     funnel_type = models.CharField(max_length=20, choices=FUNNEL_CHOICES, default='none')
     funnel_stage = models.CharField(max_length=30, choices=FUNNEL_STAGE_CHOICES, default='none')
+    department = models.CharField(max_length=20, choices=DEPARTMENT_CHOICES, default='support')
+    # Fecha en que sus mensajes pasaron a la tabla de archivo (archive_conversations)
+    archived_at = models.DateTimeField(null=True, blank=True)
     last_message_at = models.DateTimeField(null=True, blank=True)
     first_response_at = models.DateTimeField(null=True, blank=True)
     last_response_at = models.DateTimeField(null=True, blank=True)
@@ -400,10 +414,65 @@ class Conversation(models.Model):
     
     class Meta:
         db_table = 'conversations'
+        indexes = [
+            # Listados de chat/dashboard: status + departamento, ordenado por prioridad
+            models.Index(
+                fields=['status', 'funnel_type', '-needs_response', '-last_message_at'],
+                name='conv_status_funnel_resp_idx',
+            ),
+            # Dashboard: conversaciones recientes por actualización
+            models.Index(
+                fields=['status', 'funnel_type', '-updated_at'],
+                name='conv_status_funnel_upd_idx',
+            ),
+            # Candidatas a archivar: cerradas y sin archivar desde su último cambio
+            # (una reabierta y vuelta a cerrar tiene mensajes nuevos que archivar)
+            models.Index(
+                fields=['updated_at'],
+                name='conv_closed_unarchived_idx',
+                condition=models.Q(status='closed') & (
+                    models.Q(archived_at__isnull=True) | models.Q(archived_at__lt=models.F('updated_at'))
+                ),
+            ),
+            # Colas por departamento
+            models.Index(
+                fields=['department', 'status', '-last_message_at'],
+                name='conv_department_status_idx',
+            ),
+            # Webhooks: conversación activa de un contacto (get_or_create)
+            models.Index(fields=['contact', 'status'], name='conv_contact_status_idx'),
+            # Embudos: solo conversaciones activas por tipo y etapa
+            models.Index(
+                fields=['funnel_type', 'funnel_stage', '-last_message_at'],
+                name='conv_active_funnel_stage_idx',
+                condition=models.Q(status='active'),
+            ),
+            # Bandeja de entrada: activas sin asignar
+            models.Index(
+                fields=['funnel_type', '-last_message_at'],
+                name='conv_active_unassigned_idx',
+                condition=models.Q(status='active', assigned_to__isnull=True),
+            ),
+        ]
     
     def __str__(self):
         return f"Conversación {self.id} - {self.contact.name}"
     
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Agente y estado con los que se cargó: las señales ajustan AgentLoad al cambiar
+        if 'assigned_to_id' in instance.__dict__ and 'status' in instance.__dict__:
+            instance._loaded_assignment = (instance.assigned_to_id, instance.status)
+        # Campos de los que depende department: solo se resuelve de nuevo si cambian
+        if all(field in instance.__dict__ for field in ('funnel_type', 'lead_id', 'contact_id')):
+            instance._loaded_department = instance.department_key()
+        return instance
+    
+    def department_key(self):
+        """Valores de los que depende department (core/signals.py)"""
+        return (self.funnel_type, self.lead_id, self.contact_id)
+    
     def calculate_response_time(self):
         """Calcula el tiempo de respuesta en segundos"""
         if self.first_response_at and self.created_at:
@@ -416,12 +485,13 @@ class Conversation(models.Model):
         """
         from django.utils import timezone
         from datetime import timedelta
+        from .services.conversation_queries import contact_messages
         
         if not self.needs_response or not self.last_message_at:
             return False
         
         # Obtener el último mensaje del contacto (no del agente)
-        last_contact_message = self.messages.filter(sender_type='contact').order_by('-created_at').first()
+        last_contact_message = contact_messages(self).first()
         
         if not last_contact_message:
             return False
@@ -442,7 +512,8 @@ class Message(models.Model):
         ('location', 'Ubicación')
     ]
     
-    conversation = models.ForeignKey(Conversation, on_delete=models.CASCADE, related_name='messages')
+    # Sin índice propio: msg_conv_created_idx empieza por conversation y cubre las mismas búsquedas
+    conversation = models.ForeignKey(Conversation, on_delete=models.CASCADE, related_name='messages', db_index=False)
     platform_message_id = models.CharField(max_length=255, unique=True)
     sender_type = models.CharField(max_length=10, choices=[
         ('contact', 'Contacto'),
@@ -452,12 +523,57 @@ class Message(models.Model):
     message_type = models.CharField(max_length=20, choices=MESSAGE_TYPE_CHOICES, default='text')
     content = models.TextField()
     media_url = models.URLField(blank=True, null=True)
+    # Archivo del almacén multimedia al que apunta media_url (lo asignan las señales de Message)
+    media_blob = models.ForeignKey('MediaBlob', on_delete=models.SET_NULL, null=True, blank=True, related_name='messages')
+    # Referencia del archivo en la plataforma (file_id de Telegram); la URL se resuelve al verlo
+    media_file_id = models.CharField(max_length=255, blank=True, null=True)
     is_read = models.BooleanField(default=False)
     created_at = models.DateTimeField(auto_now_add=True)
     
+    # Outbox: estado de entrega de los mensajes enviados por agentes (None en mensajes entrantes)
+    DELIVERY_STATUS_CHOICES = [
+        ('queued', 'En cola'),
+        ('sending', 'Enviando'),
+        ('sent', 'Enviado'),
+        ('failed', 'Fallido'),
+    ]
+    delivery_status = models.CharField(max_length=10, choices=DELIVERY_STATUS_CHOICES, null=True, blank=True)
+    delivery_attempts = models.PositiveSmallIntegerField(default=0)
+    delivery_error = models.TextField(blank=True, null=True)
+    next_attempt_at = models.DateTimeField(null=True, blank=True)
+    
     class Meta:
         db_table = 'messages'
         ordering = ['created_at']
+        indexes = [
+            # Historial de la conversación y último mensaje (preview)
+            models.Index(fields=['conversation', 'created_at'], name='msg_conv_created_idx'),
+            # Último mensaje del contacto (is_overdue) y marcado de leídos
+            models.Index(fields=['conversation', 'sender_type', 'created_at'], name='msg_conv_sender_created_idx'),
+            # Outbox: mensajes pendientes de entrega (índice parcial, pequeño)
+            models.Index(
+                fields=['next_attempt_at'],
+                name='msg_outbox_pending_idx',
+                condition=models.Q(delivery_status__in=['queued', 'sending']),
+            ),
+            models.Index(
+                fields=['conversation', 'id'],
+                name='msg_outbox_conv_pending_idx',
+                condition=models.Q(delivery_status__in=['queued', 'sending']),
+            ),
+            # Archivos de Telegram pendientes de resolver (vista de media y resolve_telegram_media)
+            models.Index(
+                fields=['media_file_id'],
+                name='msg_media_file_id_idx',
+                condition=models.Q(media_file_id__isnull=False),
+            ),
+            # Permisos de los archivos anteriores al almacén multimedia (vista de media)
+            models.Index(
+                fields=['media_url'],
+                name='msg_media_url_idx',
+                condition=models.Q(media_url__isnull=False),
+            ),
+        ]
     
     def __str__(self):
         return f"{self.sender_type}: {self.content[:50]}..."
@@ -494,6 +610,10 @@ class Reminder(models.Model):
     class Meta:
         db_table = 'reminders'
         ordering = ['reminder_date']
+        indexes = [
+            # Recordatorios pendientes del usuario en el dashboard
+            models.Index(fields=['user', 'is_completed', 'reminder_date'], name='rem_user_done_date_idx'),
+        ]
     
     def __str__(self):
         return f"Recordatorio {self.id} - {self.title}"
@@ -534,6 +654,8 @@ class APIConfiguration(models.Model):
     # Telegram
     telegram_bot_token = models.CharField(max_length=255, blank=True, null=True)
     telegram_webhook_url = models.URLField(blank=True, null=True)
+    # Siguiente update_id a pedir en modo long polling (comando telegram_poll)
+    telegram_update_offset = models.BigIntegerField(default=0)
     
     is_active = models.BooleanField(default=True)
     created_at = models.DateTimeField(auto_now_add=True)
@@ -544,3 +666,354 @@ class APIConfiguration(models.Model):
     
     def __str__(self):
         return f"Config {self.platform.name}"
+
+
+class Campaign(models.Model):
+    """Campañas de envío masivo de una plantilla a un segmento de contactos"""
+    STATUS_CHOICES = [
+        ('draft', 'Borrador'),
+        ('running', 'En curso'),
+        ('paused', 'Pausada'),
+        ('completed', 'Completada'),
+        ('cancelled', 'Cancelada')
+    ]
+    
+    name = models.CharField(max_length=255)
+    template = models.ForeignKey(Template, on_delete=models.PROTECT, related_name='campaigns')
+    # Filtros del segmento: platform, department, funnel_stage, country, active_within_days, inactive_for_days
+    segment = models.JSONField(default=dict, blank=True)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='draft')
+    total_recipients = models.PositiveIntegerField(default=0)
+    created_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, related_name='campaigns')
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    completed_at = models.DateTimeField(null=True, blank=True)
+    
+    class Meta:
+        db_table = 'campaigns'
+        ordering = ['-created_at']
+    
+    def __str__(self):
+        return f"Campaña {self.name} ({self.get_status_display()})"
+
+
+class CampaignRecipient(models.Model):
+    """
+    Destinatario de una campaña
+    
+    El estado de entrega real se lee del mensaje del outbox (message.delivery_status).
+    """
+    STATUS_CHOICES = [
+        ('pending', 'Pendiente'),
+        ('queued', 'En cola'),
+        ('skipped', 'Omitido')
+    ]
+    
+    campaign = models.ForeignKey(Campaign, on_delete=models.CASCADE, related_name='recipients')
+    contact = models.ForeignKey(Contact, on_delete=models.CASCADE, related_name='campaign_recipients')
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
+    message = models.ForeignKey(Message, on_delete=models.SET_NULL, null=True, blank=True, related_name='campaign_recipients')
+    error = models.TextField(blank=True, null=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        db_table = 'campaign_recipients'
+        constraints = [
+            models.UniqueConstraint(fields=['campaign', 'contact'], name='campaign_recipient_unique'),
+        ]
+        indexes = [
+            # Siguiente lote de pendientes del runner
+            models.Index(
+                fields=['campaign', 'id'],
+                name='camp_rcpt_pending_idx',
+                condition=models.Q(status='pending'),
+            ),
+        ]
+    
+    def __str__(self):
+        return f"{self.campaign_id} → {self.contact_id} ({self.status})"
+
+
+class RateLimitBucket(models.Model):
+    """
+    Estado compartido de un token bucket (campaign_service.TokenBucket)
+
+    Una fila por bucket (p. ej. 'delivery:whatsapp'); se bloquea con
+    select_for_update al tomar tokens, así el límite es el mismo con
+    cualquier número de workers.
+    """
+    key = models.CharField(max_length=50, primary_key=True)
+    tokens = models.FloatField()
+    updated_at = models.DateTimeField()
+    
+    class Meta:
+        db_table = 'rate_limit_buckets'
+    
+    def __str__(self):
+        return f"{self.key}: {self.tokens:.2f}"
+
+
+class ScheduledMessage(models.Model):
+    """
+    Mensaje programado para enviarse en una fecha y hora
+    
+    Al llegar send_at el dispatcher (dispatch_scheduled) lo pasa al outbox,
+    que hace la entrega real.
+    """
+    STATUS_CHOICES = [
+        ('pending', 'Pendiente'),
+        ('dispatched', 'Enviado al outbox'),
+        ('cancelled', 'Cancelado')
+    ]
+    
+    conversation = models.ForeignKey(Conversation, on_delete=models.CASCADE, related_name='scheduled_messages')
+    recovery_case = models.ForeignKey(RecoveryCase, on_delete=models.SET_NULL, null=True, blank=True, related_name='scheduled_messages')
+    created_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, related_name='scheduled_messages')
+    content = models.TextField()
+    send_at = models.DateTimeField()
+    status = models.CharField(max_length=12, choices=STATUS_CHOICES, default='pending')
+    message = models.ForeignKey(Message, on_delete=models.SET_NULL, null=True, blank=True, related_name='scheduled_from')
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        db_table = 'scheduled_messages'
+        ordering = ['send_at']
+        indexes = [
+            # Próximos vencimientos del dispatcher (índice parcial: solo pendientes)
+            models.Index(
+                fields=['send_at', 'id'],
+                name='sched_msg_pending_idx',
+                condition=models.Q(status='pending'),
+            ),
+            models.Index(fields=['conversation', 'status'], name='sched_msg_conv_status_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.conversation_id} @ {self.send_at:%Y-%m-%d %H:%M} ({self.status})"
+
+
+class MediaBlob(models.Model):
+    """
+    Archivo multimedia almacenado por contenido (SHA-256)
+    
+    Cada contenido distinto se guarda una sola vez en
+    MEDIA_ROOT/cas/<2>/<2>/<sha256><ext>; ref_count cuenta los mensajes
+    cuyo media_url apunta a él.
+    
+    Las imágenes y videos tienen además una miniatura junto al original y un
+    placeholder diminuto (data URI) para pintar el chat sin descargar el
+    archivo completo; los genera generate_media_derivatives.
+    """
+    DERIVATIVES_STATUS_CHOICES = [
+        ('pending', 'Pendiente'),
+        ('processing', 'Procesando'),
+        ('ready', 'Lista'),
+        ('skipped', 'No aplica'),
+        ('failed', 'Fallida')
+    ]
+    
+    sha256 = models.CharField(max_length=64, unique=True)
+    path = models.CharField(max_length=255)  # Relativa a MEDIA_ROOT
+    size = models.BigIntegerField()
+    content_type = models.CharField(max_length=100, blank=True)
+    original_name = models.CharField(max_length=255, blank=True)  # Nombre de la primera subida
+    ref_count = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    last_referenced_at = models.DateTimeField(null=True, blank=True)
+    
+    # Miniatura y placeholder
+    derivatives_status = models.CharField(max_length=10, choices=DERIVATIVES_STATUS_CHOICES, default='pending')
+    derivatives_updated_at = models.DateTimeField(null=True, blank=True)
+    thumbnail_path = models.CharField(max_length=255, blank=True)  # Relativa a MEDIA_ROOT
+    placeholder = models.TextField(blank=True)  # data:image/jpeg;base64,...
+    width = models.PositiveIntegerField(null=True, blank=True)
+    height = models.PositiveIntegerField(null=True, blank=True)
+    
+    class Meta:
+        db_table = 'media_blobs'
+        indexes = [
+            # Cola del worker de miniaturas
+            models.Index(
+                fields=['derivatives_status', 'id'],
+                name='media_blob_deriv_queue_idx',
+                condition=models.Q(derivatives_status__in=['pending', 'processing']),
+            ),
+            # Archivos sin mensajes que los referencien
+            models.Index(
+                fields=['created_at'],
+                name='media_blob_unref_idx',
+                condition=models.Q(ref_count=0),
+            ),
+        ]
+    
+    def __str__(self):
+        return f"{self.sha256[:12]} ({self.size} bytes, {self.ref_count} refs)"
+    
+    @property
+    def url(self):
+        return f"{settings.MEDIA_URL}{self.path}"
+    
+    @property
+    def thumbnail_url(self):
+        return f"{settings.MEDIA_URL}{self.thumbnail_path}" if self.thumbnail_path else None
+
+
+class RoutingRule(models.Model):
+    """
+    Regla de enrutamiento de mensajes a departamentos
+
+    Asigna el departamento (funnel_type) según el número del negocio que
+    recibió el mensaje y, opcionalmente, una palabra clave del mensaje o el
+    país del contacto. Una regla sin número aplica a todas las líneas. Las
+    reglas se compilan en memoria (core.services.routing_service).
+    """
+    name = models.CharField(max_length=100)
+    phone_number = models.CharField(max_length=30, blank=True, help_text="Número del negocio (solo dígitos, con código de país); vacío = todas las líneas")
+    keyword = models.CharField(max_length=100, blank=True, help_text="Solo si el mensaje contiene este texto")
+    country = models.CharField(max_length=100, blank=True, help_text="Solo si el país del contacto coincide")
+    department = models.CharField(max_length=20, choices=Conversation.FUNNEL_CHOICES)
+    priority = models.PositiveIntegerField(default=100, help_text="Menor valor = se evalúa antes")
+    is_active = models.BooleanField(default=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'routing_rules'
+        ordering = ['priority', 'id']
+
+    def __str__(self):
+        return f"{self.name} → {self.department}"
+
+    def save(self, *args, **kwargs):
+        self.phone_number = ''.join(filter(str.isdigit, self.phone_number or ''))
+        super().save(*args, **kwargs)
+
+
+class StageRule(models.Model):
+    """
+    Regla de detección de etapa del embudo por palabras clave
+
+    Si un mensaje de una conversación del embudo contiene alguna de las
+    frases, la conversación pasa (o se sugiere que pase) a target_stage.
+    Las reglas se compilan en un autómata Aho-Corasick
+    (core.services.stage_detection).
+    """
+    DIRECTION_CHOICES = [
+        ('inbound', 'Mensajes del contacto'),
+        ('outbound', 'Mensajes del agente'),
+        ('both', 'Ambos')
+    ]
+    
+    MODE_CHOICES = [
+        ('suggest', 'Sugerir'),
+        ('apply', 'Aplicar')
+    ]
+    
+    name = models.CharField(max_length=100)
+    funnel_type = models.CharField(max_length=20, choices=Conversation.FUNNEL_CHOICES)
+    target_stage = models.CharField(max_length=30, choices=Conversation.FUNNEL_STAGE_CHOICES)
+    phrases = models.TextField(help_text="Una palabra o frase por línea (sin distinguir mayúsculas ni tildes)")
+    direction = models.CharField(max_length=10, choices=DIRECTION_CHOICES, default='both')
+    mode = models.CharField(max_length=10, choices=MODE_CHOICES, default='suggest')
+    priority = models.PositiveIntegerField(default=100, help_text="Menor valor = gana si varias reglas coinciden")
+    is_active = models.BooleanField(default=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        db_table = 'stage_rules'
+        ordering = ['funnel_type', 'priority', 'id']
+    
+    def __str__(self):
+        return f"{self.name} → {self.target_stage}"
+    
+    def phrase_list(self):
+        return [phrase.strip() for phrase in self.phrases.splitlines() if phrase.strip()]
+
+
+class AgentLoad(models.Model):
+    """
+    Carga de trabajo de un agente para la asignación automática
+
+    open_conversations es el número de conversaciones activas asignadas al
+    agente; lo mantienen las señales de Conversation con actualizaciones
+    atómicas (F) y lo recalcula auto_assign --rebuild-loads.
+    is_available refleja User.is_active y User.is_active_chat.
+    """
+    user = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True, related_name='load')
+    department = models.CharField(max_length=20, choices=Conversation.DEPARTMENT_CHOICES)
+    is_available = models.BooleanField(default=False)
+    open_conversations = models.PositiveIntegerField(default=0)
+    last_assigned_at = models.DateTimeField(null=True, blank=True)
+    
+    class Meta:
+        db_table = 'agent_loads'
+        indexes = [
+            # Menos conversaciones abiertas (y, a igualdad, el que hace más que no recibe)
+            models.Index(
+                models.F('department'),
+                models.F('open_conversations'),
+                models.F('last_assigned_at').asc(nulls_first=True),
+                models.F('user_id'),
+                name='agent_load_least_idx',
+                condition=models.Q(is_available=True),
+            ),
+            # Round-robin: el que hace más tiempo que no recibe una conversación
+            models.Index(
+                models.F('department'),
+                models.F('last_assigned_at').asc(nulls_first=True),
+                models.F('user_id'),
+                name='agent_load_rr_idx',
+                condition=models.Q(is_available=True),
+            ),
+        ]
+    
+    def __str__(self):
+        return f"{self.user_id} ({self.department}): {self.open_conversations} abiertas"
+
+
+class ArchivedMessage(models.Model):
+    """
+    Mensaje de una conversación cerrada, fuera de la tabla caliente
+
+    Mismas columnas e id que Message: archive_conversations mueve aquí los
+    mensajes de las conversaciones cerradas hace más de ARCHIVE_AFTER_DAYS
+    días y restore_conversation los devuelve. Los archivos multimedia siguen
+    referenciados (cuentan en MediaBlob.ref_count).
+    """
+    id = models.BigIntegerField(primary_key=True)  # El id original del mensaje
+    conversation = models.ForeignKey(Conversation, on_delete=models.CASCADE, related_name='archived_messages')
+    platform_message_id = models.CharField(max_length=255)
+    sender_type = models.CharField(max_length=10, choices=[
+        ('contact', 'Contacto'),
+        ('agent', 'Agente')
+    ])
+    sender_user = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='archived_messages')
+    message_type = models.CharField(max_length=20, choices=Message.MESSAGE_TYPE_CHOICES, default='text')
+    content = models.TextField()
+    media_url = models.URLField(blank=True, null=True)
+    media_blob = models.ForeignKey('MediaBlob', on_delete=models.SET_NULL, null=True, blank=True, related_name='archived_messages')
+    media_file_id = models.CharField(max_length=255, blank=True, null=True)
+    is_read = models.BooleanField(default=False)
+    created_at = models.DateTimeField()
+    delivery_status = models.CharField(max_length=10, choices=Message.DELIVERY_STATUS_CHOICES, null=True, blank=True)
+    delivery_attempts = models.PositiveSmallIntegerField(default=0)
+    delivery_error = models.TextField(blank=True, null=True)
+    next_attempt_at = models.DateTimeField(null=True, blank=True)
+    
+    class Meta:
+        db_table = 'archived_messages'
+        ordering = ['created_at']
+        indexes = [
+            models.Index(fields=['conversation', 'created_at'], name='archived_msg_conv_created_idx'),
+            # Permisos y limpieza de los archivos anteriores al almacén multimedia
+            models.Index(
+                fields=['media_url'],
+                name='archived_msg_media_url_idx',
+                condition=models.Q(media_url__isnull=False),
+            ),
+        ]
+    
+    def __str__(self):
+        return f"{self.sender_type}: {self.content[:50]}... (archivado)"
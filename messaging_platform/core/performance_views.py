@@ -0,0 +1,31 @@
+from django.http import JsonResponse
+from django.contrib.auth.decorators import login_required
+from django.views.decorators.http import require_http_methods
+from .decorators import admin_required
+from .instrumentation import slow_requests
+
+
+@login_required
+@admin_required
+@require_http_methods(["GET", "DELETE"])
+def slow_requests_view(request):
+    """
+    Requests más lentas registradas por PerformanceMiddleware en este proceso
+
+    GET: lista ordenada de mayor a menor duración (parámetro opcional limit)
+    DELETE: vacía el registro
+    """
+    if request.method == 'DELETE':
+        slow_requests.clear()
+        return JsonResponse({'success': True})
+
+    try:
+        limit = int(request.GET.get('limit', 0)) or None
+    except ValueError:
+        return JsonResponse({'success': False, 'error': 'limit debe ser un número'}, status=400)
+
+    return JsonResponse({
+        'success': True,
+        'capacity': slow_requests.size,
+        'requests': slow_requests.slowest(limit),
+    })
@@ -0,0 +1,90 @@
+from django.http import JsonResponse
+from django.contrib.auth.decorators import login_required
+from django.shortcuts import get_object_or_404
+from django.views.decorators.http import require_http_methods
+from .models import Conversation, RecoveryCase, ScheduledMessage, ActivityLog
+from .services.scheduler_service import SchedulingError, cancel_scheduled, parse_send_at, schedule_message
+import json
+
+
+def _scheduled_data(scheduled):
+    return {
+        'id': scheduled.id,
+        'conversation_id': scheduled.conversation_id,
+        'recovery_case_id': scheduled.recovery_case_id,
+        'content': scheduled.content,
+        'send_at': scheduled.send_at.isoformat(),
+        'status': scheduled.status,
+        'message_id': scheduled.message_id,
+        'created_by': scheduled.created_by.username if scheduled.created_by else None,
+    }
+
+
+@login_required
+@require_http_methods(["GET"])
+def api_conversation_scheduled(request, conversation_id):
+    """API para listar los mensajes programados pendientes de una conversación"""
+    conversation = get_object_or_404(Conversation, id=conversation_id)
+    scheduled = conversation.scheduled_messages.filter(status='pending').select_related('created_by')
+    return JsonResponse({'success': True, 'scheduled': [_scheduled_data(s) for s in scheduled]})
+
+
+@login_required
+@require_http_methods(["POST"])
+def api_schedule_message(request, conversation_id):
+    """
+    API para programar un mensaje
+
+    Body JSON: content, send_at (ISO 8601; sin zona se usa TIME_ZONE), recovery_case_id (opcional)
+    """
+    conversation = get_object_or_404(Conversation, id=conversation_id)
+
+    try:
+        data = json.loads(request.body)
+    except json.JSONDecodeError:
+        return JsonResponse({'success': False, 'error': 'JSON inválido'}, status=400)
+
+    recovery_case = None
+    if data.get('recovery_case_id'):
+        recovery_case = get_object_or_404(RecoveryCase, id=data['recovery_case_id'])
+
+    try:
+        scheduled = schedule_message(
+            conversation,
+            data.get('content'),
+            parse_send_at(data.get('send_at')),
+            user=request.user,
+            recovery_case=recovery_case,
+        )
+    except SchedulingError as e:
+        return JsonResponse({'success': False, 'error': str(e)}, status=400)
+
+    ActivityLog.objects.create(
+        user=request.user,
+        conversation=conversation,
+        action='schedule_message',
+        description=f'Mensaje programado para {scheduled.send_at:%Y-%m-%d %H:%M}'
+    )
+
+    return JsonResponse({'success': True, 'scheduled': _scheduled_data(scheduled)})
+
+
+@login_required
+@require_http_methods(["POST"])
+def api_cancel_scheduled(request, scheduled_id):
+    """API para cancelar un mensaje programado pendiente"""
+    scheduled = get_object_or_404(ScheduledMessage, id=scheduled_id)
+
+    try:
+        cancel_scheduled(scheduled)
+    except SchedulingError as e:
+        return JsonResponse({'success': False, 'error': str(e)}, status=400)
+
+    ActivityLog.objects.create(
+        user=request.user,
+        conversation_id=scheduled.conversation_id,
+        action='cancel_scheduled_message',
+        description=f'Mensaje programado {scheduled.id} cancelado'
+    )
+
+    return JsonResponse({'success': True, 'scheduled': _scheduled_data(scheduled)})
@@ -0,0 +1,147 @@
+"""
+Archivo de conversaciones cerradas (tabla caliente / tabla fría)
+
+Los mensajes de las conversaciones cerradas hace más de ARCHIVE_AFTER_DAYS
+días pasan de messages a archived_messages con el mismo id, así los índices
+de messages (y su VACUUM) solo cargan con las conversaciones vivas. Las
+conversaciones archivadas se siguen viendo (conversation_messages lee de
+las dos tablas) y se pueden buscar o restaurar cuando haga falta.
+
+Los mensajes archivados conservan su referencia al almacén multimedia: al
+archivar se vuelve a sumar la referencia que libera el borrado del Message.
+Las filas de campañas y mensajes programados que apuntaban al mensaje
+quedan sin él (on_delete=SET_NULL).
+"""
+from collections import Counter
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from ..models import ArchivedMessage, Conversation, MediaBlob, Message
+
+
+BATCH_SIZE = 1000
+# Columnas que se copian entre messages y archived_messages
+MESSAGE_FIELDS = [
+    'id', 'conversation_id', 'platform_message_id', 'sender_type', 'sender_user_id', 'message_type',
+    'content', 'media_url', 'media_blob_id', 'media_file_id', 'is_read', 'created_at',
+    'delivery_status', 'delivery_attempts', 'delivery_error', 'next_attempt_at',
+]
+
+
+def _copy(model, rows):
+    return [model(**{field: getattr(row, field) for field in MESSAGE_FIELDS}) for row in rows]
+
+
+def archive_candidates(days=None, now=None):
+    """
+    Conversaciones cerradas sin actividad desde hace más de `days` días y sin
+    archivar desde su último cambio
+
+    archive_conversation no toca updated_at: si es posterior a archived_at la
+    conversación se reabrió (y se volvió a cerrar) después de archivarla.
+    """
+    days = days if days is not None else getattr(settings, 'ARCHIVE_AFTER_DAYS', 90)
+    cutoff = (now or timezone.now()) - timedelta(days=days)
+    # Misma condición que el índice parcial conv_closed_unarchived_idx
+    return Conversation.objects.filter(
+        Q(archived_at__isnull=True) | Q(archived_at__lt=F('updated_at')),
+        status='closed',
+        updated_at__lt=cutoff,
+    )
+
+
+def archive_conversation(conversation_id):
+    """
+    Mueve los mensajes de la conversación a la tabla de archivo
+
+    Returns:
+        int: mensajes archivados (None si la conversación ya no está cerrada)
+    """
+    with transaction.atomic():
+        conversation = Conversation.objects.select_for_update().get(pk=conversation_id)
+        if conversation.status != 'closed':
+            return None
+
+        archived = 0
+        while True:
+            batch = list(Message.objects.filter(conversation=conversation).order_by('id')[:BATCH_SIZE])
+            if not batch:
+                break
+            ArchivedMessage.objects.bulk_create(_copy(ArchivedMessage, batch))
+            # delete() dispara las señales de Message, que liberan las referencias al
+            # almacén multimedia: el mensaje archivado las conserva
+            Message.objects.filter(id__in=[message.id for message in batch]).delete()
+            blobs = Counter(message.media_blob_id for message in batch if message.media_blob_id)
+            for blob_id, count in blobs.items():
+                MediaBlob.objects.filter(pk=blob_id).update(ref_count=F('ref_count') + count)
+            archived += len(batch)
+
+        # update() para no tocar updated_at ni disparar las señales de Conversation
+        Conversation.objects.filter(pk=conversation.pk).update(archived_at=timezone.now())
+    return archived
+
+
+def restore_conversation(conversation_id):
+    """
+    Devuelve los mensajes archivados de la conversación a la tabla messages
+
+    platform_message_id es único en messages y no en el archivo: si el mismo
+    mensaje de la plataforma volvió a guardarse después de archivar (reenvío,
+    recuperación de updates), se conserva el de messages y se descarta la
+    copia archivada.
+
+    Returns:
+        int: mensajes restaurados
+    """
+    with transaction.atomic():
+        conversation = Conversation.objects.select_for_update().get(pk=conversation_id)
+        restored = 0
+        while True:
+            batch = list(ArchivedMessage.objects.filter(conversation=conversation).order_by('id')[:BATCH_SIZE])
+            if not batch:
+                break
+            existing = set(Message.objects.filter(
+                platform_message_id__in=[message.platform_message_id for message in batch]
+            ).values_list('platform_message_id', flat=True))
+            duplicates = [message for message in batch if message.platform_message_id in existing]
+            if duplicates:
+                print(f"⚠️ Conversación {conversation.pk}: {len(duplicates)} mensaje(s) archivados ya están en messages, se descartan")
+                # La copia descartada libera su referencia al almacén multimedia
+                for blob_id, count in Counter(m.media_blob_id for m in duplicates if m.media_blob_id).items():
+                    MediaBlob.objects.filter(pk=blob_id, ref_count__gte=count).update(ref_count=F('ref_count') - count)
+                ArchivedMessage.objects.filter(id__in=[message.id for message in duplicates]).delete()
+                batch = [message for message in batch if message.platform_message_id not in existing]
+            messages = _copy(Message, batch)
+            # bulk_create no dispara señales: la referencia al almacén pasa tal cual del
+            # mensaje archivado al restaurado
+            Message.objects.bulk_create(messages)
+            # created_at tiene auto_now_add (bulk_create lo pisa): se restaura la fecha original
+            for message, archived_message in zip(messages, batch):
+                message.created_at = archived_message.created_at
+            Message.objects.bulk_update(messages, ['created_at'])
+            ArchivedMessage.objects.filter(id__in=[message.id for message in batch]).delete()
+            restored += len(batch)
+
+        Conversation.objects.filter(pk=conversation.pk).update(archived_at=None)
+    return restored
+
+
+def conversation_messages(conversation):
+    """Mensajes de la conversación en orden, incluidos los archivados"""
+    messages = conversation.messages.select_related('sender_user').order_by('created_at')
+    if conversation.archived_at is None:
+        return messages
+    archived = conversation.archived_messages.select_related('sender_user').order_by('created_at')
+    return list(archived) + list(messages)
+
+
+def search_archive(query, conversation_id=None, limit=50):
+    """Mensajes archivados que contienen `query` (más recientes primero)"""
+    results = ArchivedMessage.objects.filter(content__icontains=query)
+    if conversation_id:
+        results = results.filter(conversation_id=conversation_id)
+    return results.select_related('conversation__contact').order_by('-created_at')[:limit]
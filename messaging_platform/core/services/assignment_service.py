@@ -0,0 +1,137 @@
+"""
+Asignación automática de conversaciones a agentes
+
+Cada departamento usa la estrategia de AUTO_ASSIGN_STRATEGIES:
+- 'round_robin': el agente disponible que hace más tiempo que no recibe una.
+- 'least_loaded': el agente disponible con menos conversaciones abiertas.
+
+La decisión lee una sola fila de AgentLoad por un índice parcial (solo
+agentes disponibles), sin COUNT por decisión: cuesta lo mismo con 5 que
+con 500 agentes. La fila se bloquea con SELECT ... FOR UPDATE SKIP LOCKED,
+así dos webhooks simultáneos no eligen al mismo agente a la vez (si todos
+están bloqueados se espera al primero), y la conversación solo se asigna si
+sigue sin agente (actualización condicional).
+
+Los contadores se mantienen con actualizaciones atómicas desde las señales
+de Conversation (asignar, reasignar, cerrar, borrar).
+"""
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, F
+from django.utils import timezone
+
+from ..models import ActivityLog, AgentLoad, Conversation, User
+
+
+STRATEGIES = ('round_robin', 'least_loaded')
+
+
+def _ordering(strategy):
+    last_assigned = F('last_assigned_at').asc(nulls_first=True)
+    if strategy == 'least_loaded':
+        return ['open_conversations', last_assigned, 'user_id']
+    return [last_assigned, 'user_id']
+
+
+def strategy_for(department):
+    """Estrategia configurada para el departamento (None = asignación manual)"""
+    strategy = getattr(settings, 'AUTO_ASSIGN_STRATEGIES', {}).get(department)
+    return strategy if strategy in STRATEGIES else None
+
+
+def sync_agent(user):
+    """Crea o actualiza la fila de carga del agente a partir de su rol y disponibilidad"""
+    department = user.role if user.role in dict(Conversation.DEPARTMENT_CHOICES) else None
+    if department is None:
+        # Los administradores no reciben conversaciones automáticamente
+        AgentLoad.objects.filter(user=user).update(is_available=False)
+        return
+    AgentLoad.objects.update_or_create(
+        user=user,
+        defaults={'department': department, 'is_available': user.is_active and user.is_active_chat},
+    )
+
+
+def move_conversation(old_agent_id, new_agent_id):
+    """Pasa una conversación abierta de un agente a otro en los contadores (cualquiera puede ser None)"""
+    if old_agent_id:
+        AgentLoad.objects.filter(user_id=old_agent_id, open_conversations__gt=0).update(
+            open_conversations=F('open_conversations') - 1
+        )
+    if new_agent_id:
+        AgentLoad.objects.filter(user_id=new_agent_id).update(open_conversations=F('open_conversations') + 1)
+
+
+def _pick_agent(department, strategy):
+    candidates = AgentLoad.objects.filter(department=department, is_available=True)
+    max_open = getattr(settings, 'AUTO_ASSIGN_MAX_OPEN', 0)
+    if max_open:
+        candidates = candidates.filter(open_conversations__lt=max_open)
+    candidates = candidates.order_by(*_ordering(strategy))
+    # Si todos los candidatos están bloqueados por otros webhooks se espera al primero
+    return candidates.select_for_update(skip_locked=True).first() or candidates.select_for_update().first()
+
+
+def auto_assign(conversation):
+    """
+    Asigna la conversación según la estrategia de su departamento
+
+    Actualiza también la instancia recibida, así un save() posterior de
+    quien la creó (el webhook) no deshace la asignación.
+
+    Returns:
+        int: id del agente asignado (None si no hay estrategia, agente disponible o ya estaba asignada)
+    """
+    strategy = strategy_for(conversation.department)
+    if strategy is None or conversation.assigned_to_id or conversation.status != 'active':
+        return None
+
+    with transaction.atomic():
+        load = _pick_agent(conversation.department, strategy)
+        if load is None:
+            return None
+        assigned = Conversation.objects.filter(pk=conversation.pk, assigned_to__isnull=True).update(
+            assigned_to=load.user_id
+        )
+        if not assigned:
+            return None
+        AgentLoad.objects.filter(pk=load.pk).update(
+            open_conversations=F('open_conversations') + 1, last_assigned_at=timezone.now()
+        )
+
+    conversation.assigned_to_id = load.user_id
+    conversation._loaded_assignment = (load.user_id, conversation.status)
+    ActivityLog.objects.create(
+        user=None,
+        conversation=conversation,
+        action='auto_assign',
+        description=f'Conversación asignada automáticamente ({strategy}) al agente {load.user_id}'
+    )
+    print(f"🤖 Conversación {conversation.pk} asignada automáticamente al agente {load.user_id} ({strategy})")
+    return load.user_id
+
+
+def rebuild_loads():
+    """
+    Recalcula los contadores desde las conversaciones activas
+
+    Corrige cualquier desvío (cambios hechos con update() o directamente en
+    la base de datos) y crea las filas de los agentes que no la tienen.
+
+    Returns:
+        int: agentes actualizados
+    """
+    for user in User.objects.filter(role__in=[department for department, _ in Conversation.DEPARTMENT_CHOICES]):
+        sync_agent(user)
+
+    counts = dict(
+        Conversation.objects.filter(status='active', assigned_to__isnull=False)
+        .values_list('assigned_to').annotate(total=Count('id')).order_by()
+    )
+    updated = 0
+    for load in AgentLoad.objects.all():
+        total = counts.get(load.user_id, 0)
+        if load.open_conversations != total:
+            AgentLoad.objects.filter(pk=load.pk).update(open_conversations=total)
+            updated += 1
+    return updated
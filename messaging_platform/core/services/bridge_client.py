@@ -0,0 +1,85 @@
+"""
+Cliente HTTP compartido para el bridge de WhatsApp (Baileys)
+
+Una única sesión de requests por proceso mantiene las conexiones abiertas
+(keep-alive) en un pool, con timeouts configurables y reintentos acotados
+con backoff exponencial. Los POST solo se reintentan ante errores de
+conexión (la petición nunca llegó al bridge), así un envío no se duplica.
+"""
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from django.conf import settings
+
+from ..instrumentation import outbound_call
+
+
+class BridgeClient:
+    """Sesión HTTP con pool de conexiones hacia el bridge"""
+
+    def __init__(self, base_url=None, connect_timeout=None, retries=None, backoff=None, pool_size=None):
+        self.base_url = (base_url or settings.WHATSAPP_BRIDGE_URL).rstrip('/')
+        self.connect_timeout = connect_timeout if connect_timeout is not None else settings.WHATSAPP_BRIDGE_CONNECT_TIMEOUT
+        retries = retries if retries is not None else settings.WHATSAPP_BRIDGE_RETRIES
+        backoff = backoff if backoff is not None else settings.WHATSAPP_BRIDGE_BACKOFF
+        pool_size = pool_size or settings.WHATSAPP_BRIDGE_POOL_SIZE
+
+        retry = Retry(
+            total=None,
+            connect=retries,
+            read=retries,
+            status=retries,
+            # Lecturas y códigos 5xx solo se reintentan en GET (idempotente)
+            allowed_methods=frozenset({'GET'}),
+            status_forcelist=(502, 503, 504),
+            backoff_factor=backoff,
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=retry)
+
+        self.session = requests.Session()
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+    def request(self, method, path, timeout, **kwargs):
+        with outbound_call('bridge'):
+            return self.session.request(
+                method, f'{self.base_url}{path}', timeout=(self.connect_timeout, timeout), **kwargs
+            )
+
+    def get(self, path, timeout=5, **kwargs):
+        return self.request('GET', path, timeout, **kwargs)
+
+    def post(self, path, timeout=25, **kwargs):
+        return self.request('POST', path, timeout, **kwargs)
+
+    def status(self):
+        """
+        Estado del bridge
+
+        Returns:
+            dict: respuesta de /status o None si el bridge no responde
+        """
+        try:
+            response = self.get('/status', timeout=5)
+            if response.status_code == 200:
+                return response.json()
+        except (requests.RequestException, ValueError):
+            pass
+        return None
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_bridge_client():
+    """Cliente compartido por todo el proceso"""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = BridgeClient()
+    return _client
@@ -0,0 +1,89 @@
+"""
+Estado del bridge de WhatsApp en la caché compartida
+
+El bridge empuja sus cambios de estado (api_whatsapp_connected,
+api_whatsapp_qr_updated) y el comando bridge_heartbeat lo refresca
+periódicamente. Las lecturas solo consultan la caché: si el valor caducó
+se lanza un refresco en segundo plano y se responde con el último estado
+conocido, sin esperar al bridge.
+
+El contenido del QR no se guarda: la caché solo indica si hay uno
+disponible y el QR se pide siempre al bridge (WhatsAppService.get_qr_code).
+"""
+import threading
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+
+
+BRIDGE_STATUS_KEY = 'whatsapp_bridge:status'
+BRIDGE_LAST_KNOWN_KEY = 'whatsapp_bridge:last_known'
+BRIDGE_REFRESH_LOCK_KEY = 'whatsapp_bridge:refreshing'
+
+
+def _ttl():
+    return getattr(settings, 'BRIDGE_STATUS_TTL', 30)
+
+
+def set_bridge_status(connected, reachable=True, qr_available=False, source='heartbeat'):
+    """Guarda el estado del bridge (TTL corto) y una copia sin caducidad como último conocido"""
+    status = {
+        'reachable': reachable,
+        'connected': bool(connected) if reachable else False,
+        'qr_available': bool(qr_available) if reachable else False,
+        'source': source,
+        'updated_at': timezone.now().isoformat(),
+    }
+    cache.set(BRIDGE_STATUS_KEY, status, timeout=_ttl())
+    cache.set(BRIDGE_LAST_KNOWN_KEY, status, timeout=None)
+    return status
+
+
+def refresh_bridge_status():
+    """Consulta /status al bridge (bloqueante) y actualiza la caché"""
+    from .bridge_client import get_bridge_client
+
+    data = get_bridge_client().status()
+    if data is None:
+        return set_bridge_status(False, reachable=False)
+    return set_bridge_status(data.get('connected', False), qr_available=data.get('qr_available', False))
+
+
+def _refresh_in_background():
+    # cache.add es atómico: un solo refresco en vuelo por TTL
+    if not cache.add(BRIDGE_REFRESH_LOCK_KEY, True, timeout=_ttl()):
+        return
+
+    def run():
+        try:
+            refresh_bridge_status()
+        finally:
+            cache.delete(BRIDGE_REFRESH_LOCK_KEY)
+
+    threading.Thread(target=run, daemon=True).start()
+
+
+def get_bridge_status():
+    """
+    Estado del bridge sin bloquear
+
+    Returns:
+        dict: reachable, connected, qr_available, source, updated_at, stale
+    """
+    status = cache.get(BRIDGE_STATUS_KEY)
+    if status is not None:
+        return dict(status, stale=False)
+
+    _refresh_in_background()
+    last_known = cache.get(BRIDGE_LAST_KNOWN_KEY)
+    if last_known is not None:
+        return dict(last_known, stale=True)
+    return {
+        'reachable': None,
+        'connected': False,
+        'qr_available': False,
+        'source': None,
+        'updated_at': None,
+        'stale': True,
+    }
@@ -0,0 +1,325 @@
+"""
+Campañas de envío masivo
+
+Un segmento de contactos se resuelve con una sola consulta (en streaming)
+y se materializa en CampaignRecipient con inserciones masivas. El runner
+(run_campaigns) toma lotes de destinatarios pendientes al ritmo que marca
+un token bucket por canal y los deja en el outbox con una cantidad fija de
+consultas por lote; la entrega real la hace process_outbox, que aplica el
+mismo límite por canal (delivery_bucket) y retiene los mensajes de las
+campañas pausadas. Los buckets se guardan en la base (RateLimitBucket), así
+el ritmo configurado se respeta con cualquier número de procesos.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Exists, OuterRef, Q
+from django.utils import timezone
+
+from ..models import Campaign, CampaignRecipient, Contact, Conversation, Message, RateLimitBucket
+from .assignment_service import auto_assign
+from .classification_service import ContactClassificationService
+from .template_service import TemplateRenderError, agent_display_name, compile_template
+
+
+SEGMENT_KEYS = ('platform', 'department', 'funnel_stage', 'country', 'active_within_days', 'inactive_for_days')
+SEGMENT_CHUNK_SIZE = 2000
+
+# Mensajes por segundo y ráfaga máxima por canal (se puede sobrescribir con CAMPAIGN_RATE_LIMITS)
+DEFAULT_RATE_LIMITS = {
+    'whatsapp': {'rate': 0.5, 'burst': 5},
+    'telegram': {'rate': 20, 'burst': 30},
+    'facebook': {'rate': 5, 'burst': 10},
+}
+
+
+class CampaignError(ValueError):
+    """Error de validación o de estado de una campaña"""
+
+
+def rate_limits():
+    limits = {channel: dict(values) for channel, values in DEFAULT_RATE_LIMITS.items()}
+    for channel, values in getattr(settings, 'CAMPAIGN_RATE_LIMITS', {}).items():
+        limits.setdefault(channel, {}).update(values)
+    return limits
+
+
+class TokenBucket:
+    """
+    Limitador token bucket: `rate` tokens por segundo hasta `burst` acumulados
+
+    El estado vive en la base (RateLimitBucket, una fila por `key`) y se
+    actualiza con la fila bloqueada (select_for_update): todos los procesos
+    que usan la misma clave comparten el límite.
+    """
+
+    def __init__(self, key, rate, burst):
+        self.key = key
+        self.rate = float(rate)
+        self.burst = float(burst)
+
+    def _update(self, change):
+        """Aplica change(tokens) -> (tokens, resultado) sobre el bucket recargado y bloqueado"""
+        now = timezone.now()
+        with transaction.atomic():
+            bucket, _ = RateLimitBucket.objects.select_for_update().get_or_create(
+                key=self.key, defaults={'tokens': self.burst, 'updated_at': now}
+            )
+            elapsed = max((now - bucket.updated_at).total_seconds(), 0)
+            tokens, result = change(min(self.burst, bucket.tokens + elapsed * self.rate))
+            bucket.tokens = tokens
+            bucket.updated_at = max(now, bucket.updated_at)
+            bucket.save(update_fields=['tokens', 'updated_at'])
+        return result
+
+    def take(self, maximum):
+        """Consume hasta `maximum` tokens enteros disponibles y devuelve cuántos tomó"""
+        def change(tokens):
+            taken = int(min(tokens, maximum))
+            return tokens - taken, taken
+        return self._update(change) if maximum > 0 else 0
+
+    def refund(self, count):
+        """Devuelve tokens no usados (lote con menos pendientes de los reservados)"""
+        if count > 0:
+            self._update(lambda tokens: (min(self.burst, tokens + count), None))
+
+
+def channel_bucket(stage, channel):
+    """
+    Token bucket compartido de un canal en una etapa del envío
+
+    'dispatch' limita lo que run_campaigns pasa al outbox y 'delivery' lo
+    que process_outbox entrega; cada etapa tiene su fila y la comparten
+    todos los procesos de esa etapa. Returns None si el canal no tiene límite.
+    """
+    limits = rate_limits().get(channel)
+    if not limits:
+        return None
+    return TokenBucket(f'{stage}:{channel}', limits['rate'], limits['burst'])
+
+
+def delivery_bucket(channel):
+    """Token bucket de entrega del canal (lo usa el outbox al reservar mensajes de campaña)"""
+    return channel_bucket('delivery', channel)
+
+
+def validate_segment(segment):
+    if not isinstance(segment, dict):
+        raise CampaignError('El segmento debe ser un objeto JSON')
+    unknown = set(segment) - set(SEGMENT_KEYS)
+    if unknown:
+        raise CampaignError(f'Filtros de segmento no válidos: {", ".join(sorted(unknown))}')
+    for key in ('active_within_days', 'inactive_for_days'):
+        if segment.get(key) is not None:
+            try:
+                if int(segment[key]) < 0:
+                    raise ValueError
+            except (TypeError, ValueError):
+                raise CampaignError(f'{key} debe ser un número de días')
+    return segment
+
+
+def build_segment_queryset(segment):
+    """
+    Contactos del segmento en una sola consulta
+
+    Los filtros sobre conversaciones se expresan con EXISTS para no duplicar
+    contactos con varias conversaciones.
+    """
+    validate_segment(segment)
+    contacts = Contact.objects.all()
+
+    if segment.get('platform'):
+        contacts = contacts.filter(platform__name=segment['platform'])
+    if segment.get('country'):
+        countries = segment['country'] if isinstance(segment['country'], list) else [segment['country']]
+        contacts = contacts.filter(country__in=countries)
+
+    conversation_filter = Q()
+    if segment.get('department'):
+        conversation_filter &= Q(funnel_type=segment['department'])
+    if segment.get('funnel_stage'):
+        conversation_filter &= Q(funnel_stage=segment['funnel_stage'])
+    if segment.get('active_within_days') is not None:
+        since = timezone.now() - timedelta(days=int(segment['active_within_days']))
+        conversation_filter &= Q(last_message_at__gte=since)
+    if conversation_filter:
+        contacts = contacts.filter(Exists(
+            Conversation.objects.filter(conversation_filter, contact=OuterRef('pk'))
+        ))
+
+    if segment.get('inactive_for_days') is not None:
+        since = timezone.now() - timedelta(days=int(segment['inactive_for_days']))
+        contacts = contacts.exclude(Exists(
+            Conversation.objects.filter(contact=OuterRef('pk'), last_message_at__gte=since)
+        ))
+
+    return contacts
+
+
+def start_campaign(campaign, chunk_size=SEGMENT_CHUNK_SIZE):
+    """Materializa los destinatarios del segmento y pone la campaña en curso"""
+    if campaign.status != 'draft':
+        raise CampaignError(f'Solo se pueden iniciar campañas en borrador (estado: {campaign.status})')
+    try:
+        compile_template(campaign.template)
+    except TemplateRenderError as e:
+        raise CampaignError(str(e))
+
+    contact_ids = build_segment_queryset(campaign.segment).values_list('pk', flat=True).order_by()
+    batch = []
+    with transaction.atomic():
+        for contact_id in contact_ids.iterator(chunk_size=chunk_size):
+            batch.append(CampaignRecipient(campaign=campaign, contact_id=contact_id))
+            if len(batch) >= chunk_size:
+                CampaignRecipient.objects.bulk_create(batch, ignore_conflicts=True)
+                batch = []
+        if batch:
+            CampaignRecipient.objects.bulk_create(batch, ignore_conflicts=True)
+
+        campaign.total_recipients = campaign.recipients.count()
+        campaign.status = 'running'
+        campaign.started_at = timezone.now()
+        campaign.save(update_fields=['total_recipients', 'status', 'started_at'])
+    return campaign
+
+
+def set_campaign_status(campaign, status):
+    """Pausa, reanuda o cancela una campaña"""
+    allowed = {
+        'paused': ('running',),
+        'running': ('paused',),
+        'cancelled': ('draft', 'running', 'paused'),
+    }
+    if campaign.status not in allowed.get(status, ()):
+        raise CampaignError(f'No se puede pasar de {campaign.status} a {status}')
+
+    campaign.status = status
+    fields = ['status']
+    if status == 'cancelled':
+        campaign.completed_at = timezone.now()
+        fields.append('completed_at')
+        campaign.recipients.filter(status='pending').update(status='skipped', error='Campaña cancelada')
+        # Los que ya estaban en el outbox y no salieron tampoco se envían
+        Message.objects.filter(campaign_recipients__campaign=campaign, delivery_status='queued').update(
+            delivery_status='failed', delivery_error='Campaña cancelada', next_attempt_at=None
+        )
+    campaign.save(update_fields=fields)
+    return campaign
+
+
+def dispatch_batch(channel, limit):
+    """
+    Pasa al outbox hasta `limit` destinatarios pendientes del canal
+
+    Número fijo de consultas por lote, independiente de su tamaño. Las
+    conversaciones que crea se asignan automáticamente tras el commit.
+
+    Returns:
+        int: destinatarios procesados (en cola u omitidos)
+    """
+    if limit <= 0:
+        return 0
+
+    now = timezone.now()
+    with transaction.atomic():
+        recipients = list(
+            CampaignRecipient.objects.select_for_update(skip_locked=True, of=('self',))
+            .select_related('campaign__template', 'campaign__created_by', 'contact')
+            .filter(status='pending', campaign__status='running', contact__platform__name=channel)
+            .order_by('campaign_id', 'pk')[:limit]
+        )
+        if not recipients:
+            return 0
+
+        contact_ids = [r.contact_id for r in recipients]
+        conversations = {}
+        for conversation in Conversation.objects.filter(
+            contact_id__in=contact_ids, status='active'
+        ).order_by('contact_id', '-last_message_at'):
+            conversations.setdefault(conversation.contact_id, conversation)
+
+        missing = []
+        for recipient in recipients:
+            if recipient.contact_id not in conversations:
+                conversation = Conversation(
+                    contact=recipient.contact,
+                    status='active',
+                    funnel_type=recipient.campaign.segment.get('department') or 'none',
+                )
+                # bulk_create no dispara la señal que lo resuelve
+                conversation.department = ContactClassificationService.resolve_department(conversation)
+                conversations[recipient.contact_id] = conversation
+                missing.append(conversation)
+        Conversation.objects.bulk_create(missing)
+
+        messages = []
+        for recipient in recipients:
+            campaign = recipient.campaign
+            try:
+                content = compile_template(campaign.template).render(
+                    recipient.contact, agent_display_name(campaign.created_by)
+                )
+            except TemplateRenderError as e:
+                recipient.status = 'skipped'
+                recipient.error = str(e)
+                continue
+            if not content.strip():
+                recipient.status = 'skipped'
+                recipient.error = 'Mensaje vacío'
+                continue
+            message = Message(
+                conversation=conversations[recipient.contact_id],
+                platform_message_id=f"camp_{recipient.campaign_id}_{recipient.pk}",
+                sender_type='agent',
+                sender_user_id=recipient.campaign.created_by_id,
+                message_type='text',
+                content=content,
+                delivery_status='queued',
+                next_attempt_at=now,
+            )
+            recipient.message = message
+            recipient.status = 'queued'
+            messages.append(message)
+        Message.objects.bulk_create(messages)
+
+        for recipient in recipients:
+            # auto_now no se aplica en bulk_update
+            recipient.updated_at = now
+        CampaignRecipient.objects.bulk_update(recipients, ['status', 'message', 'error', 'updated_at'])
+        Conversation.objects.filter(
+            pk__in=[m.conversation_id for m in messages]
+        ).update(last_message_at=now, last_response_at=now)
+
+    # Fuera de la transacción, como la señal post_save que bulk_create no dispara:
+    # la asignación bloquea filas de AgentLoad y no debe alargar el lote
+    for conversation in missing:
+        try:
+            auto_assign(conversation)
+        except Exception as e:
+            print(f"❌ Error asignando conversación {conversation.pk}: {e}")
+
+    return len(recipients)
+
+
+def complete_finished_campaigns():
+    """Marca como completadas las campañas en curso sin destinatarios pendientes"""
+    pending = CampaignRecipient.objects.filter(campaign=OuterRef('pk'), status='pending')
+    return Campaign.objects.filter(status='running').exclude(Exists(pending)).update(
+        status='completed', completed_at=timezone.now()
+    )
+
+
+def campaign_stats(campaign):
+    """Destinatarios por estado, incluyendo el estado de entrega del outbox"""
+    stats = campaign.recipients.aggregate(
+        pending=Count('pk', filter=Q(status='pending')),
+        skipped=Count('pk', filter=Q(status='skipped')),
+        queued=Count('pk', filter=Q(status='queued', message__delivery_status__in=['queued', 'sending'])),
+        sent=Count('pk', filter=Q(message__delivery_status='sent')),
+        failed=Count('pk', filter=Q(message__delivery_status='failed')),
+    )
+    stats['total'] = campaign.total_recipients
+    return stats
@@ -1,40 +1,34 @@
+from django.conf import settings
 from django.utils import timezone
 from django.db.models import Q
 from ..models import Contact, Lead, Conversation
+from .routing_service import get_routing_table
 
 
 class ContactClassificationService:
     """
     Servicio para clasificar automáticamente contactos y conversaciones
     según el número de teléfono del destinatario
+
+    Los números de cada departamento se configuran con RoutingRule
+    (admin de Django), no en el código.
     """
     
-    # Números de teléfono para clasificación
-    SUPPORT_NUMBER = "573022620031"  # Número de soporte: +57 302 2620031
-    SALES_NUMBER = "573243230276"    # Número de ventas: +57 324 323 0276
-    
     @classmethod
-    def classify_contact_by_recipient(cls, recipient_number):
+    def classify_contact_by_recipient(cls, recipient_number, content='', country=''):
         """
         Clasifica un contacto según el número al que envió el mensaje
         
         Args:
             recipient_number (str): Número de teléfono del destinatario
+            content (str): Texto del mensaje, para las reglas con palabra clave
+            country (str): País del contacto, para las reglas por país
             
         Returns:
-            str: 'support' o 'sales'
+            str: departamento (funnel_type); ROUTING_DEFAULT_DEPARTMENT si ninguna regla coincide
         """
-        # Limpiar número (quitar espacios, guiones, etc.)
-        clean_number = ''.join(filter(str.isdigit, recipient_number))
-        
-        # Clasificar según el número destinatario
-        if clean_number.endswith(cls.SALES_NUMBER) or cls.SALES_NUMBER in clean_number:
-            return 'sales'
-        elif clean_number.endswith(cls.SUPPORT_NUMBER) or cls.SUPPORT_NUMBER in clean_number:
-            return 'support'
-        else:
-            # Por defecto, todo va a soporte
-            return 'support'
+        department = get_routing_table().match(recipient_number, content, country)
+        return department or getattr(settings, 'ROUTING_DEFAULT_DEPARTMENT', 'support')
     
     @classmethod
     def auto_create_lead_for_sales_conversation(cls, conversation):
@@ -69,6 +63,37 @@ class ContactClassificationService:
         
         return None
     
+    @classmethod
+    def sales_filter(cls):
+        """
+        Condición de las conversaciones de ventas: embudo de ventas, lead de
+        ventas o contacto de un número de ventas
+        """
+        sales = Q(funnel_type='sales') | Q(lead__case_type='sales')
+        for number in get_routing_table().numbers_for('sales'):
+            sales |= Q(contact__platform_user_id__contains=number)
+        return sales
+    
+    @classmethod
+    def resolve_department(cls, conversation):
+        """
+        Departamento de la conversación con la misma condición que sales_filter
+        
+        Se llama al guardar la conversación (core/signals.py); el lead y el
+        contacto suelen estar ya cargados en la instancia.
+        
+        Returns:
+            str: 'sales' o 'support'
+        """
+        if conversation.funnel_type == 'sales':
+            return 'sales'
+        if conversation.lead_id and conversation.lead.case_type == 'sales':
+            return 'sales'
+        platform_user_id = conversation.contact.platform_user_id if conversation.contact_id else ''
+        if any(number in platform_user_id for number in get_routing_table().numbers_for('sales')):
+            return 'sales'
+        return 'support'
+    
     @classmethod
     def get_conversations_by_department(cls, department):
         """
@@ -78,19 +103,6 @@ class ContactClassificationService:
             department (str): 'support' o 'sales'
             
         Returns:
-            QuerySet: Conversaciones filtradas
+            QuerySet: Conversaciones filtradas (por la columna indexada department)
         """
-        if department == 'sales':
-            # Conversaciones que llegaron al número de ventas
-            return Conversation.objects.filter(
-                Q(contact__platform_user_id__contains=cls.SALES_NUMBER) |
-                Q(funnel_type='sales') |
-                Q(lead__case_type='sales')
-            ).distinct()
-        else:
-            # Conversaciones de soporte (resto)
-            return Conversation.objects.exclude(
-                Q(contact__platform_user_id__contains=cls.SALES_NUMBER) |
-                Q(funnel_type='sales') |
-                Q(lead__case_type='sales')
-            ).distinct()
\ No newline at end of file
+        return Conversation.objects.filter(department='sales' if department == 'sales' else 'support')
@@ -0,0 +1,96 @@
+"""
+Consultas de las vistas principales (chat, dashboard, bandeja, embudos)
+
+Las usan las vistas (core/views.py) y check_query_plans, que comprueba con
+EXPLAIN que cada una sigue usando su índice: al cambiar una consulta aquí
+se verifica la misma que se ejecuta en producción.
+"""
+from django.db.models import OuterRef, Subquery
+from django.utils import timezone
+
+from ..models import Conversation, Message, Reminder
+
+
+def _is_admin(user):
+    return user.role == 'admin' or user.is_superuser
+
+
+def last_message_preview():
+    """Subconsulta: contenido del último mensaje de la conversación (OuterRef)"""
+    return Subquery(
+        Message.objects.filter(conversation=OuterRef('pk')).order_by('-created_at').values('content')[:1]
+    )
+
+
+def chat_conversations(user):
+    """Conversaciones activas del chat según el rol: primero las que necesitan respuesta"""
+    conversations = Conversation.objects.select_related(
+        'contact', 'contact__platform', 'assigned_to'
+    ).filter(status='active')
+    if not _is_admin(user) and user.role in ('support', 'sales'):
+        conversations = conversations.filter(funnel_type=user.role)
+    return conversations.order_by('-needs_response', '-last_message_at')
+
+
+def dashboard_conversations(user):
+    """Conversaciones activas del dashboard: todas para admin, las del departamento para el resto"""
+    if user.role == 'admin':
+        return Conversation.objects.filter(status='active')
+    return Conversation.objects.filter(status='active', funnel_type='sales' if user.role == 'sales' else 'support')
+
+
+def recent_conversations(conversations, limit):
+    """Las `limit` conversaciones actualizadas más recientemente"""
+    return conversations.select_related(
+        'contact', 'contact__platform', 'assigned_to'
+    ).order_by('-updated_at', '-needs_response', '-last_message_at')[:limit]
+
+
+def pending_reminders(user, limit=5):
+    """Próximos recordatorios sin completar del usuario"""
+    return Reminder.objects.filter(
+        user=user,
+        is_completed=False,
+        reminder_date__gte=timezone.now()
+    ).order_by('reminder_date')[:limit]
+
+
+def unassigned_conversations(user):
+    """Bandeja de entrada: conversaciones activas sin asignar del rol, con el último mensaje"""
+    if _is_admin(user):
+        conversations = Conversation.objects.filter(status='active')
+    elif user.role in ('support', 'sales'):
+        conversations = Conversation.objects.filter(status='active', funnel_type=user.role)
+    else:
+        conversations = Conversation.objects.none()
+    return conversations.filter(
+        assigned_to__isnull=True
+    ).select_related('contact', 'contact__platform', 'assigned_to').annotate(
+        last_message_preview=last_message_preview()
+    ).order_by('-last_message_at')
+
+
+def funnel_conversations(funnel_type, stage):
+    """Conversaciones activas de una etapa del embudo, con el último mensaje"""
+    return Conversation.objects.filter(
+        funnel_type=funnel_type,
+        funnel_stage=stage,
+        status='active'
+    ).select_related('contact', 'contact__platform', 'assigned_to').annotate(
+        last_message_preview=last_message_preview()
+    )
+
+
+def active_conversations(contact):
+    """Conversación activa del contacto (la que continúa un mensaje entrante o saliente)"""
+    return Conversation.objects.filter(contact=contact, status='active')
+
+
+def unread_contact_messages(conversation):
+    """Mensajes del contacto que el agente aún no ha leído"""
+    return conversation.messages.filter(is_read=False, sender_type='contact')
+
+
+def contact_messages(conversation):
+    """Mensajes del contacto, el más reciente primero (Conversation.is_overdue)"""
+    return conversation.messages.filter(sender_type='contact').order_by('-created_at')
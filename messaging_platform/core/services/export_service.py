@@ -0,0 +1,202 @@
+"""
+Servicio de exportación de datos (CSV / NDJSON) para BI
+
+Las exportaciones se generan fila a fila con QuerySet.iterator(chunk_size=...)
+sobre values_list(), de modo que el consumo de memoria es constante sin
+importar cuántas filas tenga el resultado.
+
+La exportación de mensajes incluye los archivados (archived_messages,
+ver archive_service) a continuación de los de la tabla messages.
+"""
+import csv
+import json
+from datetime import datetime, time, timedelta
+from itertools import chain
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils import timezone
+
+from ..models import ArchivedMessage, Conversation, Message, Lead
+
+
+# Filas que se piden a la base de datos por cada viaje del cursor
+EXPORT_CHUNK_SIZE = 2000
+
+EXPORT_FORMATS = ('csv', 'ndjson')
+
+# Definición de cada dataset: modelo, columnas exportadas y rutas de los filtros
+EXPORT_DATASETS = {
+    'conversations': {
+        'model': Conversation,
+        'columns': [
+            ('id', 'id'),
+            ('contact_id', 'contact_id'),
+            ('contact_name', 'contact__name'),
+            ('contact_phone', 'contact__phone'),
+            ('contact_country', 'contact__country'),
+            ('platform', 'contact__platform__name'),
+            ('status', 'status'),
+            ('funnel_type', 'funnel_type'),
+            ('funnel_stage', 'funnel_stage'),
+            ('assigned_to', 'assigned_to__username'),
+            ('lead_id', 'lead_id'),
+            ('is_answered', 'is_answered'),
+            ('needs_response', 'needs_response'),
+            ('last_message_at', 'last_message_at'),
+            ('first_response_at', 'first_response_at'),
+            ('created_at', 'created_at'),
+        ],
+        'department_field': 'funnel_type',
+        'platform_field': 'contact__platform__name',
+    },
+    'messages': {
+        'model': Message,
+        # Mismas columnas en la tabla de archivo: se exporta después de la principal
+        'archive_model': ArchivedMessage,
+        'columns': [
+            ('id', 'id'),
+            ('conversation_id', 'conversation_id'),
+            ('platform_message_id', 'platform_message_id'),
+            ('platform', 'conversation__contact__platform__name'),
+            ('department', 'conversation__funnel_type'),
+            ('sender_type', 'sender_type'),
+            ('sender_user', 'sender_user__username'),
+            ('message_type', 'message_type'),
+            ('content', 'content'),
+            ('media_url', 'media_url'),
+            ('is_read', 'is_read'),
+            ('created_at', 'created_at'),
+        ],
+        'department_field': 'conversation__funnel_type',
+        'platform_field': 'conversation__contact__platform__name',
+    },
+    'leads': {
+        'model': Lead,
+        'columns': [
+            ('id', 'id'),
+            ('contact_id', 'contact_id'),
+            ('contact_name', 'contact__name'),
+            ('contact_phone', 'contact__phone'),
+            ('contact_country', 'contact__country'),
+            ('platform', 'contact__platform__name'),
+            ('case_type', 'case_type'),
+            ('status', 'status'),
+            ('assigned_to', 'assigned_to__username'),
+            ('notes', 'notes'),
+            ('created_at', 'created_at'),
+            ('updated_at', 'updated_at'),
+        ],
+        'department_field': 'case_type',
+        'platform_field': 'contact__platform__name',
+    },
+}
+
+
+class ExportError(ValueError):
+    """Parámetros de exportación inválidos"""
+
+
+def parse_export_date(value, end_of_day=False):
+    """
+    Convierte 'YYYY-MM-DD' en un datetime con zona horaria.
+    Para el límite superior devuelve el inicio del día siguiente (rango semiabierto)
+    """
+    if not value:
+        return None
+    try:
+        day = datetime.strptime(value, '%Y-%m-%d').date()
+    except ValueError:
+        raise ExportError(f'Fecha inválida: {value} (formato esperado YYYY-MM-DD)')
+    if end_of_day:
+        day = day + timedelta(days=1)
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+def build_export_queryset(dataset, date_from=None, date_to=None, department=None, platform=None, model=None):
+    """
+    Construye el queryset (values_list) de un dataset aplicando los filtros
+
+    Args:
+        dataset (str): 'conversations', 'messages' o 'leads'
+        date_from (str): fecha inicial YYYY-MM-DD (inclusive)
+        date_to (str): fecha final YYYY-MM-DD (inclusive)
+        department (str): 'sales', 'support' o 'recovery'
+        platform (str): 'whatsapp', 'facebook' o 'telegram'
+        model: modelo a consultar en lugar del del dataset (su archive_model)
+
+    Returns:
+        tuple: (encabezados, queryset)
+    """
+    spec = EXPORT_DATASETS.get(dataset)
+    if not spec:
+        raise ExportError(f'Dataset no válido: {dataset}')
+
+    start = parse_export_date(date_from)
+    end = parse_export_date(date_to, end_of_day=True)
+
+    queryset = (model or spec['model']).objects.all()
+    if start:
+        queryset = queryset.filter(created_at__gte=start)
+    if end:
+        queryset = queryset.filter(created_at__lt=end)
+    if department:
+        queryset = queryset.filter(**{spec['department_field']: department})
+    if platform:
+        queryset = queryset.filter(**{spec['platform_field']: platform})
+
+    headers = [name for name, _ in spec['columns']]
+    fields = [field for _, field in spec['columns']]
+
+    # Orden por PK: estable y resuelto con el índice primario
+    return headers, queryset.order_by('pk').values_list(*fields)
+
+
+def iter_rows(queryset, chunk_size=EXPORT_CHUNK_SIZE):
+    """Recorre el queryset por bloques sin cachear resultados"""
+    return queryset.iterator(chunk_size=chunk_size)
+
+
+class _Echo:
+    """Pseudo-buffer: csv.writer escribe y devolvemos la línea tal cual"""
+
+    def write(self, value):
+        return value
+
+
+def stream_csv(headers, rows):
+    """Genera el CSV línea a línea"""
+    writer = csv.writer(_Echo())
+    yield writer.writerow(headers)
+    for row in rows:
+        yield writer.writerow(row)
+
+
+def stream_ndjson(headers, rows):
+    """Genera NDJSON (un objeto JSON por línea)"""
+    for row in rows:
+        yield json.dumps(dict(zip(headers, row)), cls=DjangoJSONEncoder, ensure_ascii=False) + '\n'
+
+
+def stream_export(dataset, export_format='csv', chunk_size=EXPORT_CHUNK_SIZE, **filters):
+    """
+    Devuelve un generador con el contenido completo de la exportación
+
+    Args:
+        dataset (str): nombre del dataset
+        export_format (str): 'csv' o 'ndjson'
+        chunk_size (int): filas por bloque del cursor
+        **filters: date_from, date_to, department, platform
+    """
+    if export_format not in EXPORT_FORMATS:
+        raise ExportError(f'Formato no válido: {export_format}')
+
+    headers, queryset = build_export_queryset(dataset, **filters)
+    rows = iter_rows(queryset, chunk_size=chunk_size)
+    archive_model = EXPORT_DATASETS[dataset].get('archive_model')
+    if archive_model:
+        _, archived = build_export_queryset(dataset, model=archive_model, **filters)
+        rows = chain(rows, iter_rows(archived, chunk_size=chunk_size))
+
+    if export_format == 'ndjson':
+        return stream_ndjson(headers, rows)
+    return stream_csv(headers, rows)
@@ -0,0 +1,127 @@
+"""
+Caché de perfiles de Facebook Messenger (nombre y foto)
+
+El perfil se guarda en la caché compartida junto con la hora de consulta.
+Mientras es reciente (FACEBOOK_PROFILE_TTL) se usa tal cual; pasado ese
+tiempo se sigue usando (stale-while-revalidate) y se lanza un único
+refresco en segundo plano que actualiza la caché y el Contact. Solo el
+primer mensaje de un remitente desconocido espera a la Graph API.
+
+Si la consulta falla se recuerda un rato (FACEBOOK_PROFILE_FAILURE_TTL):
+mientras tanto los mensajes de ese remitente no vuelven a esperar a la
+Graph API ni lanzan refrescos.
+"""
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+
+from ..models import Contact
+
+
+PROFILE_KEY = 'facebook_profile:{}'
+REFRESH_LOCK_KEY = 'facebook_profile_refreshing:{}'
+FAILED_KEY = 'facebook_profile_failed:{}'
+
+
+def _ttl():
+    return getattr(settings, 'FACEBOOK_PROFILE_TTL', 24 * 3600)
+
+
+def _recently_failed(user_id):
+    return cache.get(FAILED_KEY.format(user_id)) is not None
+
+
+def _cached(user_id):
+    return cache.get(PROFILE_KEY.format(user_id))
+
+
+def _store(user_id, profile):
+    entry = dict(profile, fetched_at=time.time())
+    # Se conserva más allá del TTL para poder servirlo mientras se revalida
+    cache.set(PROFILE_KEY.format(user_id), entry, timeout=_ttl() * 7)
+    return entry
+
+
+def storable_profile_pic(url):
+    """La URL de la foto si cabe en Contact.profile_pic (las de la Graph API pueden ser muy largas)"""
+    if url and len(url) <= Contact._meta.get_field('profile_pic').max_length:
+        return url
+    return ''
+
+
+def _persist(platform, user_id, profile):
+    """Actualiza nombre y foto del contacto si cambiaron"""
+    updates = {}
+    if profile.get('name'):
+        updates['name'] = profile['name']
+    pic = storable_profile_pic(profile.get('profile_pic'))
+    if pic:
+        updates['profile_pic'] = pic
+    if not updates:
+        return 0
+    # exclude(**updates) deja fuera solo los contactos que ya tienen todos los valores
+    return Contact.objects.filter(platform=platform, platform_user_id=user_id).exclude(
+        **updates
+    ).update(**updates)
+
+
+def fetch_profile(service, user_id):
+    """Consulta la Graph API (bloqueante), actualiza la caché y el contacto"""
+    profile = service._get_user_info(user_id)
+    if not profile:
+        # Caché negativa: no se reintenta en cada mensaje mientras la Graph API falle
+        cache.set(FAILED_KEY.format(user_id), True, timeout=getattr(settings, 'FACEBOOK_PROFILE_FAILURE_TTL', 300))
+        return None
+    cache.delete(FAILED_KEY.format(user_id))
+    _store(user_id, profile)
+    if service.platform is not None:
+        _persist(service.platform, user_id, profile)
+    return profile
+
+
+def _refresh_in_background(service, user_id):
+    if _recently_failed(user_id):
+        return
+    # cache.add es atómico: un solo refresco en vuelo por usuario
+    if not cache.add(REFRESH_LOCK_KEY.format(user_id), True, timeout=60):
+        return
+
+    def run():
+        try:
+            fetch_profile(service, user_id)
+        except Exception as e:
+            print(f"Error refrescando perfil de Facebook {user_id}: {str(e)}")
+        finally:
+            cache.delete(REFRESH_LOCK_KEY.format(user_id))
+            connection.close()
+
+    threading.Thread(target=run, daemon=True).start()
+
+
+def get_profile(service, user_id, contact=None):
+    """
+    Perfil del usuario sin consultar la Graph API en cada mensaje
+
+    Args:
+        contact: Contact existente (sus datos sirven de respaldo si no hay caché)
+
+    Returns:
+        dict: name, profile_pic (vacío si no se pudo obtener)
+    """
+    entry = _cached(user_id)
+    if entry is not None:
+        if time.time() - entry['fetched_at'] > _ttl():
+            _refresh_in_background(service, user_id)
+        return entry
+
+    if contact is not None and contact.name:
+        # Contacto conocido: se responde con lo guardado y se revalida aparte
+        _refresh_in_background(service, user_id)
+        return {'name': contact.name, 'profile_pic': contact.profile_pic or ''}
+
+    if _recently_failed(user_id):
+        return {}
+    return fetch_profile(service, user_id) or {}
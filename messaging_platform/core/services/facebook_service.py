@@ -1,9 +1,11 @@
-import requests
 import json
 import hmac
 import hashlib
 from django.conf import settings
 from ..models import APIConfiguration, Platform, Contact, Conversation, Message
+from .facebook_profiles import get_profile, storable_profile_pic
+from .http_clients import fan_out, get_api_client, send_failure
+from .platform_registry import get_platform
 from django.utils import timezone
 
 
@@ -11,8 +13,10 @@ class FacebookService:
     """Servicio para integración con Facebook Messenger API"""
     
     def __init__(self):
+        # Sesión compartida con pool de conexiones y timeouts
+        self.http = get_api_client('facebook')
         try:
-            platform = Platform.objects.get(name='facebook')
+            platform = get_platform('facebook')
             self.config = APIConfiguration.objects.get(platform=platform)
             self.platform = platform
             self.base_url = "https://graph.facebook.com/v18.0"
@@ -40,7 +44,7 @@ class FacebookService:
         }
         
         try:
-            response = requests.post(url, params=params, json=payload)
+            response = self.http.post(url, params=params, json=payload)
             response_data = response.json()
             
             if response.status_code == 200:
@@ -64,7 +68,7 @@ class FacebookService:
             else:
                 return {'success': False, 'error': response_data}
         except Exception as e:
-            return {'success': False, 'error': str(e)}
+            return send_failure(e)
     
     def send_attachment(self, recipient_id, attachment_type, attachment_url, conversation=None):
         """Envía un mensaje con adjunto (imagen, video, archivo)"""
@@ -88,7 +92,7 @@ class FacebookService:
         }
         
         try:
-            response = requests.post(url, params=params, json=payload)
+            response = self.http.post(url, params=params, json=payload)
             response_data = response.json()
             
             if response.status_code == 200:
@@ -115,6 +119,62 @@ class FacebookService:
         except Exception as e:
             return {'success': False, 'error': str(e)}
     
+    def _batch_result(self, response):
+        if isinstance(response, Exception):
+            return {'success': False, 'error': str(response)}
+        try:
+            response_data = response.json()
+        except ValueError:
+            return {'success': False, 'error': f'Respuesta no válida ({response.status_code})'}
+        if response.status_code == 200:
+            return {'success': True, 'data': response_data}
+        return {'success': False, 'error': response_data}
+    
+    def send_messages(self, messages, concurrency=None):
+        """
+        Envía varios mensajes de texto en paralelo (concurrencia acotada)
+        
+        Args:
+            messages: lista de (recipient_id, texto)
+        
+        Returns:
+            list: resultado de cada envío, en el mismo orden
+        """
+        if not self.is_configured():
+            return [{'success': False, 'error': 'Facebook Messenger no configurado'} for _ in messages]
+        
+        params = {'access_token': self.config.facebook_page_access_token}
+        calls = [{
+            'method': 'POST',
+            'url': f"{self.base_url}/me/messages",
+            'params': params,
+            'json': {'recipient': {'id': recipient_id}, 'message': {'text': text}}
+        } for recipient_id, text in messages]
+        return [self._batch_result(r) for r in fan_out('facebook', calls, concurrency)]
+    
+    def get_users_info(self, user_ids, concurrency=None):
+        """Consulta el perfil de varios usuarios en paralelo; devuelve {user_id: info}"""
+        if not self.is_configured() or not user_ids:
+            return {}
+        
+        user_ids = list(dict.fromkeys(user_ids))
+        params = {
+            'fields': 'first_name,last_name,profile_pic',
+            'access_token': self.config.facebook_page_access_token
+        }
+        calls = [{'method': 'GET', 'url': f"{self.base_url}/{user_id}", 'params': params} for user_id in user_ids]
+        
+        users = {}
+        for user_id, response in zip(user_ids, fan_out('facebook', calls, concurrency)):
+            result = self._batch_result(response)
+            if result['success']:
+                data = result['data']
+                users[user_id] = {
+                    'name': f"{data.get('first_name', '')} {data.get('last_name', '')}".strip(),
+                    'profile_pic': data.get('profile_pic', '')
+                }
+        return users
+    
     def process_webhook(self, webhook_data):
         """Procesa los webhooks recibidos de Facebook Messenger"""
         try:
@@ -150,18 +210,21 @@ class FacebookService:
             message_id = message_data.get('mid')
             timestamp = event.get('timestamp')
             
-            # Obtener información del usuario
-            user_info = self._get_user_info(sender_id)
+            contact = Contact.objects.filter(platform=self.platform, platform_user_id=sender_id).first()
+            
+            # Obtener información del usuario (caché; solo un remitente nuevo espera a la Graph API)
+            user_info = get_profile(self, sender_id, contact)
             
             # Obtener o crear contacto
-            contact, created = Contact.objects.get_or_create(
-                platform=self.platform,
-                platform_user_id=sender_id,
-                defaults={
-                    'name': user_info.get('name', ''),
-                    'profile_pic': user_info.get('profile_pic', '')
-                }
-            )
+            if contact is None:
+                contact, created = Contact.objects.get_or_create(
+                    platform=self.platform,
+                    platform_user_id=sender_id,
+                    defaults={
+                        'name': user_info.get('name', ''),
+                        'profile_pic': storable_profile_pic(user_info.get('profile_pic'))
+                    }
+                )
             
             # Obtener o crear conversación
             conversation, created = Conversation.objects.get_or_create(
@@ -257,7 +320,7 @@ class FacebookService:
         }
         
         try:
-            response = requests.get(url, params=params)
+            response = self.http.get(url, params=params, timeout=5)
             if response.status_code == 200:
                 data = response.json()
                 return {
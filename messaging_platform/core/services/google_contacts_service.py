@@ -7,6 +7,7 @@ from django.utils import timezone
 import re
 
 from ..models import GoogleContactsAuth
+from ..instrumentation import outbound_call
 
 
 class GoogleContactsService:
@@ -74,11 +75,12 @@ class GoogleContactsService:
         
         try:
             # Buscar en todos los contactos
-            results = self.service.people().connections().list(
-                resourceName='people/me',
-                pageSize=1000,  # Máximo permitido por la API
-                personFields='names,phoneNumbers'
-            ).execute()
+            with outbound_call('google'):
+                results = self.service.people().connections().list(
+                    resourceName='people/me',
+                    pageSize=1000,  # Máximo permitido por la API
+                    personFields='names,phoneNumbers'
+                ).execute()
             
             connections = results.get('connections', [])
             
@@ -121,10 +123,11 @@ class GoogleContactsService:
             return None
         
         try:
-            person = self.service.people().get(
-                resourceName=contact_id,
-                personFields='names,phoneNumbers,emailAddresses'
-            ).execute()
+            with outbound_call('google'):
+                person = self.service.people().get(
+                    resourceName=contact_id,
+                    personFields='names,phoneNumbers,emailAddresses'
+                ).execute()
             
             # Extraer información relevante
             names = person.get('names', [])
@@ -150,11 +153,12 @@ class GoogleContactsService:
             return []
         
         try:
-            results = self.service.people().connections().list(
-                resourceName='people/me',
-                pageSize=limit,
-                personFields='names,phoneNumbers'
-            ).execute()
+            with outbound_call('google'):
+                results = self.service.people().connections().list(
+                    resourceName='people/me',
+                    pageSize=limit,
+                    personFields='names,phoneNumbers'
+                ).execute()
             
             connections = results.get('connections', [])
             matching_contacts = []
@@ -0,0 +1,143 @@
+"""
+Clientes HTTP compartidos para las APIs externas (Telegram, Facebook)
+
+Como el cliente del bridge: una sesión de requests por servicio y proceso,
+con pool de conexiones keep-alive, timeouts de conexión y lectura siempre
+definidos y reintentos acotados solo para GET. Para lotes de envíos o
+consultas, fan_out() lanza las peticiones en paralelo con httpx asíncrono
+y una concurrencia máxima.
+"""
+import asyncio
+import threading
+
+import httpx
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import ConnectTimeoutError, NewConnectionError
+from urllib3.util.retry import Retry
+from django.conf import settings
+
+from ..instrumentation import outbound_call
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+class ApiClient:
+    """Sesión HTTP con pool de conexiones hacia una API externa"""
+
+    def __init__(self, service, timeout=None, connect_timeout=None, retries=None, pool_size=None):
+        self.service = service
+        self.timeout = timeout if timeout is not None else _setting('EXTERNAL_API_TIMEOUT', 10)
+        self.connect_timeout = connect_timeout if connect_timeout is not None else _setting('EXTERNAL_API_CONNECT_TIMEOUT', 3)
+        retries = retries if retries is not None else _setting('EXTERNAL_API_RETRIES', 2)
+        pool_size = pool_size or _setting('EXTERNAL_API_POOL_SIZE', 10)
+
+        retry = Retry(
+            total=None,
+            connect=retries,
+            read=retries,
+            status=retries,
+            # Un POST (envío) no se reintenta: la API pudo haberlo procesado
+            allowed_methods=frozenset({'GET'}),
+            status_forcelist=(502, 503, 504),
+            backoff_factor=0.3,
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=retry)
+
+        self.session = requests.Session()
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+    def request(self, method, url, timeout=None, **kwargs):
+        with outbound_call(self.service):
+            return self.session.request(
+                method, url, timeout=(self.connect_timeout, timeout or self.timeout), **kwargs
+            )
+
+    def get(self, url, timeout=None, **kwargs):
+        return self.request('GET', url, timeout, **kwargs)
+
+    def post(self, url, timeout=None, **kwargs):
+        return self.request('POST', url, timeout, **kwargs)
+
+
+def is_connect_error(exc):
+    """True si la petición no llegó a la API (no se pudo conectar): reenviarla no duplica el envío"""
+    if isinstance(exc, (requests.ConnectTimeout, httpx.ConnectError, httpx.ConnectTimeout)):
+        return True
+    if isinstance(exc, requests.ConnectionError) and exc.args:
+        # Una conexión cortada a mitad de respuesta también es ConnectionError: solo cuenta el fallo al conectar
+        return isinstance(getattr(exc.args[0], 'reason', None), (NewConnectionError, ConnectTimeoutError))
+    return False
+
+
+def send_failure(exc):
+    """
+    Resultado de un envío que lanzó una excepción
+
+    retryable indica si se puede reintentar solo (la API no recibió nada);
+    tras un timeout de lectura el mensaje pudo haberse entregado.
+    """
+    if is_connect_error(exc):
+        return {'success': False, 'error': str(exc), 'retryable': True}
+    if isinstance(exc, (requests.Timeout, httpx.TimeoutException)):
+        return {'success': False, 'error': f'Sin respuesta a tiempo, el mensaje pudo haberse entregado: {exc}', 'retryable': False}
+    return {'success': False, 'error': str(exc), 'retryable': False}
+
+
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+def get_api_client(service):
+    """Cliente compartido por todo el proceso para el servicio indicado"""
+    client = _clients.get(service)
+    if client is None:
+        with _clients_lock:
+            client = _clients.get(service)
+            if client is None:
+                client = _clients[service] = ApiClient(service)
+    return client
+
+
+async def fan_out_async(calls, concurrency=None):
+    """
+    Ejecuta peticiones en paralelo con un máximo de `concurrency` a la vez
+
+    Args:
+        calls: lista de dicts con method, url y opcionalmente params / json
+
+    Returns:
+        list: por cada llamada, en el mismo orden, la httpx.Response o la
+        excepción httpx.HTTPError si falló
+    """
+    concurrency = concurrency or _setting('EXTERNAL_API_CONCURRENCY', 8)
+    semaphore = asyncio.Semaphore(concurrency)
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    timeout = httpx.Timeout(
+        _setting('EXTERNAL_API_TIMEOUT', 10), connect=_setting('EXTERNAL_API_CONNECT_TIMEOUT', 3)
+    )
+
+    async with httpx.AsyncClient(limits=limits, timeout=timeout) as client:
+        async def run(call):
+            async with semaphore:
+                try:
+                    return await client.request(
+                        call['method'], call['url'], params=call.get('params'), json=call.get('json')
+                    )
+                except httpx.HTTPError as e:
+                    return e
+
+        return await asyncio.gather(*(run(call) for call in calls))
+
+
+def fan_out(service, calls, concurrency=None):
+    """Versión síncrona de fan_out_async (vistas, comandos, workers)"""
+    if not calls:
+        return []
+    # Se registra el tiempo total del lote, no la suma de las llamadas
+    with outbound_call(service):
+        return asyncio.run(fan_out_async(calls, concurrency))
@@ -0,0 +1,186 @@
+"""
+Miniaturas y placeholders de la multimedia del chat
+
+Para cada imagen del almacén se genera una miniatura WebP junto al original
+(cas/ab/cd/<sha256>.thumb.webp) y un placeholder de 16 px como data URI que
+se guarda en MediaBlob; para los videos, la miniatura es el primer fotograma
+(requiere ffmpeg en el PATH; sin ffmpeg el video queda sin miniatura).
+
+El trabajo se hace fuera de la request: se lanza en segundo plano al
+guardar un archivo nuevo y lo completa el worker
+generate_media_derivatives. Los archivos se reservan marcándolos como
+'processing' antes de procesarlos, así varios workers no procesan el mismo
+y las actualizaciones de ref_count no esperan a Pillow.
+"""
+import base64
+import io
+import os
+import shutil
+import subprocess
+import threading
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection
+from django.utils import timezone
+from PIL import Image, ImageOps
+
+from ..models import MediaBlob
+
+
+PLACEHOLDER_SIZE = 16
+# Reserva que se da por perdida (worker caído a mitad de un archivo)
+STALE_CLAIM = timedelta(minutes=10)
+
+
+def _thumbnail_size():
+    return getattr(settings, 'MEDIA_THUMBNAIL_SIZE', 320)
+
+
+def _absolute(relative_path):
+    return os.path.join(settings.MEDIA_ROOT, relative_path)
+
+
+def _video_frame(path):
+    """Primer fotograma del video como imagen de Pillow (None si no hay ffmpeg o falla)"""
+    ffmpeg = shutil.which('ffmpeg')
+    if not ffmpeg:
+        return None
+    result = subprocess.run(
+        [ffmpeg, '-v', 'error', '-i', path, '-frames:v', '1', '-f', 'image2pipe', '-vcodec', 'png', '-'],
+        capture_output=True,
+        timeout=30,
+    )
+    if result.returncode != 0 or not result.stdout:
+        return None
+    return Image.open(io.BytesIO(result.stdout))
+
+
+def _placeholder(image):
+    small = image.copy()
+    small.thumbnail((PLACEHOLDER_SIZE, PLACEHOLDER_SIZE))
+    buffer = io.BytesIO()
+    small.save(buffer, 'JPEG', quality=40)
+    return 'data:image/jpeg;base64,' + base64.b64encode(buffer.getvalue()).decode('ascii')
+
+
+def generate_derivatives(blob):
+    """
+    Genera miniatura y placeholder del archivo
+
+    Returns:
+        dict: campos a actualizar en el MediaBlob
+    """
+    source = _absolute(blob.path)
+    if blob.content_type.startswith('image/'):
+        image = Image.open(source)
+        image = ImageOps.exif_transpose(image)
+    elif blob.content_type.startswith('video/'):
+        image = _video_frame(source)
+        if image is None:
+            return {'derivatives_status': 'skipped'}
+    else:
+        return {'derivatives_status': 'skipped'}
+
+    width, height = image.size
+    size = _thumbnail_size()
+    # Se reduce en el sitio: no se guarda una copia a resolución completa
+    image.thumbnail((size, size))
+    thumbnail = image.convert('RGBA')
+
+    thumbnail_path = f"{os.path.splitext(blob.path)[0]}.thumb.webp"
+    tmp_path = _absolute(thumbnail_path) + '.tmp'
+    thumbnail.save(tmp_path, 'WEBP', quality=75)
+    os.replace(tmp_path, _absolute(thumbnail_path))
+
+    return {
+        'derivatives_status': 'ready',
+        'thumbnail_path': thumbnail_path,
+        'placeholder': _placeholder(thumbnail.convert('RGB')),
+        'width': width,
+        'height': height,
+    }
+
+
+def claim_pending(limit):
+    """
+    Reserva hasta `limit` archivos pendientes para este worker
+
+    Cada archivo se reserva con una actualización condicional: si otro
+    worker lo tomó antes no se actualiza ninguna fila. No se usa SKIP LOCKED
+    porque un archivo recién subido está bloqueado un instante por la
+    actualización de su ref_count y quedaría fuera del lote.
+    """
+    now = timezone.now()
+    candidates = MediaBlob.objects.filter(derivatives_status='pending').order_by('id').values_list('id', flat=True)[:limit]
+    claimed = [
+        blob_id for blob_id in candidates
+        if MediaBlob.objects.filter(id=blob_id, derivatives_status='pending').update(
+            derivatives_status='processing', derivatives_updated_at=now
+        )
+    ]
+    return list(MediaBlob.objects.filter(id__in=claimed).order_by('id'))
+
+
+def requeue_stale():
+    """Devuelve a la cola los archivos reservados por un worker que no terminó"""
+    return MediaBlob.objects.filter(
+        derivatives_status='processing',
+        derivatives_updated_at__lt=timezone.now() - STALE_CLAIM,
+    ).update(derivatives_status='pending')
+
+
+def process_pending(limit=20):
+    """
+    Genera los derivados de hasta `limit` archivos pendientes
+
+    Returns:
+        dict: contadores por estado final
+    """
+    counts = {'ready': 0, 'skipped': 0, 'failed': 0}
+    for blob in claim_pending(limit):
+        try:
+            fields = generate_derivatives(blob)
+        except Exception as e:
+            print(f"❌ Miniatura de {blob.sha256[:12]} no generada: {e}")
+            fields = {'derivatives_status': 'failed'}
+        fields['derivatives_updated_at'] = timezone.now()
+        MediaBlob.objects.filter(pk=blob.pk).update(**fields)
+        counts[fields['derivatives_status']] += 1
+    return counts
+
+
+def _background_generation():
+    try:
+        process_pending(limit=5)
+    except Exception as e:
+        print(f"❌ Error generando miniaturas en segundo plano: {e}")
+    finally:
+        connection.close()
+
+
+def start_background_generation():
+    """Genera las miniaturas de los archivos recién guardados sin esperar al worker"""
+    threading.Thread(target=_background_generation, daemon=True).start()
+
+
+def media_previews(messages):
+    """
+    Añade a cada mensaje thumbnail_url, media_placeholder, media_width y media_height
+
+    Una sola consulta para todos los mensajes; los que no son del almacén
+    o no tienen miniatura quedan con None.
+    """
+    messages = list(messages)
+    blob_ids = {message.media_blob_id for message in messages if message.media_blob_id}
+    blobs = MediaBlob.objects.filter(id__in=blob_ids, derivatives_status='ready').only(
+        'thumbnail_path', 'placeholder', 'width', 'height'
+    ).in_bulk() if blob_ids else {}
+
+    for message in messages:
+        blob = blobs.get(message.media_blob_id)
+        message.thumbnail_url = blob.thumbnail_url if blob else None
+        message.media_placeholder = blob.placeholder if blob else None
+        message.media_width = blob.width if blob else None
+        message.media_height = blob.height if blob else None
+    return messages
@@ -0,0 +1,258 @@
+"""
+Retención de multimedia y recolección de archivos huérfanos
+
+Tres pasos, todos con memoria acotada (iteradores de la base de datos con
+chunk_size y recorrido de MEDIA_ROOT con os.scandir en lotes):
+
+1. Retención: los mensajes de un tipo más antiguos que su política
+   (MEDIA_RETENTION), también los archivados, pierden el archivo
+   (media_url y media_blob a NULL); el texto del mensaje se conserva.
+2. Archivos del almacén sin mensajes (MediaBlob sin referencias, pasado el
+   periodo de gracia): se borran la fila, el archivo y su miniatura.
+3. Recorrido de MEDIA_ROOT (cas/ y attachments/): archivos del almacén sin
+   fila en media_blobs, temporales de subidas interrumpidas y archivos
+   antiguos de attachments/ que ningún Message.media_url referencia.
+
+Con dry_run solo se cuentan archivos y bytes.
+"""
+import os
+import time
+from collections import Counter, defaultdict
+from datetime import timedelta
+from itertools import product
+
+from django.conf import settings
+from django.db.models import Exists, F, OuterRef, Value
+from django.db.models.functions import Greatest, Left, StrIndex
+from django.utils import timezone
+
+from ..models import ArchivedMessage, MediaBlob, Message
+from .media_store import CAS_DIR, TMP_DIR
+
+
+BATCH_SIZE = 1000
+# Tablas con mensajes que referencian archivos (la caliente y la de archivo)
+MESSAGE_MODELS = (Message, ArchivedMessage)
+# Directorio de los archivos guardados antes del almacén por contenido
+LEGACY_DIR = 'attachments'
+# Subidas interrumpidas que quedaron en cas/tmp
+TMP_MAX_AGE = timedelta(days=1)
+
+
+class MediaReport:
+    """Acumulador de archivos y bytes por categoría"""
+
+    def __init__(self):
+        self.files = Counter()
+        self.bytes = Counter()
+
+    def add(self, category, size, count=1):
+        self.files[category] += count
+        self.bytes[category] += size or 0
+
+    def lines(self):
+        for category in sorted(self.files):
+            yield category, self.files[category], self.bytes[category]
+
+
+def _absolute(relative_path):
+    return os.path.join(settings.MEDIA_ROOT, relative_path)
+
+
+def _remove(relative_path):
+    try:
+        os.remove(_absolute(relative_path))
+    except FileNotFoundError:
+        pass
+
+
+def _file_size(relative_path):
+    try:
+        return os.path.getsize(_absolute(relative_path))
+    except OSError:
+        return 0
+
+
+def _legacy_path(media_url):
+    """Ruta relativa a MEDIA_ROOT de un media_url local (absoluta o relativa); None si no es local"""
+    if not media_url or settings.MEDIA_URL not in media_url:
+        return None
+    return media_url.split(settings.MEDIA_URL, 1)[1].split('?', 1)[0]
+
+
+def retention_policies():
+    """{message_type: (días, tamaño mínimo en bytes)} de las políticas activas"""
+    return {
+        message_type: (policy['days'], policy.get('min_size', 0))
+        for message_type, policy in getattr(settings, 'MEDIA_RETENTION', {}).items()
+        if policy.get('days')
+    }
+
+
+def apply_retention(report, dry_run=False, now=None):
+    """Quita el archivo a los mensajes que superan la política de retención de su tipo"""
+    now = now or timezone.now()
+    for (message_type, (days, min_size)), model in product(retention_policies().items(), MESSAGE_MODELS):
+        expired = (
+            model.objects.filter(
+                message_type=message_type,
+                media_url__isnull=False,
+                created_at__lt=now - timedelta(days=days),
+            )
+            .select_related('media_blob')
+            .only('id', 'media_url', 'media_blob__size')
+        )
+        batch = []
+        for message in expired.iterator(chunk_size=BATCH_SIZE):
+            if message.media_blob is not None:
+                size = message.media_blob.size
+            else:
+                path = _legacy_path(message.media_url)
+                size = _file_size(path) if path else 0
+            if size < min_size:
+                continue
+            report.add(f'retención: {message_type}', size)
+            batch.append(message)
+            if len(batch) >= BATCH_SIZE:
+                _detach(model, batch, dry_run)
+                batch = []
+        _detach(model, batch, dry_run)
+
+
+def _detach(model, messages, dry_run):
+    if dry_run or not messages:
+        return
+    # update() no dispara las señales de Message: las referencias se descuentan aquí
+    released = Counter(message.media_blob_id for message in messages if message.media_blob_id)
+    model.objects.filter(id__in=[message.id for message in messages]).update(media_url=None, media_blob=None)
+    for blob_id, count in released.items():
+        # Sin bajar de 0 si el contador se desvió (mensajes creados sin add_reference)
+        MediaBlob.objects.filter(pk=blob_id).update(ref_count=Greatest(F('ref_count') - count, 0))
+
+
+def _no_messages():
+    """Condición de MediaBlob sin mensajes, activos ni archivados"""
+    return ~Exists(Message.objects.filter(media_blob=OuterRef('pk'))) & ~Exists(
+        ArchivedMessage.objects.filter(media_blob=OuterRef('pk'))
+    )
+
+
+def collect_unreferenced_blobs(report, grace, dry_run=False, now=None):
+    """Borra los archivos del almacén que ningún mensaje usa desde hace más de `grace`"""
+    cutoff = (now or timezone.now()) - grace
+    unreferenced = MediaBlob.objects.filter(created_at__lt=cutoff).exclude(
+        last_referenced_at__gte=cutoff
+    ).filter(_no_messages())
+
+    for blob in unreferenced.only('id', 'path', 'thumbnail_path', 'size').iterator(chunk_size=BATCH_SIZE):
+        report.add('almacén sin mensajes', blob.size)
+        if dry_run:
+            continue
+        # La fila primero: una subida del mismo contenido a partir de aquí crea una nueva
+        # Se vuelve a comprobar: una subida pudo reutilizarlo mientras tanto (media_store._reused)
+        deleted, _ = MediaBlob.objects.filter(pk=blob.pk).exclude(
+            last_referenced_at__gte=cutoff
+        ).filter(_no_messages()).delete()
+        if deleted:
+            _remove(blob.path)
+            if blob.thumbnail_path:
+                _remove(blob.thumbnail_path)
+
+
+def _walk(relative_dir):
+    """Archivos bajo un directorio de MEDIA_ROOT como (ruta relativa, stat), sin cargar directorios enteros en memoria"""
+    try:
+        entries = os.scandir(_absolute(relative_dir))
+    except FileNotFoundError:
+        return
+    with entries:
+        for entry in entries:
+            relative = f"{relative_dir}/{entry.name}"
+            if entry.is_dir(follow_symlinks=False):
+                yield from _walk(relative)
+            elif entry.is_file(follow_symlinks=False):
+                yield relative, entry.stat(follow_symlinks=False)
+
+
+def _batches(iterable, size):
+    batch = []
+    for item in iterable:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _url_prefixes():
+    """
+    Prefijos de host con los que se guardaron los media_url locales
+
+    ('' para las relativas, MEDIA_DOMAIN o el host que vio el bridge para
+    las absolutas). Son pocos: permiten buscar cada archivo por igualdad
+    exacta en el índice de media_url.
+    """
+    prefixes = {''}
+    for model in MESSAGE_MODELS:
+        prefixes.update(
+            model.objects.filter(media_url__contains=settings.MEDIA_URL)
+            .annotate(prefix=Left('media_url', StrIndex('media_url', Value(settings.MEDIA_URL)) - 1))
+            .values_list('prefix', flat=True)
+            .distinct()
+            .order_by()
+        )
+    return prefixes
+
+
+def sweep_storage(report, grace, dry_run=False):
+    """Recorre cas/ y attachments/ y borra los archivos que no pertenecen a ningún MediaBlob ni mensaje"""
+    now = time.time()
+    grace_seconds = grace.total_seconds()
+    prefixes = _url_prefixes()
+
+    files = (item for directory in (CAS_DIR, LEGACY_DIR) for item in _walk(directory))
+    for batch in _batches(files, BATCH_SIZE):
+        cas_files = defaultdict(list)
+        legacy_files = []
+        for relative, stat in batch:
+            age = now - stat.st_mtime
+            if relative.startswith(TMP_DIR + '/'):
+                if age > TMP_MAX_AGE.total_seconds():
+                    report.add('temporales de subida', stat.st_size)
+                    if not dry_run:
+                        _remove(relative)
+            elif age < grace_seconds:
+                # Recién escrito: puede estar a punto de referenciarse
+                continue
+            elif relative.startswith(CAS_DIR + '/'):
+                sha256 = os.path.basename(relative).split('.', 1)[0]
+                cas_files[sha256].append((relative, stat.st_size))
+            else:
+                legacy_files.append((relative, stat.st_size))
+
+        known = set(MediaBlob.objects.filter(sha256__in=list(cas_files)).values_list('sha256', flat=True))
+        for sha256, files in cas_files.items():
+            if sha256 in known:
+                continue
+            for relative, size in files:
+                report.add('almacén sin fila', size)
+                if not dry_run:
+                    _remove(relative)
+
+        urls = {
+            f"{prefix}{settings.MEDIA_URL}{relative}": relative
+            for relative, _ in legacy_files
+            for prefix in prefixes
+        }
+        referenced = {
+            urls[url]
+            for model in MESSAGE_MODELS
+            for url in model.objects.filter(media_url__in=list(urls)).values_list('media_url', flat=True)
+        }
+        for relative, size in legacy_files:
+            if relative in referenced:
+                continue
+            report.add('attachments sin mensajes', size)
+            if not dry_run:
+                _remove(relative)
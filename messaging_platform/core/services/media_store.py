@@ -0,0 +1,241 @@
+"""
+Almacén de multimedia direccionado por contenido
+
+Los archivos se guardan por su SHA-256 en MEDIA_ROOT/cas/ab/cd/<sha256><ext>
+(dos niveles de subdirectorios para no acumular miles de archivos en una
+sola carpeta). El hash se calcula mientras el archivo se copia por chunks a
+un temporal dentro de cas/tmp; si el contenido ya existe el temporal se
+descarta y se devuelve el archivo guardado, así las imágenes reenviadas y
+los PDFs repetidos ocupan disco una sola vez.
+
+MediaBlob.ref_count cuenta los mensajes cuyo media_url apunta al archivo
+(las señales de Message asignan Message.media_blob y actualizan la cuenta).
+"""
+import hashlib
+import mimetypes
+import os
+import re
+import tempfile
+
+from django.conf import settings
+from django.core import signing
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from ..models import MediaBlob
+
+
+CAS_DIR = 'cas'
+TMP_DIR = os.path.join(CAS_DIR, 'tmp')
+_EXTENSION_RE = re.compile(r'^\.[a-z0-9]{1,10}$')
+
+
+def _blob_url_re():
+    return re.compile(re.escape(settings.MEDIA_URL) + CAS_DIR + r'/[0-9a-f]{2}/[0-9a-f]{2}/([0-9a-f]{64})')
+
+
+def _extension(name):
+    ext = os.path.splitext(name or '')[1].lower()
+    return ext if _EXTENSION_RE.match(ext) else ''
+
+
+def blob_path(sha256, ext=''):
+    """Ruta relativa a MEDIA_ROOT de un contenido"""
+    return f"{CAS_DIR}/{sha256[:2]}/{sha256[2:4]}/{sha256}{ext}"
+
+
+def sha256_from_url(media_url):
+    """SHA-256 del archivo si media_url (relativa o absoluta) apunta al almacén; None si no"""
+    if not media_url:
+        return None
+    match = _blob_url_re().search(media_url)
+    return match.group(1) if match else None
+
+
+def _absolute(relative_path):
+    return os.path.join(settings.MEDIA_ROOT, relative_path)
+
+
+def _spool(chunks):
+    """Copia los chunks a un temporal del almacén calculando el hash; devuelve (ruta, sha256, tamaño)"""
+    tmp_dir = _absolute(TMP_DIR)
+    os.makedirs(tmp_dir, exist_ok=True)
+    digest = hashlib.sha256()
+    size = 0
+    fd, tmp_path = tempfile.mkstemp(dir=tmp_dir)
+    try:
+        with os.fdopen(fd, 'wb') as tmp:
+            for chunk in chunks:
+                digest.update(chunk)
+                size += len(chunk)
+                tmp.write(chunk)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+    return tmp_path, digest.hexdigest(), size
+
+
+# Firmas de los formatos que se envían por el chat (los primeros bytes del archivo)
+_SIGNATURES = [
+    (0, b'\xff\xd8\xff', 'image/jpeg'),
+    (0, b'\x89PNG\r\n\x1a\n', 'image/png'),
+    (0, b'GIF87a', 'image/gif'),
+    (0, b'GIF89a', 'image/gif'),
+    (0, b'%PDF-', 'application/pdf'),
+    (0, b'OggS', 'audio/ogg'),
+    (0, b'ID3', 'audio/mpeg'),
+    (0, b'\x1a\x45\xdf\xa3', 'video/webm'),
+    (4, b'ftypqt', 'video/quicktime'),
+    (4, b'ftypM4A', 'audio/mp4'),
+    (4, b'ftyp', 'video/mp4'),
+]
+SNIFF_BYTES = 16
+
+
+def sniff_content_type(head, name=''):
+    """
+    Tipo MIME a partir de los primeros bytes del archivo
+
+    Los contenedores que no se distinguen por la firma (ZIP de Office, RIFF)
+    se resuelven por la extensión; si nada coincide se usa la extensión.
+    """
+    if head[:4] == b'RIFF' and head[8:12] == b'WEBP':
+        return 'image/webp'
+    if head[:4] == b'RIFF' and head[8:12] == b'WAVE':
+        return 'audio/wav'
+    for offset, signature, content_type in _SIGNATURES:
+        if head[offset:offset + len(signature)] == signature:
+            return content_type
+    if head[:2] == b'\xff\xfb' or head[:2] == b'\xff\xf3':
+        return 'audio/mpeg'
+    return mimetypes.guess_type(name or '')[0] or 'application/octet-stream'
+
+
+def _has_preview(content_type):
+    return content_type.startswith(('image/', 'video/'))
+
+
+def _start_derivatives():
+    # Import diferido: Pillow solo se carga donde se generan miniaturas
+    from .media_derivatives import start_background_generation
+    start_background_generation()
+
+
+def _reused(blob):
+    """
+    Marca como recién referenciado un archivo que reutiliza una subida
+
+    El mensaje que lo usará aún no existe: sin esto la recolección (media_gc)
+    podría borrar un archivo viejo sin mensajes justo después de devolverlo.
+    """
+    now = timezone.now()
+    MediaBlob.objects.filter(pk=blob.pk).update(last_referenced_at=now)
+    blob.last_referenced_at = now
+    return blob, False
+
+
+def _commit(tmp_path, sha256, size, name, content_type):
+    """Mueve un temporal ya hasheado a su ruta definitiva (o lo descarta si el contenido existe)"""
+    blob = MediaBlob.objects.filter(sha256=sha256).first()
+    if blob is not None and os.path.isfile(_absolute(blob.path)):
+        os.remove(tmp_path)
+        return _reused(blob)
+
+    path = blob.path if blob is not None else blob_path(sha256, _extension(name))
+    final_path = _absolute(path)
+    os.makedirs(os.path.dirname(final_path), exist_ok=True)
+    # Mismo sistema de archivos: el archivo aparece completo o no aparece
+    os.replace(tmp_path, final_path)
+    os.chmod(final_path, 0o644)
+
+    if blob is not None:
+        # La fila existía pero faltaba el archivo: se restauró
+        return _reused(blob)
+
+    try:
+        with transaction.atomic():
+            blob = MediaBlob.objects.create(
+                sha256=sha256,
+                path=path,
+                size=size,
+                content_type=content_type[:100],
+                original_name=name[:255],
+                derivatives_status='pending' if _has_preview(content_type) else 'skipped',
+            )
+        if blob.derivatives_status == 'pending':
+            transaction.on_commit(_start_derivatives)
+        return blob, True
+    except IntegrityError:
+        # Otra subida del mismo contenido ganó la carrera (mismo archivo en disco)
+        return _reused(MediaBlob.objects.get(sha256=sha256))
+
+
+def store_file(uploaded_file):
+    """
+    Guarda un archivo subido (UploadedFile o File de Django) en el almacén
+
+    Los archivos recibidos con MediaStoreUploadHandler ya están hasheados en
+    el directorio temporal del almacén: solo se mueven, sin volver a leerlos.
+
+    Returns:
+        tuple: (MediaBlob, created) — created es False si el contenido ya existía
+    """
+    name = os.path.basename(uploaded_file.name or '')
+    sha256 = getattr(uploaded_file, 'sha256', None)
+    if sha256:
+        result = _commit(uploaded_file.temporary_file_path(), sha256, uploaded_file.size,
+                         name, uploaded_file.content_type)
+        # El temporal ya se movió o descartó: al cerrar el archivo no hay que borrarlo
+        uploaded_file.stored = True
+        return result
+
+    tmp_path, sha256, size = _spool(uploaded_file.chunks())
+    with open(tmp_path, 'rb') as tmp:
+        content_type = sniff_content_type(tmp.read(SNIFF_BYTES), name)
+    return _commit(tmp_path, sha256, size, name, content_type)
+
+
+def blob_for_url(media_url):
+    """MediaBlob al que apunta media_url (None si no es del almacén)"""
+    sha256 = sha256_from_url(media_url)
+    if not sha256:
+        return None
+    return MediaBlob.objects.filter(sha256=sha256).first()
+
+
+def add_reference(blob_id):
+    """Suma una referencia al archivo"""
+    MediaBlob.objects.filter(pk=blob_id).update(ref_count=F('ref_count') + 1, last_referenced_at=timezone.now())
+
+
+def release_reference(blob_id):
+    """Resta una referencia; el archivo sin referencias se conserva para que lo limpie la recolección"""
+    MediaBlob.objects.filter(pk=blob_id, ref_count__gt=0).update(ref_count=F('ref_count') - 1)
+
+
+def original_name(media_url):
+    """Nombre con el que se subió el archivo por primera vez (None si no es del almacén)"""
+    sha256 = sha256_from_url(media_url)
+    if not sha256:
+        return None
+    return MediaBlob.objects.filter(sha256=sha256).values_list('original_name', flat=True).first() or None
+
+
+def _signer():
+    return signing.TimestampSigner(salt='core.media')
+
+
+def signed_media_url(relative_path):
+    """URL del archivo con un token temporal, para quien no tiene sesión (el bridge en modo 'url')"""
+    token = _signer().sign(relative_path).split(':', 1)[1]
+    return f"{settings.MEDIA_URL}{relative_path}?token={token}"
+
+
+def valid_media_token(relative_path, token):
+    """True si el token es de este archivo y no ha caducado (MEDIA_SIGNED_URL_TTL)"""
+    try:
+        _signer().unsign(f"{relative_path}:{token}", max_age=getattr(settings, 'MEDIA_SIGNED_URL_TTL', 3600))
+    except signing.BadSignature:
+        return False
+    return True
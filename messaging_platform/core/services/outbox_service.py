@@ -0,0 +1,271 @@
+"""
+Outbox de mensajes salientes
+
+Las vistas guardan el mensaje del agente en estado 'queued' y responden de
+inmediato; la entrega a la plataforma la hacen los workers
+(process_outbox) respetando el orden por conversación, con reintentos y
+backoff exponencial. Solo se reintentan solos los envíos que no llegaron a
+la plataforma (error de conexión); un timeout de lectura puede haber
+entregado el mensaje, así que queda 'failed' como cualquier otro fallo,
+visible y reintentable a mano desde la API.
+"""
+import threading
+import uuid
+from collections import Counter
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection, transaction, IntegrityError
+from django.db.models import Exists, OuterRef
+from django.utils import timezone
+
+from ..models import CampaignRecipient, Message
+from .campaign_service import delivery_bucket
+from .media_store import original_name
+
+
+PENDING_STATUSES = ('queued', 'sending')
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+def enqueue_message(conversation, content, sender_user=None, message_type='text', media_url=None):
+    """
+    Guarda un mensaje saliente en cola y actualiza la conversación
+
+    Returns:
+        Message: el mensaje en estado 'queued'
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        message = Message.objects.create(
+            conversation=conversation,
+            platform_message_id=f"out_{uuid.uuid4().hex}",
+            sender_type='agent',
+            sender_user=sender_user,
+            message_type=message_type,
+            content=content,
+            media_url=media_url,
+            delivery_status='queued',
+            next_attempt_at=now,
+        )
+
+        conversation.last_message_at = now
+        conversation.last_response_at = now
+        conversation.is_answered = True
+        conversation.needs_response = False  # El agente respondió, ya no necesita respuesta
+        conversation.save()
+
+        if _setting('OUTBOX_INLINE_DELIVERY', True):
+            transaction.on_commit(_start_inline_delivery)
+
+    return message
+
+
+def retry_message(message):
+    """Vuelve a poner en cola un mensaje fallido"""
+    if message.delivery_status != 'failed':
+        return False
+    message.delivery_status = 'queued'
+    message.delivery_attempts = 0
+    message.delivery_error = None
+    message.next_attempt_at = timezone.now()
+    message.save(update_fields=['delivery_status', 'delivery_attempts', 'delivery_error', 'next_attempt_at'])
+
+    if _setting('OUTBOX_INLINE_DELIVERY', True):
+        transaction.on_commit(_start_inline_delivery)
+    return True
+
+
+def _paused_campaign():
+    """Subconsulta: el mensaje (OuterRef) es de una campaña pausada"""
+    return Exists(CampaignRecipient.objects.filter(message=OuterRef('pk'), campaign__status='paused'))
+
+
+def claim_pending(limit=20, campaigns=True):
+    """
+    Reserva mensajes listos para enviar (uno por conversación, el más antiguo)
+
+    Un mensaje solo es elegible si no hay otro anterior pendiente en su
+    conversación. Los 'sending' cuyo lease expiró (worker caído) vuelven a
+    ser elegibles. Con SKIP LOCKED varios workers pueden correr en paralelo.
+
+    Los mensajes de campaña se entregan al ritmo del token bucket de su
+    canal (delivery_bucket, compartido por todos los workers a través de la
+    base): los que no tienen turno se reprograman para
+    más adelante. Los de campañas pausadas se retienen sin bloquear al
+    resto de su conversación. Con campaigns=False no se reservan mensajes
+    de campaña (entrega inmediata desde las vistas).
+    """
+    now = timezone.now()
+    older_pending = Message.objects.filter(
+        conversation=OuterRef('conversation'),
+        delivery_status__in=PENDING_STATUSES,
+        pk__lt=OuterRef('pk'),
+    ).exclude(_paused_campaign())
+    is_campaign = Exists(CampaignRecipient.objects.filter(message=OuterRef('pk')))
+
+    with transaction.atomic():
+        candidates = (
+            Message.objects.select_for_update(skip_locked=True, of=('self',))
+            .select_related('conversation__contact__platform')
+            .filter(delivery_status__in=PENDING_STATUSES, next_attempt_at__lte=now)
+            .exclude(Exists(older_pending))
+            .exclude(_paused_campaign())
+            .annotate(is_campaign=is_campaign)
+        )
+        if not campaigns:
+            candidates = candidates.filter(is_campaign=False)
+
+        candidates = list(candidates.order_by('next_attempt_at', 'pk')[:limit])
+        # Un take por canal (en orden fijo: las filas de los buckets se bloquean sin interbloqueos)
+        wanted = Counter(m.conversation.contact.platform.name for m in candidates if m.is_campaign)
+        buckets, granted = {}, {}
+        for channel in sorted(wanted):
+            buckets[channel] = delivery_bucket(channel)
+            granted[channel] = buckets[channel].take(wanted[channel]) if buckets[channel] else wanted[channel]
+
+        messages, deferred, waiting = [], [], {}
+        for message in candidates:
+            channel = message.conversation.contact.platform.name
+            if not message.is_campaign or granted[channel] > 0:
+                if message.is_campaign:
+                    granted[channel] -= 1
+                messages.append(message)
+                continue
+            # Sin token: se aparta para no ocupar el lote de los siguientes
+            waiting[channel] = waiting.get(channel, 0) + 1
+            message.next_attempt_at = now + timedelta(seconds=waiting[channel] / buckets[channel].rate)
+            deferred.append(message)
+
+        lease = now + timedelta(seconds=_setting('OUTBOX_LEASE_SECONDS', 60))
+        for message in messages:
+            message.delivery_status = 'sending'
+            message.delivery_attempts += 1
+            message.next_attempt_at = lease
+        Message.objects.bulk_update(messages, ['delivery_status', 'delivery_attempts', 'next_attempt_at'])
+        Message.objects.bulk_update(deferred, ['next_attempt_at'])
+
+    return messages
+
+
+def deliver(message):
+    """
+    Envía el mensaje a su plataforma
+
+    Returns:
+        dict: {'success': bool, 'message_id': str} o
+        {'success': False, 'error': str, 'retryable': bool}
+    """
+    contact = message.conversation.contact
+    platform = contact.platform.name
+
+    if platform == 'whatsapp':
+        from .whatsapp_service import WhatsAppService
+        to_number = contact.phone or contact.platform_user_id
+        service = WhatsAppService()
+        if message.message_type == 'text':
+            result = service.send_message(to_number, message.content)
+        else:
+            # En el almacén por contenido el archivo se llama por su hash: se envía con su nombre original
+            filename = original_name(message.media_url) or (
+                message.media_url.rsplit('/', 1)[-1] if message.media_url else ''
+            )
+            # El servicio decide cómo entregar el archivo al bridge (WHATSAPP_MEDIA_HANDOFF)
+            result = service.send_file(to_number, message.message_type, message.media_url or '',
+                                       message.content, filename)
+        message_id = result.get('data', {}).get('message_id') if result.get('success') else None
+
+    elif platform in ('telegram', 'facebook'):
+        if message.message_type != 'text':
+            return {'success': False, 'error': f'Envío de {message.message_type} no soportado en {platform}', 'retryable': False}
+        if platform == 'telegram':
+            from .telegram_service import TelegramService, message_key
+            result = TelegramService().send_message(contact.platform_user_id, message.content)
+            sent_id = result.get('data', {}).get('result', {}).get('message_id') if result.get('success') else None
+            message_id = message_key(contact.platform_user_id, sent_id) if sent_id else None
+        else:
+            from .facebook_service import FacebookService
+            result = FacebookService().send_message(contact.platform_user_id, message.content)
+            message_id = result.get('data', {}).get('message_id') if result.get('success') else None
+
+    else:
+        return {'success': False, 'error': f'Plataforma no soportada: {platform}', 'retryable': False}
+
+    if not result.get('success'):
+        return {
+            'success': False,
+            'error': str(result.get('error', 'Error desconocido')),
+            'retryable': result.get('retryable', False),
+        }
+    return {'success': True, 'message_id': message_id}
+
+
+def _mark_sent(message, platform_message_id):
+    fields = {'delivery_status': 'sent', 'delivery_error': None, 'next_attempt_at': None}
+    if platform_message_id:
+        try:
+            with transaction.atomic():
+                Message.objects.filter(pk=message.pk).update(platform_message_id=platform_message_id, **fields)
+            return
+        except IntegrityError:
+            # El ID ya existe (eco del bridge): conservar el ID local
+            pass
+    Message.objects.filter(pk=message.pk).update(**fields)
+
+
+def _mark_failed_attempt(message, error, retryable):
+    max_attempts = _setting('OUTBOX_MAX_ATTEMPTS', 5)
+    if not retryable or message.delivery_attempts >= max_attempts:
+        Message.objects.filter(pk=message.pk).update(
+            delivery_status='failed', delivery_error=error, next_attempt_at=None
+        )
+        return 'failed'
+
+    delay = _setting('OUTBOX_RETRY_BASE_SECONDS', 5) * 2 ** (message.delivery_attempts - 1)
+    Message.objects.filter(pk=message.pk).update(
+        delivery_status='queued',
+        delivery_error=error,
+        next_attempt_at=timezone.now() + timedelta(seconds=delay),
+    )
+    return 'retry'
+
+
+def process_outbox(limit=20, campaigns=True):
+    """
+    Reserva y entrega un lote de mensajes
+
+    Returns:
+        dict: contadores sent / retry / failed
+    """
+    counts = {'sent': 0, 'retry': 0, 'failed': 0}
+    for message in claim_pending(limit, campaigns):
+        try:
+            result = deliver(message)
+        except Exception as e:
+            result = {'success': False, 'error': str(e), 'retryable': False}
+
+        if result['success']:
+            _mark_sent(message, result.get('message_id'))
+            counts['sent'] += 1
+        else:
+            print(f"❌ Outbox: mensaje {message.pk} no entregado (intento {message.delivery_attempts}): {result['error']}")
+            counts[_mark_failed_attempt(message, result['error'], result.get('retryable', False))] += 1
+    return counts
+
+
+def _inline_delivery():
+    try:
+        # Las campañas las entregan solo los workers, al ritmo de su canal
+        process_outbox(limit=_setting('OUTBOX_INLINE_BATCH', 5), campaigns=False)
+    except Exception as e:
+        print(f"❌ Outbox: error en entrega inmediata: {e}")
+    finally:
+        connection.close()
+
+
+def _start_inline_delivery():
+    """Intenta la entrega en segundo plano sin esperar al worker"""
+    threading.Thread(target=_inline_delivery, daemon=True).start()
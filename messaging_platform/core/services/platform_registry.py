@@ -0,0 +1,43 @@
+"""
+Registro en memoria de las plataformas de mensajería
+
+Los servicios se instancian en cada webhook y cada envío; cachear las filas
+de Platform evita una consulta por instancia. La caché se invalida con las
+señales post_save/post_delete de Platform (ver core/signals.py) y caduca
+tras PLATFORM_REGISTRY_TTL segundos para recoger cambios hechos desde
+otros procesos.
+"""
+import threading
+import time
+
+from django.conf import settings
+
+from ..models import Platform
+
+
+_platforms = {}
+_lock = threading.Lock()
+
+
+def get_platform(name):
+    """
+    Devuelve la plataforma por nombre desde la caché
+
+    Raises:
+        Platform.DoesNotExist: si la plataforma no existe
+    """
+    ttl = getattr(settings, 'PLATFORM_REGISTRY_TTL', 300)
+    cached = _platforms.get(name)
+    if cached and time.monotonic() - cached[1] < ttl:
+        return cached[0]
+
+    platform = Platform.objects.get(name=name)
+    with _lock:
+        _platforms[name] = (platform, time.monotonic())
+    return platform
+
+
+def invalidate_platforms():
+    """Vacía la caché (llamado desde las señales de Platform)"""
+    with _lock:
+        _platforms.clear()
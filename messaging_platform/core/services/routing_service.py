@@ -0,0 +1,102 @@
+"""
+Tabla de enrutamiento de mensajes a departamentos
+
+Las reglas activas (RoutingRule) se compilan en memoria en un diccionario
+indexado por número de negocio. Clasificar un mensaje cuesta una búsqueda
+por cada longitud distinta de número configurada (normalmente una o dos),
+sin importar cuántas líneas haya; después solo se recorren las pocas reglas
+de ese número.
+
+La tabla se invalida con las señales post_save/post_delete de RoutingRule
+(ver core/signals.py) y caduca tras ROUTING_TABLE_TTL segundos para recoger
+cambios hechos desde otros procesos.
+"""
+import threading
+import time
+
+from django.conf import settings
+
+from ..models import RoutingRule
+
+
+_table = None
+_lock = threading.Lock()
+
+
+def normalize_number(number):
+    """Dígitos del número, sin dominio de WhatsApp ni sufijo de dispositivo (573001234567:12@s.whatsapp.net)"""
+    number = (number or '').split('@', 1)[0].split(':', 1)[0]
+    return ''.join(filter(str.isdigit, number))
+
+
+class RoutingTable:
+    """Reglas compiladas: número → reglas ordenadas (con las reglas sin número ya mezcladas)"""
+
+    def __init__(self, rules):
+        # Ante igual prioridad gana la regla más específica (con palabra clave o país)
+        def sort_key(rule):
+            return (rule.priority, not rule.keyword, not rule.country, rule.id)
+
+        compiled = [
+            (sort_key(rule), rule.department, rule.keyword.lower(), rule.country.strip().lower())
+            for rule in rules
+        ]
+        generic = [entry for entry, rule in zip(compiled, rules) if not rule.phone_number]
+
+        by_number = {}
+        for entry, rule in zip(compiled, rules):
+            if rule.phone_number:
+                by_number.setdefault(rule.phone_number, []).append(entry)
+        self.by_number = {
+            number: [entry[1:] for entry in sorted(entries + generic)]
+            for number, entries in by_number.items()
+        }
+        self.generic = [entry[1:] for entry in sorted(generic)]
+        self.departments = {number: {entry[1] for entry in entries} for number, entries in by_number.items()}
+        # Longitudes de mayor a menor: gana el número más largo que coincide
+        self.lengths = sorted({len(number) for number in self.by_number}, reverse=True)
+
+    def _candidates(self, number):
+        for length in self.lengths:
+            if len(number) >= length:
+                entries = self.by_number.get(number[-length:])
+                if entries is not None:
+                    return entries
+        return self.generic
+
+    def match(self, number, content='', country=''):
+        """Departamento de la primera regla que coincide (None si ninguna)"""
+        content = (content or '').lower()
+        country = (country or '').strip().lower()
+        for department, keyword, rule_country in self._candidates(normalize_number(number)):
+            if keyword and keyword not in content:
+                continue
+            if rule_country and rule_country != country:
+                continue
+            return department
+        return None
+
+    def numbers_for(self, department):
+        """Números del negocio con alguna regla hacia el departamento"""
+        return [number for number, departments in self.departments.items() if department in departments]
+
+
+def get_routing_table():
+    """Tabla compilada desde la caché del proceso"""
+    global _table
+    ttl = getattr(settings, 'ROUTING_TABLE_TTL', 300)
+    cached = _table
+    if cached and time.monotonic() - cached[1] < ttl:
+        return cached[0]
+
+    table = RoutingTable(list(RoutingRule.objects.filter(is_active=True)))
+    with _lock:
+        _table = (table, time.monotonic())
+    return table
+
+
+def invalidate_routing_table():
+    """Descarta la tabla compilada (llamado desde las señales de RoutingRule)"""
+    global _table
+    with _lock:
+        _table = None
@@ -0,0 +1,151 @@
+"""
+Mensajes programados
+
+Los agentes programan mensajes para una fecha y hora (seguimientos,
+contacto de casos de recuperación). El dispatcher (dispatch_scheduled) toma
+los vencidos en lotes con SELECT ... FOR UPDATE SKIP LOCKED sobre un índice
+parcial de pendientes, así varios dispatchers pueden correr en paralelo sin
+enviar dos veces, y los deja en el outbox. Entre lotes duerme hasta el
+siguiente vencimiento en lugar de consultar la tabla continuamente.
+"""
+from collections import Counter
+from datetime import datetime, time, timedelta
+
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from ..models import Conversation, Message, RecoveryCase, ScheduledMessage
+
+
+class SchedulingError(ValueError):
+    """Datos no válidos para programar o cancelar un mensaje"""
+
+
+def parse_send_at(value):
+    """
+    Fecha de envío desde ISO 8601 (también 'YYYY-MM-DDTHH:MM' de un input datetime-local)
+
+    Sin zona horaria se interpreta en la zona del proyecto (TIME_ZONE).
+    """
+    try:
+        send_at = datetime.fromisoformat(value)
+    except (TypeError, ValueError):
+        raise SchedulingError('Fecha de envío no válida (formato ISO: 2025-01-31T09:00)')
+    if timezone.is_naive(send_at):
+        send_at = timezone.make_aware(send_at)
+    return send_at
+
+
+def schedule_message(conversation, content, send_at, user=None, recovery_case=None):
+    """Programa un mensaje de texto para la conversación"""
+    content = (content or '').strip()
+    if not content:
+        raise SchedulingError('El mensaje no puede estar vacío')
+    if send_at <= timezone.now():
+        raise SchedulingError('La fecha de envío debe ser futura')
+    if recovery_case is not None and recovery_case.conversation_id != conversation.id:
+        raise SchedulingError('El caso de recuperación no pertenece a la conversación')
+
+    return ScheduledMessage.objects.create(
+        conversation=conversation,
+        recovery_case=recovery_case,
+        created_by=user,
+        content=content,
+        send_at=send_at,
+    )
+
+
+def schedule_recovery_outreach(recovery_case, content, user=None, at=time(9, 0)):
+    """Programa el contacto de un caso de recuperación en su fecha objetivo (por defecto a las 9:00)"""
+    if not recovery_case.target_recovery_date:
+        raise SchedulingError('El caso de recuperación no tiene fecha objetivo')
+    send_at = timezone.make_aware(datetime.combine(recovery_case.target_recovery_date, at))
+    return schedule_message(recovery_case.conversation, content, send_at, user, recovery_case)
+
+
+def cancel_scheduled(scheduled):
+    """
+    Cancela un mensaje pendiente
+
+    La actualización condicional evita la carrera con un dispatcher que lo
+    esté enviando en ese momento.
+    """
+    cancelled = ScheduledMessage.objects.filter(pk=scheduled.pk, status='pending').update(
+        status='cancelled', updated_at=timezone.now()
+    )
+    if not cancelled:
+        raise SchedulingError('Solo se pueden cancelar mensajes pendientes')
+    scheduled.status = 'cancelled'
+    return scheduled
+
+
+def dispatch_due(limit=100):
+    """
+    Pasa al outbox hasta `limit` mensajes vencidos
+
+    Número fijo de consultas por lote, independiente de su tamaño.
+
+    Returns:
+        int: mensajes despachados
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        due = list(
+            ScheduledMessage.objects.select_for_update(skip_locked=True, of=('self',))
+            .filter(status='pending', send_at__lte=now)
+            .order_by('send_at', 'id')[:limit]
+        )
+        if not due:
+            return 0
+
+        messages = []
+        for scheduled in due:
+            message = Message(
+                conversation_id=scheduled.conversation_id,
+                platform_message_id=f"sched_{scheduled.pk}",
+                sender_type='agent',
+                sender_user_id=scheduled.created_by_id,
+                message_type='text',
+                content=scheduled.content,
+                delivery_status='queued',
+                next_attempt_at=now,
+            )
+            scheduled.message = message
+            scheduled.status = 'dispatched'
+            # auto_now no se aplica en bulk_update
+            scheduled.updated_at = now
+            messages.append(message)
+        Message.objects.bulk_create(messages)
+        ScheduledMessage.objects.bulk_update(due, ['status', 'message', 'updated_at'])
+
+        Conversation.objects.filter(pk__in={s.conversation_id for s in due}).update(
+            last_message_at=now,
+            last_response_at=now,
+            is_answered=True,
+            needs_response=False,  # El agente respondió, ya no necesita respuesta
+        )
+
+        # Cada mensaje de un caso de recuperación cuenta como un intento de contacto
+        attempts = Counter(s.recovery_case_id for s in due if s.recovery_case_id)
+        for recovery_case_id, count in attempts.items():
+            RecoveryCase.objects.filter(pk=recovery_case_id).update(
+                attempts_count=F('attempts_count') + count, last_attempt_at=now
+            )
+
+    return len(due)
+
+
+def seconds_until_next_due(max_wait):
+    """Segundos hasta el próximo vencimiento (una lectura del índice), como máximo max_wait"""
+    next_send_at = (
+        ScheduledMessage.objects.filter(status='pending')
+        .order_by('send_at')
+        .values_list('send_at', flat=True)
+        .first()
+    )
+    if next_send_at is None:
+        return max_wait
+    wait = (next_send_at - timezone.now()) / timedelta(seconds=1)
+    # Un vencido que sigue pendiente lo tiene reservado otro dispatcher: no girar en vacío
+    return min(max(wait, 0.5), max_wait)
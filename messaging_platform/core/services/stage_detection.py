@@ -0,0 +1,189 @@
+"""
+Detección automática de la etapa del embudo por palabras clave
+
+Todas las frases de las reglas activas (StageRule) se compilan en un único
+autómata Aho-Corasick: cada mensaje se recorre una sola vez, con coste
+lineal en su longitud sin importar cuántas reglas o frases haya. Solo si
+alguna frase coincide se consulta la conversación.
+
+El texto se normaliza (minúsculas, sin tildes) y las coincidencias deben
+ser palabras completas: "precio" no coincide dentro de "preciosa".
+
+Las reglas en modo 'apply' mueven la conversación a la etapa destino (solo
+hacia delante dentro del embudo); las de modo 'suggest' solo lo registran.
+Ambas quedan en ActivityLog. El autómata se invalida con las señales de
+StageRule y caduca tras STAGE_RULES_TTL segundos, como la tabla de
+enrutamiento.
+"""
+import threading
+import time
+import unicodedata
+from collections import deque
+
+from django.conf import settings
+
+from ..models import ActivityLog, Conversation, StageRule
+
+
+_detector = None
+_lock = threading.Lock()
+
+# Orden de las etapas dentro de cada embudo (el de FUNNEL_STAGE_CHOICES)
+_STAGE_ORDER = {stage: index for index, (stage, _) in enumerate(Conversation.FUNNEL_STAGE_CHOICES)}
+
+
+def normalize_text(text):
+    """Minúsculas y sin tildes; conserva la longitud para las fronteras de palabra"""
+    decomposed = unicodedata.normalize('NFKD', (text or '').lower())
+    return ''.join(char for char in decomposed if not unicodedata.combining(char))
+
+
+class AhoCorasick:
+    """Autómata de búsqueda simultánea de varios patrones"""
+
+    def __init__(self, patterns):
+        """
+        Args:
+            patterns: iterable de (patrón, valor); el valor se devuelve en cada coincidencia
+        """
+        self.goto = [{}]
+        self.fail = [0]
+        self.output = [[]]
+        for pattern, value in patterns:
+            self._add(pattern, value)
+        self._build()
+
+    def _add(self, pattern, value):
+        state = 0
+        for char in pattern:
+            next_state = self.goto[state].get(char)
+            if next_state is None:
+                next_state = len(self.goto)
+                self.goto[state][char] = next_state
+                self.goto.append({})
+                self.fail.append(0)
+                self.output.append([])
+            state = next_state
+        self.output[state].append((len(pattern), value))
+
+    def _build(self):
+        # Enlaces de fallo por niveles (BFS); cada estado hereda las salidas de su enlace
+        queue = deque(self.goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self.goto[state].items():
+                queue.append(next_state)
+                fallback = self.fail[state]
+                while fallback and char not in self.goto[fallback]:
+                    fallback = self.fail[fallback]
+                candidate = self.goto[fallback].get(char, 0)
+                self.fail[next_state] = candidate if candidate != next_state else 0
+                self.output[next_state] = self.output[next_state] + self.output[self.fail[next_state]]
+
+    def search(self, text):
+        """Genera (inicio, fin, valor) de cada coincidencia en text"""
+        goto, fail, output = self.goto, self.fail, self.output
+        state = 0
+        for position, char in enumerate(text):
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            for length, value in output[state]:
+                yield position - length + 1, position + 1, value
+
+
+def _is_boundary(text, index):
+    return index < 0 or index >= len(text) or not text[index].isalnum()
+
+
+class StageDetector:
+    """Reglas activas compiladas en un autómata"""
+
+    def __init__(self, rules):
+        self.rules = {rule.id: rule for rule in rules}
+        self.matcher = AhoCorasick(
+            (normalize_text(phrase), rule.id)
+            for rule in rules
+            for phrase in rule.phrase_list()
+        )
+
+    def matching_rules(self, content, sender_type):
+        """Reglas con alguna frase en content, aplicables a la dirección del mensaje"""
+        if not self.rules or not content:
+            return []
+        text = normalize_text(content)
+        direction = 'inbound' if sender_type == 'contact' else 'outbound'
+        matched = set()
+        for start, end, rule_id in self.matcher.search(text):
+            if rule_id not in matched and _is_boundary(text, start - 1) and _is_boundary(text, end):
+                matched.add(rule_id)
+        return [
+            rule for rule in sorted((self.rules[rule_id] for rule_id in matched), key=lambda rule: (rule.priority, rule.id))
+            if rule.direction in (direction, 'both')
+        ]
+
+
+def get_detector():
+    """Autómata compilado desde la caché del proceso"""
+    global _detector
+    ttl = getattr(settings, 'STAGE_RULES_TTL', 300)
+    cached = _detector
+    if cached and time.monotonic() - cached[1] < ttl:
+        return cached[0]
+
+    detector = StageDetector(list(StageRule.objects.filter(is_active=True)))
+    with _lock:
+        _detector = (detector, time.monotonic())
+    return detector
+
+
+def invalidate_detector():
+    """Descarta el autómata compilado (llamado desde las señales de StageRule)"""
+    global _detector
+    with _lock:
+        _detector = None
+
+
+def _is_forward(current_stage, target_stage, funnel_type):
+    if not current_stage.startswith(f"{funnel_type}_"):
+        # Sin etapa o con una de otro embudo: cualquier etapa del embudo es un avance
+        return True
+    return _STAGE_ORDER[target_stage] > _STAGE_ORDER.get(current_stage, -1)
+
+
+def detect_stage(message):
+    """
+    Aplica o sugiere el cambio de etapa que indica el mensaje
+
+    Returns:
+        StageRule: la regla aplicada o sugerida (None si ninguna)
+    """
+    rules = get_detector().matching_rules(message.content, message.sender_type)
+    if not rules:
+        return None
+
+    conversation = message.conversation
+    for rule in rules:
+        if rule.funnel_type != conversation.funnel_type:
+            continue
+        if not _is_forward(conversation.funnel_stage, rule.target_stage, rule.funnel_type):
+            continue
+
+        old_stage = conversation.funnel_stage
+        if rule.mode == 'apply':
+            # update() para no pisar los campos que el webhook está guardando en la instancia
+            Conversation.objects.filter(pk=conversation.pk, funnel_stage=old_stage).update(funnel_stage=rule.target_stage)
+            conversation.funnel_stage = rule.target_stage
+            action = 'auto_stage_change'
+            description = f'Etapa cambiada automáticamente: {old_stage} → {rule.target_stage} (regla "{rule.name}")'
+        else:
+            action = 'stage_suggestion'
+            description = f'Etapa sugerida: {old_stage} → {rule.target_stage} (regla "{rule.name}")'
+            # La misma sugerencia se registra una sola vez por conversación
+            if ActivityLog.objects.filter(conversation=conversation, action=action, description=description).exists():
+                return rule
+
+        ActivityLog.objects.create(user=None, conversation=conversation, action=action, description=description)
+        print(f"🎯 {description} en conversación {conversation.id}")
+        return rule
+    return None
@@ -0,0 +1,60 @@
+"""
+Resolución diferida de archivos de Telegram
+
+El webhook guarda solo el file_id del archivo (Message.media_file_id) y una
+URL interna estable (/api/telegram/media/<file_id>/); no llama a getFile.
+La URL de descarga real (incluye el token del bot y caduca tras ~1 hora)
+se resuelve al primer acceso o en segundo plano con el comando
+resolve_telegram_media, y se cachea TELEGRAM_FILE_URL_TTL segundos.
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.urls import reverse
+
+
+FILE_URL_KEY = 'telegram_file_url:{}'
+
+
+def _ttl():
+    return getattr(settings, 'TELEGRAM_FILE_URL_TTL', 50 * 60)
+
+
+def media_proxy_url(file_id):
+    """URL interna que se guarda en Message.media_url"""
+    return reverse('telegram_media', args=[file_id])
+
+
+def resolve_file_url(file_id, service=None):
+    """URL de descarga del archivo (caché o getFile); None si no se pudo resolver"""
+    url = cache.get(FILE_URL_KEY.format(file_id))
+    if url:
+        return url
+
+    if service is None:
+        from .telegram_service import TelegramService
+        service = TelegramService()
+    url = service._get_file_url(file_id)
+    if url:
+        cache.set(FILE_URL_KEY.format(file_id), url, timeout=_ttl())
+    return url
+
+
+def warm_file_urls(file_ids, service=None, concurrency=None):
+    """
+    Resuelve en paralelo los file_id que no estén en caché
+
+    Returns:
+        int: URLs nuevas guardadas en la caché
+    """
+    file_ids = list(dict.fromkeys(file_ids))
+    cached = cache.get_many([FILE_URL_KEY.format(file_id) for file_id in file_ids])
+    missing = [file_id for file_id in file_ids if FILE_URL_KEY.format(file_id) not in cached]
+    if not missing:
+        return 0
+
+    if service is None:
+        from .telegram_service import TelegramService
+        service = TelegramService()
+    urls = service.get_file_urls(missing, concurrency=concurrency)
+    cache.set_many({FILE_URL_KEY.format(file_id): url for file_id, url in urls.items()}, timeout=_ttl())
+    return len(urls)
@@ -1,20 +1,33 @@
-import requests
 import json
 from django.conf import settings
 from ..models import APIConfiguration, Platform, Contact, Conversation, Message
+from .http_clients import fan_out, get_api_client, send_failure
+from .assignment_service import auto_assign
+from .classification_service import ContactClassificationService
+from .platform_registry import get_platform
+from .stage_detection import detect_stage
+from .telegram_media import media_proxy_url
+from django.db import transaction
 from django.utils import timezone
 
 
+def message_key(chat_id, message_id):
+    """platform_message_id de un mensaje de Telegram (message_id solo es único dentro de su chat)"""
+    return f"tg_{chat_id}_{message_id}"
+
+
 class TelegramService:
     """Servicio para integración con Telegram Bot API"""
     
     def __init__(self):
+        # Sesión compartida con pool de conexiones y timeouts
+        self.http = get_api_client('telegram')
         try:
-            platform = Platform.objects.get(name='telegram')
+            platform = get_platform('telegram')
             self.config = APIConfiguration.objects.get(platform=platform)
             self.platform = platform
             if self.config and self.config.telegram_bot_token:
-                self.base_url = f"https://api.telegram.org/bot{self.config.telegram_bot_token}"
+                self.base_url = f"{settings.TELEGRAM_API_BASE}/bot{self.config.telegram_bot_token}"
             else:
                 self.base_url = None
         except (Platform.DoesNotExist, APIConfiguration.DoesNotExist):
@@ -40,15 +53,15 @@ class TelegramService:
         }
         
         try:
-            response = requests.post(url, json=payload)
+            response = self.http.post(url, json=payload)
             response_data = response.json()
             
             if response_data.get('ok'):
                 if conversation:
-                    message_id = str(response_data.get('result', {}).get('message_id', ''))
+                    message_id = response_data.get('result', {}).get('message_id', '')
                     Message.objects.create(
                         conversation=conversation,
-                        platform_message_id=message_id,
+                        platform_message_id=message_key(chat_id, message_id),
                         sender_type='agent',
                         message_type='text',
                         content=text
@@ -64,7 +77,7 @@ class TelegramService:
             else:
                 return {'success': False, 'error': response_data}
         except Exception as e:
-            return {'success': False, 'error': str(e)}
+            return send_failure(e)
     
     def send_photo(self, chat_id, photo_url, caption='', conversation=None):
         """Envía una foto"""
@@ -80,15 +93,15 @@ class TelegramService:
         }
         
         try:
-            response = requests.post(url, json=payload)
+            response = self.http.post(url, json=payload)
             response_data = response.json()
             
             if response_data.get('ok'):
                 if conversation:
-                    message_id = str(response_data.get('result', {}).get('message_id', ''))
+                    message_id = response_data.get('result', {}).get('message_id', '')
                     Message.objects.create(
                         conversation=conversation,
-                        platform_message_id=message_id,
+                        platform_message_id=message_key(chat_id, message_id),
                         sender_type='agent',
                         message_type='image',
                         content=caption,
@@ -121,15 +134,15 @@ class TelegramService:
         }
         
         try:
-            response = requests.post(url, json=payload)
+            response = self.http.post(url, json=payload)
             response_data = response.json()
             
             if response_data.get('ok'):
                 if conversation:
-                    message_id = str(response_data.get('result', {}).get('message_id', ''))
+                    message_id = response_data.get('result', {}).get('message_id', '')
                     Message.objects.create(
                         conversation=conversation,
-                        platform_message_id=message_id,
+                        platform_message_id=message_key(chat_id, message_id),
                         sender_type='agent',
                         message_type='document',
                         content=caption,
@@ -148,143 +161,275 @@ class TelegramService:
         except Exception as e:
             return {'success': False, 'error': str(e)}
     
+    def _batch_result(self, response):
+        if isinstance(response, Exception):
+            return {'success': False, 'error': str(response)}
+        try:
+            response_data = response.json()
+        except ValueError:
+            return {'success': False, 'error': f'Respuesta no válida ({response.status_code})'}
+        if response_data.get('ok'):
+            return {'success': True, 'data': response_data}
+        return {'success': False, 'error': response_data}
+    
+    def send_messages(self, messages, concurrency=None):
+        """
+        Envía varios mensajes de texto en paralelo (concurrencia acotada)
+        
+        Args:
+            messages: lista de (chat_id, texto)
+        
+        Returns:
+            list: resultado de cada envío, en el mismo orden
+        """
+        if not self.is_configured():
+            return [{'success': False, 'error': 'Telegram no configurado'} for _ in messages]
+        
+        calls = [{
+            'method': 'POST',
+            'url': f"{self.base_url}/sendMessage",
+            'json': {'chat_id': chat_id, 'text': text, 'parse_mode': 'HTML'}
+        } for chat_id, text in messages]
+        return [self._batch_result(r) for r in fan_out('telegram', calls, concurrency)]
+    
+    def get_file_urls(self, file_ids, concurrency=None):
+        """Resuelve varios file_id en paralelo; devuelve {file_id: url} de los encontrados"""
+        if not self.is_configured() or not file_ids:
+            return {}
+        
+        file_ids = list(dict.fromkeys(file_ids))
+        calls = [{
+            'method': 'POST',
+            'url': f"{self.base_url}/getFile",
+            'json': {'file_id': file_id}
+        } for file_id in file_ids]
+        
+        urls = {}
+        for file_id, response in zip(file_ids, fan_out('telegram', calls, concurrency)):
+            result = self._batch_result(response)
+            file_path = result.get('data', {}).get('result', {}).get('file_path') if result['success'] else None
+            if file_path:
+                urls[file_id] = f"{settings.TELEGRAM_API_BASE}/file/bot{self.config.telegram_bot_token}/{file_path}"
+        return urls
+    
     def process_webhook(self, webhook_data):
         """Procesa los webhooks recibidos de Telegram"""
+        return self.process_updates([webhook_data])
+    
+    def process_updates(self, updates):
+        """
+        Procesa un lote de updates (webhook o getUpdates)
+        
+        Los mensajes nuevos del lote se guardan con inserciones masivas; los
+        editados y los callback queries se procesan uno a uno.
+        """
         try:
-            # Telegram envía un objeto 'update'
-            update_id = webhook_data.get('update_id')
-            
-            # Procesar mensaje
-            if 'message' in webhook_data:
-                self._process_incoming_message(webhook_data['message'])
-            
-            # Procesar mensaje editado
-            elif 'edited_message' in webhook_data:
-                self._process_edited_message(webhook_data['edited_message'])
+            messages = []
+            for update in updates:
+                # Procesar mensaje
+                if 'message' in update:
+                    messages.append(update['message'])
+                
+                # Procesar mensaje editado
+                elif 'edited_message' in update:
+                    self._process_edited_message(update['edited_message'])
+                
+                # Procesar callback query (botones inline)
+                elif 'callback_query' in update:
+                    self._process_callback_query(update['callback_query'])
             
-            # Procesar callback query (botones inline)
-            elif 'callback_query' in webhook_data:
-                self._process_callback_query(webhook_data['callback_query'])
+            if messages:
+                self._ingest_messages(messages)
             
-            return {'success': True}
+            return {'success': True, 'messages': len(messages)}
         except Exception as e:
             return {'success': False, 'error': str(e)}
     
+    def _parse_incoming_message(self, message_data):
+        """Datos de contacto y contenido de un mensaje entrante"""
+        from_user = message_data.get('from', {})
+        user_id = str(from_user.get('id'))
+        username = from_user.get('username', '')
+        first_name = from_user.get('first_name', '')
+        last_name = from_user.get('last_name', '')
+        
+        full_name = f"{first_name} {last_name}".strip()
+        if not full_name:
+            full_name = username or f"Usuario {user_id}"
+        
+        # Procesar contenido del mensaje
+        message_type = 'text'
+        content = message_data.get('text', '')
+        file_id = None
+        
+        # Verificar diferentes tipos de contenido
+        if 'photo' in message_data:
+            message_type = 'image'
+            photos = message_data.get('photo', [])
+            if photos:
+                # Obtener la foto de mayor resolución
+                photo = max(photos, key=lambda x: x.get('file_size', 0))
+                file_id = photo.get('file_id')
+            content = message_data.get('caption', '')
+        
+        elif 'video' in message_data:
+            message_type = 'video'
+            file_id = message_data.get('video', {}).get('file_id')
+            content = message_data.get('caption', '')
+        
+        elif 'document' in message_data:
+            message_type = 'document'
+            document = message_data.get('document', {})
+            file_id = document.get('file_id')
+            content = document.get('file_name', message_data.get('caption', ''))
+        
+        elif 'audio' in message_data:
+            message_type = 'audio'
+            audio = message_data.get('audio', {})
+            file_id = audio.get('file_id')
+            content = audio.get('title', '')
+        
+        elif 'voice' in message_data:
+            message_type = 'audio'
+            file_id = message_data.get('voice', {}).get('file_id')
+            content = 'Mensaje de voz'
+        
+        elif 'location' in message_data:
+            message_type = 'location'
+            location = message_data.get('location', {})
+            content = f"Ubicación: {location.get('latitude')}, {location.get('longitude')}"
+        
+        chat_id = message_data.get('chat', {}).get('id', user_id)
+        return {
+            'message_id': message_key(chat_id, message_data.get('message_id')),
+            'user_id': user_id,
+            'full_name': full_name,
+            'message_type': message_type,
+            'content': content,
+            'file_id': file_id,
+        }
+    
     def _process_incoming_message(self, message_data):
         """Procesa un mensaje entrante"""
         try:
-            message_id = str(message_data.get('message_id'))
-            chat = message_data.get('chat', {})
-            from_user = message_data.get('from', {})
-            
-            chat_id = str(chat.get('id'))
-            user_id = str(from_user.get('id'))
-            username = from_user.get('username', '')
-            first_name = from_user.get('first_name', '')
-            last_name = from_user.get('last_name', '')
-            
-            full_name = f"{first_name} {last_name}".strip()
-            if not full_name:
-                full_name = username or f"Usuario {user_id}"
-            
-            # Obtener o crear contacto
-            contact, created = Contact.objects.get_or_create(
-                platform=self.platform,
-                platform_user_id=user_id,
-                defaults={
-                    'name': full_name
-                }
-            )
-            
-            # Obtener o crear conversación
-            conversation, created = Conversation.objects.get_or_create(
-                contact=contact,
-                status='active',
-                defaults={
-                    'last_message_at': timezone.now()
-                }
-            )
-            
-            # Procesar contenido del mensaje
-            message_type = 'text'
-            content = message_data.get('text', '')
-            media_url = None
-            
-            # Verificar diferentes tipos de contenido
-            if 'photo' in message_data:
-                message_type = 'image'
-                photos = message_data.get('photo', [])
-                if photos:
-                    # Obtener la foto de mayor resolución
-                    photo = max(photos, key=lambda x: x.get('file_size', 0))
-                    file_id = photo.get('file_id')
-                    media_url = self._get_file_url(file_id)
-                content = message_data.get('caption', '')
-            
-            elif 'video' in message_data:
-                message_type = 'video'
-                video = message_data.get('video', {})
-                file_id = video.get('file_id')
-                media_url = self._get_file_url(file_id)
-                content = message_data.get('caption', '')
-            
-            elif 'document' in message_data:
-                message_type = 'document'
-                document = message_data.get('document', {})
-                file_id = document.get('file_id')
-                media_url = self._get_file_url(file_id)
-                content = document.get('file_name', message_data.get('caption', ''))
-            
-            elif 'audio' in message_data:
-                message_type = 'audio'
-                audio = message_data.get('audio', {})
-                file_id = audio.get('file_id')
-                media_url = self._get_file_url(file_id)
-                content = audio.get('title', '')
+            self._ingest_messages([message_data])
+        except Exception as e:
+            print(f"Error procesando mensaje de Telegram: {str(e)}")
+    
+    def _ingest_messages(self, messages_data):
+        """
+        Guarda un lote de mensajes entrantes con un número fijo de consultas
+        
+        Crea en bloque los contactos, conversaciones activas y leads que falten.
+        Los mensajes ya guardados (reenvíos de Telegram, recuperación tras una
+        caída) se ignoran y se registran. La clave es chat + message_id
+        (message_key): el message_id de Telegram solo es único dentro del chat.
+        
+        bulk_create no dispara las señales de core/signals.py: el departamento,
+        la asignación automática y la detección de etapa se aplican aquí.
+        """
+        parsed = [self._parse_incoming_message(m) for m in messages_data]
+        now = timezone.now()
+        
+        with transaction.atomic():
+            existing_ids = set(Message.objects.filter(
+                platform_message_id__in=[p['message_id'] for p in parsed]
+            ).values_list('platform_message_id', flat=True))
+            unique = {}
+            for p in parsed:
+                if p['message_id'] in existing_ids or p['message_id'] in unique:
+                    print(f"⚠️ Mensaje de Telegram duplicado ignorado: {p['message_id']}")
+                    continue
+                unique[p['message_id']] = p
+            parsed = list(unique.values())
+            if not parsed:
+                return 0
             
-            elif 'voice' in message_data:
-                message_type = 'audio'
-                voice = message_data.get('voice', {})
-                file_id = voice.get('file_id')
-                media_url = self._get_file_url(file_id)
-                content = 'Mensaje de voz'
+            # Obtener o crear contactos
+            names = {}
+            for p in parsed:
+                names.setdefault(p['user_id'], p['full_name'])
+            contacts = {c.platform_user_id: c for c in Contact.objects.filter(
+                platform=self.platform, platform_user_id__in=names
+            )}
+            missing = [user_id for user_id in names if user_id not in contacts]
+            if missing:
+                Contact.objects.bulk_create([
+                    Contact(platform=self.platform, platform_user_id=user_id, name=names[user_id])
+                    for user_id in missing
+                ], ignore_conflicts=True)
+                contacts.update({c.platform_user_id: c for c in Contact.objects.filter(
+                    platform=self.platform, platform_user_id__in=missing
+                )})
             
-            elif 'location' in message_data:
-                message_type = 'location'
-                location = message_data.get('location', {})
-                content = f"Ubicación: {location.get('latitude')}, {location.get('longitude')}"
+            # Obtener o crear conversaciones activas
+            conversations = {}
+            for conversation in Conversation.objects.filter(
+                contact__in=contacts.values(), status='active'
+            ).order_by('contact_id', 'id'):
+                conversations.setdefault(conversation.contact_id, conversation)
+            new_conversations = [
+                Conversation(contact=contact, status='active', last_message_at=now)
+                for contact in contacts.values() if contact.id not in conversations
+            ]
+            for conversation in new_conversations:
+                conversation.department = ContactClassificationService.resolve_department(conversation)
+            Conversation.objects.bulk_create(new_conversations)
+            conversations.update({c.contact_id: c for c in new_conversations})
             
-            # Guardar mensaje
-            Message.objects.create(
-                conversation=conversation,
-                platform_message_id=message_id,
-                sender_type='contact',
-                message_type=message_type,
-                content=content,
-                media_url=media_url
-            )
+            # Guardar mensajes: solo el file_id, la URL real se resuelve al verlo (telegram_media)
+            messages = [
+                Message(
+                    conversation=conversations[contacts[p['user_id']].id],
+                    platform_message_id=p['message_id'],
+                    sender_type='contact',
+                    message_type=p['message_type'],
+                    content=p['content'],
+                    media_url=media_proxy_url(p['file_id']) if p['file_id'] else None,
+                    media_file_id=p['file_id']
+                ) for p in parsed
+            ]
+            # ignore_conflicts solo cubre la misma actualización entregada a la vez por dos workers
+            Message.objects.bulk_create(messages, ignore_conflicts=True)
             
-            # Actualizar conversación - Marcar que necesita respuesta cuando llega mensaje de contacto
-            conversation.last_message_at = timezone.now()
-            conversation.needs_response = True  # El contacto envió mensaje, necesita respuesta
-            if not conversation.first_response_at:
-                conversation.is_answered = False
-            conversation.save()
+            # Actualizar conversaciones - Marcar que necesitan respuesta cuando llega mensaje de contacto
+            touched = {conversations[contacts[p['user_id']].id] for p in parsed}
+            touched_ids = [c.id for c in touched]
+            Conversation.objects.filter(pk__in=touched_ids).update(last_message_at=now, needs_response=True)
+            Conversation.objects.filter(pk__in=touched_ids, first_response_at__isnull=True).update(is_answered=False)
             
             # Crear lead automáticamente si no existe
-            if not conversation.lead:
+            without_lead = [c for c in touched if not c.lead_id]
+            if without_lead:
                 from ..models import Lead
-                lead = Lead.objects.create(
-                    contact=contact,
-                    case_type='sales',
-                    status='new',
-                    notes=f'Lead generado automáticamente desde Telegram'
-                )
-                conversation.lead = lead
-                conversation.save()
-            
-        except Exception as e:
-            print(f"Error procesando mensaje de Telegram: {str(e)}")
+                leads = Lead.objects.bulk_create([
+                    Lead(
+                        contact_id=conversation.contact_id,
+                        case_type='sales',
+                        status='new',
+                        notes=f'Lead generado automáticamente desde Telegram'
+                    ) for conversation in without_lead
+                ])
+                for conversation, lead in zip(without_lead, leads):
+                    conversation.lead = lead
+                    conversation.department = ContactClassificationService.resolve_department(conversation)
+                Conversation.objects.bulk_update(without_lead, ['lead', 'department'])
+        
+        # Fuera de la transacción, como las señales post_save del webhook:
+        # la asignación bloquea filas de AgentLoad y no debe alargar el lote
+        for conversation in new_conversations:
+            try:
+                auto_assign(conversation)
+            except Exception as e:
+                print(f"❌ Error asignando conversación {conversation.pk}: {e}")
+        for message in messages:
+            try:
+                detect_stage(message)
+            except Exception as e:
+                # La detección nunca debe impedir guardar el mensaje
+                print(f"❌ Error detectando etapa del embudo: {e}")
+        
+        return len(parsed)
     
     def _process_edited_message(self, message_data):
         """Procesa un mensaje editado"""
@@ -299,7 +444,10 @@ class TelegramService:
         # Responder al callback
         if self.is_configured():
             url = f"{self.base_url}/answerCallbackQuery"
-            requests.post(url, json={'callback_query_id': callback_id})
+            try:
+                self.http.post(url, json={'callback_query_id': callback_id}, timeout=5)
+            except Exception as e:
+                print(f"Error respondiendo callback query: {str(e)}")
     
     def _get_file_url(self, file_id):
         """Obtiene la URL de un archivo"""
@@ -308,18 +456,64 @@ class TelegramService:
         
         try:
             url = f"{self.base_url}/getFile"
-            response = requests.post(url, json={'file_id': file_id})
+            response = self.http.post(url, json={'file_id': file_id}, timeout=5)
             response_data = response.json()
             
             if response_data.get('ok'):
                 file_path = response_data.get('result', {}).get('file_path')
                 if file_path:
-                    return f"https://api.telegram.org/file/bot{self.config.telegram_bot_token}/{file_path}"
+                    return f"{settings.TELEGRAM_API_BASE}/file/bot{self.config.telegram_bot_token}/{file_path}"
         except Exception as e:
             print(f"Error obteniendo URL de archivo: {str(e)}")
         
         return None
     
+    def get_updates(self, offset=None, limit=100, timeout=25):
+        """
+        Long polling: espera hasta `timeout` segundos a que haya updates
+        
+        Returns:
+            dict: {'success': True, 'data': [updates]} o {'success': False, 'error': ...}
+        """
+        if not self.is_configured():
+            return {'success': False, 'error': 'Telegram no configurado'}
+        
+        payload = {
+            'limit': limit,
+            'timeout': timeout,
+            'allowed_updates': ['message', 'edited_message', 'callback_query']
+        }
+        if offset:
+            payload['offset'] = offset
+        
+        try:
+            # El timeout de lectura debe superar la espera del long polling
+            response = self.http.post(f"{self.base_url}/getUpdates", json=payload, timeout=timeout + 10)
+            response_data = response.json()
+            
+            if response_data.get('ok'):
+                return {'success': True, 'data': response_data.get('result', [])}
+            else:
+                return {'success': False, 'error': response_data}
+        except Exception as e:
+            return {'success': False, 'error': str(e)}
+    
+    def delete_webhook(self):
+        """Elimina el webhook (getUpdates no funciona mientras haya uno configurado)"""
+        if not self.is_configured():
+            return {'success': False, 'error': 'Telegram no configurado'}
+        
+        try:
+            response = self.http.post(f"{self.base_url}/deleteWebhook")
+            response_data = response.json()
+            
+            if response_data.get('ok'):
+                return {'success': True, 'data': response_data}
+            else:
+                return {'success': False, 'error': response_data}
+        except Exception as e:
+            return {'success': False, 'error': str(e)}
+    
     def set_webhook(self, webhook_url):
         """Configura el webhook de Telegram"""
         if not self.is_configured():
@@ -329,7 +523,7 @@ class TelegramService:
         payload = {'url': webhook_url}
         
         try:
-            response = requests.post(url, json=payload)
+            response = self.http.post(url, json=payload)
             response_data = response.json()
             
             if response_data.get('ok'):
@@ -347,7 +541,7 @@ class TelegramService:
         url = f"{self.base_url}/getWebhookInfo"
         
         try:
-            response = requests.get(url)
+            response = self.http.get(url)
             response_data = response.json()
             
             if response_data.get('ok'):
@@ -0,0 +1,129 @@
+"""
+Plantillas con variables
+
+Sintaxis: {{nombre}}, {{agente}}, {{pais}}, {{telefono}}, {{email}} y
+{{campo.<clave>}} para Contact.custom_fields. Se admite un valor por
+defecto con {{nombre|cliente}}.
+
+El texto se compila una vez a una lista de literales y variables y se
+cachea por (id, updated_at): editar la plantilla cambia la clave y la
+versión anterior deja de usarse. El render masivo recorre los contactos
+en streaming con una sola consulta.
+"""
+import re
+import threading
+from collections import OrderedDict
+
+from ..models import Contact
+
+
+PLACEHOLDER_RE = re.compile(r'\{\{\s*([\w.]+)\s*(?:\|([^}]*))?\}\}')
+
+CONTACT_VARIABLES = {
+    'nombre': lambda contact: contact.display_name,
+    'pais': lambda contact: contact.country,
+    'telefono': lambda contact: contact.phone,
+    'email': lambda contact: contact.email,
+}
+CUSTOM_FIELD_PREFIX = 'campo.'
+
+# Campos de Contact que necesita el render (para .only() en el render masivo)
+RENDER_CONTACT_FIELDS = (
+    'id', 'name', 'google_contact_name', 'phone', 'email', 'country', 'custom_fields',
+)
+
+COMPILED_CACHE_SIZE = 256
+
+
+class TemplateRenderError(ValueError):
+    """Variable desconocida o mal formada en una plantilla"""
+
+
+def agent_display_name(user):
+    if user is None:
+        return ''
+    return user.get_full_name() or user.username
+
+
+class CompiledTemplate:
+    """Plantilla precompilada: literales y variables en orden"""
+
+    def __init__(self, content):
+        self.parts = []
+        self.variables = []
+        position = 0
+        for match in PLACEHOLDER_RE.finditer(content):
+            if match.start() > position:
+                self.parts.append(content[position:match.start()])
+            name, default = match.group(1), (match.group(2) or '').strip()
+            if name not in CONTACT_VARIABLES and name != 'agente' and not (
+                name.startswith(CUSTOM_FIELD_PREFIX) and len(name) > len(CUSTOM_FIELD_PREFIX)
+            ):
+                raise TemplateRenderError(f'Variable desconocida: {{{{{name}}}}}')
+            self.parts.append((name, default))
+            self.variables.append(name)
+            position = match.end()
+        if position < len(content):
+            self.parts.append(content[position:])
+
+    def render(self, contact=None, agent_name=''):
+        out = []
+        for part in self.parts:
+            if isinstance(part, str):
+                out.append(part)
+                continue
+            name, default = part
+            if name == 'agente':
+                value = agent_name
+            elif contact is None:
+                value = None
+            elif name.startswith(CUSTOM_FIELD_PREFIX):
+                value = (contact.custom_fields or {}).get(name[len(CUSTOM_FIELD_PREFIX):])
+            else:
+                value = CONTACT_VARIABLES[name](contact)
+            out.append(str(value) if value not in (None, '') else default)
+        return ''.join(out)
+
+
+_compiled = OrderedDict()
+_compiled_lock = threading.Lock()
+
+
+def compile_template(template):
+    """CompiledTemplate de la plantilla, cacheado por (id, updated_at)"""
+    key = (template.pk, template.updated_at)
+    with _compiled_lock:
+        compiled = _compiled.get(key)
+        if compiled is not None:
+            _compiled.move_to_end(key)
+            return compiled
+
+    compiled = CompiledTemplate(template.content)
+    with _compiled_lock:
+        _compiled[key] = compiled
+        while len(_compiled) > COMPILED_CACHE_SIZE:
+            _compiled.popitem(last=False)
+    return compiled
+
+
+def render_template(template, contact=None, agent=None):
+    """Texto de la plantilla personalizado para un contacto"""
+    return compile_template(template).render(contact, agent_display_name(agent))
+
+
+def render_bulk(template, contacts, agent=None, chunk_size=2000):
+    """
+    Personaliza una plantilla para muchos contactos en una sola pasada
+
+    Args:
+        contacts: queryset de Contact o lista de IDs
+
+    Yields:
+        (contact_id, texto)
+    """
+    compiled = compile_template(template)
+    agent_name = agent_display_name(agent)
+    if not hasattr(contacts, 'model'):
+        contacts = Contact.objects.filter(pk__in=list(contacts))
+    for contact in contacts.only(*RENDER_CONTACT_FIELDS).order_by('pk').iterator(chunk_size=chunk_size):
+        yield contact.pk, compiled.render(contact, agent_name)
@@ -1,7 +1,13 @@
-import requests
 import json
+import os
 from django.conf import settings
 from ..models import APIConfiguration, Platform, Contact, Conversation, Message, ActivityLog
+from .bridge_client import get_bridge_client
+from .bridge_status import get_bridge_status, refresh_bridge_status
+from .conversation_queries import active_conversations
+from .http_clients import send_failure
+from .media_store import signed_media_url
+from .platform_registry import get_platform
 from django.utils import timezone
 
 
@@ -9,39 +15,40 @@ class WhatsAppService:
     """Servicio para integración con WhatsApp usando Baileys"""
     
     def __init__(self):
+        # Para Baileys usamos el bridge local (cliente compartido con pool de conexiones)
+        self.bridge = get_bridge_client()
+        self.bridge_url = self.bridge.base_url
         try:
-            platform = Platform.objects.get(name='whatsapp')
-            self.platform = platform
-            # Para Baileys usaremos el bridge local
-            self.bridge_url = "http://localhost:3000"
+            self.platform = get_platform('whatsapp')
         except Platform.DoesNotExist:
             self.platform = None
-            self.bridge_url = "http://localhost:3000"
     
     def is_configured(self):
-        """Verifica si el servicio está configurado"""
-        try:
-            # Verificar si el bridge está activo
-            response = requests.get(f"{self.bridge_url}/status", timeout=5)
-            return response.status_code == 200
-        except:
-            return False
+        """Verifica si el servicio está configurado (estado cacheado, no bloquea)"""
+        # Verificar si el bridge está activo
+        return bool(get_bridge_status()['reachable'])
     
     def is_connected(self):
-        """Verifica si WhatsApp está conectado"""
-        try:
-            response = requests.get(f"{self.bridge_url}/status", timeout=5)
-            if response.status_code == 200:
-                data = response.json()
-                return data.get('connected', False)
-            return False
-        except:
-            return False
+        """Verifica si WhatsApp está conectado (estado cacheado, no bloquea)"""
+        return get_bridge_status()['connected']
+    
+    def _check_ready(self):
+        """Estado del bridge antes de enviar; devuelve el error o None"""
+        status = get_bridge_status()
+        if status['stale']:
+            # Sin estado reciente en caché: se consulta al bridge (solo en el camino de envío)
+            status = refresh_bridge_status()
+        # No se envió nada: el outbox puede reintentar
+        if not status['reachable']:
+            return {'success': False, 'error': 'Bridge de WhatsApp no disponible', 'retryable': True}
+        if not status['connected']:
+            return {'success': False, 'error': 'WhatsApp no está conectado', 'retryable': True}
+        return None
     
     def get_qr_code(self):
-        """Obtiene el código QR para autenticación"""
+        """Obtiene el código QR para autenticación (siempre del bridge, nunca de la caché)"""
         try:
-            response = requests.get(f"{self.bridge_url}/qr", timeout=5)
+            response = self.bridge.get('/qr', timeout=5)
             if response.status_code == 200:
                 return {'success': True, 'data': response.json()}
             else:
@@ -51,11 +58,9 @@ class WhatsAppService:
     
     def send_message(self, to_number, message_text, conversation=None):
         """Envía un mensaje de texto"""
-        if not self.is_configured():
-            return {'success': False, 'error': 'Bridge de WhatsApp no disponible'}
-        
-        if not self.is_connected():
-            return {'success': False, 'error': 'WhatsApp no está conectado'}
+        not_ready = self._check_ready()
+        if not_ready:
+            return not_ready
         
         # Normalizar número destino para el bridge (evitar timeouts por JIDs inválidos)
         normalized_to = self._normalize_phone_for_bridge(to_number)
@@ -68,7 +73,7 @@ class WhatsAppService:
         
         try:
             # Aumentar timeout porque el envío vía WhatsApp puede demorar
-            response = requests.post(f"{self.bridge_url}/send-message", json=payload, timeout=25)
+            response = self.bridge.post('/send-message', json=payload, timeout=25)
             response_data = response.json()
             
             if response.status_code == 200 and response_data.get('success'):
@@ -101,15 +106,13 @@ class WhatsAppService:
             else:
                 return {'success': False, 'error': response_data.get('error', 'Error desconocido')}
         except Exception as e:
-            return {'success': False, 'error': str(e)}
+            return send_failure(e)
     
     def send_media(self, to_number, media_type, media_url, caption='', conversation=None):
         """Envía un mensaje con media (imagen, video, documento)"""
-        if not self.is_configured():
-            return {'success': False, 'error': 'Bridge de WhatsApp no disponible'}
-        
-        if not self.is_connected():
-            return {'success': False, 'error': 'WhatsApp no está conectado'}
+        not_ready = self._check_ready()
+        if not_ready:
+            return not_ready
         
         # Por ahora solo soportamos imágenes
         if media_type == 'image':
@@ -120,7 +123,7 @@ class WhatsAppService:
             }
             
             try:
-                response = requests.post(f"{self.bridge_url}/send-image", json=payload, timeout=30)
+                response = self.bridge.post('/send-image', json=payload, timeout=30)
                 response_data = response.json()
                 
                 if response.status_code == 200 and response_data.get('success'):
@@ -157,10 +160,80 @@ class WhatsAppService:
         else:
             return {'success': False, 'error': f'Tipo de media no soportado: {media_type}'}
     
+    def _local_media_path(self, media_url):
+        """Ruta relativa a MEDIA_ROOT si media_url apunta a un archivo local (None si no)"""
+        if not media_url or not media_url.startswith(settings.MEDIA_URL):
+            return None
+        relative = media_url[len(settings.MEDIA_URL):]
+        media_root = os.path.realpath(settings.MEDIA_ROOT)
+        absolute = os.path.realpath(os.path.join(media_root, relative))
+        if not absolute.startswith(media_root + os.sep) or not os.path.isfile(absolute):
+            return None
+        return os.path.relpath(absolute, media_root)
+
+    def send_file(self, to_number, file_type, media_url, message_text='', filename=''):
+        """
+        Envía un archivo (imagen, video, audio, documento)
+
+        Los archivos de MEDIA_ROOT se entregan según WHATSAPP_MEDIA_HANDOFF:
+        en streaming a /send-media-stream, como ruta del almacenamiento
+        compartido, o como URL bajo MEDIA_DOMAIN. Las URLs externas siempre
+        van como URL.
+        """
+        not_ready = self._check_ready()
+        if not_ready:
+            return not_ready
+
+        to = self._normalize_phone_for_bridge(to_number)
+        mode = getattr(settings, 'WHATSAPP_MEDIA_HANDOFF', 'stream')
+        relative_path = self._local_media_path(media_url)
+
+        try:
+            if relative_path and mode == 'stream':
+                absolute = os.path.join(settings.MEDIA_ROOT, relative_path)
+                params = {'to': to, 'type': file_type, 'message': message_text, 'filename': filename}
+                with open(absolute, 'rb') as media_file:
+                    # requests envía el archivo por bloques, sin leerlo entero
+                    response = self.bridge.post(
+                        '/send-media-stream',
+                        params=params,
+                        data=media_file,
+                        headers={
+                            'Content-Type': 'application/octet-stream',
+                            'Content-Length': str(os.path.getsize(absolute)),
+                        },
+                        timeout=getattr(settings, 'WHATSAPP_MEDIA_STREAM_TIMEOUT', 120),
+                    )
+            else:
+                payload = {
+                    'to': to,
+                    'type': file_type,
+                    'message': message_text,
+                    'filename': filename
+                }
+                if relative_path and mode == 'path':
+                    payload['media_path'] = relative_path
+                elif relative_path:
+                    # La vista de media exige sesión: el bridge descarga con un token temporal
+                    payload['media_url'] = f"{settings.MEDIA_DOMAIN}{signed_media_url(relative_path)}"
+                elif media_url.startswith(('http://', 'https://')):
+                    payload['media_url'] = media_url
+                else:
+                    payload['media_url'] = f"{settings.MEDIA_DOMAIN}{media_url}"
+                response = self.bridge.post('/send-message', json=payload, timeout=30)
+
+            response_data = response.json()
+
+            if response.status_code == 200 and response_data.get('success'):
+                return {'success': True, 'data': response_data}
+            return {'success': False, 'error': response_data.get('error', 'Error desconocido del bridge')}
+        except Exception as e:
+            return send_failure(e)
+
     def restart_connection(self):
         """Reinicia la conexión de WhatsApp"""
         try:
-            response = requests.post(f"{self.bridge_url}/restart", timeout=10)
+            response = self.bridge.post('/restart', timeout=10)
             return response.json()
         except Exception as e:
             return {'success': False, 'error': str(e)}
@@ -204,11 +277,15 @@ class WhatsAppService:
             # Clasificar el departamento basado en el número que recibió el mensaje
             if received_at:
                 # Usar el número que recibió el mensaje para clasificar
-                department = ContactClassificationService.classify_contact_by_recipient(received_at)
+                department = ContactClassificationService.classify_contact_by_recipient(
+                    received_at, content=content, country=contact.country
+                )
                 print(f"🔍 DEBUG: Mensaje recibido en {received_at} -> clasificado como {department}")
             else:
                 # Fallback: clasificar por número del contacto
-                department = ContactClassificationService.classify_contact_by_recipient(contact.phone or clean_from_number)
+                department = ContactClassificationService.classify_contact_by_recipient(
+                    contact.phone or clean_from_number, content=content, country=contact.country
+                )
                 print(f"🔍 DEBUG: Sin received_at, clasificado por contacto {contact.phone or clean_from_number} -> {department}")
             
             # Si no se puede clasificar, usar soporte por defecto
@@ -442,10 +519,7 @@ class WhatsAppService:
                 )
             
             # Buscar conversación activa para este contacto
-            conversation = Conversation.objects.filter(
-                contact=contact,
-                status='active'
-            ).first()
+            conversation = active_conversations(contact).first()
             
             if not conversation:
                 # Crear una nueva conversación si no existe CON EL DEPARTAMENTO CORRECTO
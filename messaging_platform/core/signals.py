@@ -0,0 +1,134 @@
+from django.db.models.signals import pre_save, post_save, post_delete
+from django.dispatch import receiver
+
+from .models import Conversation, Lead, Message, Platform, RoutingRule, StageRule, User
+from .services.assignment_service import auto_assign, move_conversation, sync_agent
+from .services.classification_service import ContactClassificationService
+from .services.media_store import add_reference, blob_for_url, release_reference
+from .services.platform_registry import invalidate_platforms
+from .services.routing_service import invalidate_routing_table
+from .services.stage_detection import detect_stage, invalidate_detector
+
+
+@receiver([post_save, post_delete], sender=Platform)
+def platform_changed(sender, **kwargs):
+    """Invalida el registro de plataformas cacheado"""
+    invalidate_platforms()
+
+
+@receiver([post_save, post_delete], sender=RoutingRule)
+def routing_rule_changed(sender, **kwargs):
+    """Invalida la tabla de enrutamiento compilada"""
+    invalidate_routing_table()
+
+
+@receiver([post_save, post_delete], sender=StageRule)
+def stage_rule_changed(sender, **kwargs):
+    """Invalida el autómata de detección de etapas"""
+    invalidate_detector()
+
+
+@receiver(pre_save, sender=Message)
+def message_media_blob(sender, instance, **kwargs):
+    """Enlaza el mensaje nuevo con su archivo del almacén multimedia"""
+    if instance._state.adding and instance.media_url and instance.media_blob_id is None:
+        instance.media_blob = blob_for_url(instance.media_url)
+
+
+@receiver(post_save, sender=Message)
+def message_media_referenced(sender, instance, created, **kwargs):
+    """Cuenta la referencia al archivo del almacén multimedia"""
+    if created and instance.media_blob_id:
+        add_reference(instance.media_blob_id)
+
+
+@receiver(post_save, sender=Message)
+def message_stage_detection(sender, instance, created, **kwargs):
+    """Detecta en el mensaje nuevo palabras clave de cambio de etapa del embudo"""
+    if created:
+        try:
+            detect_stage(instance)
+        except Exception as e:
+            # La detección nunca debe impedir guardar el mensaje
+            print(f"❌ Error detectando etapa del embudo: {e}")
+
+
+@receiver(post_delete, sender=Message)
+def message_media_released(sender, instance, **kwargs):
+    """Libera la referencia al archivo del almacén multimedia"""
+    if instance.media_blob_id:
+        release_reference(instance.media_blob_id)
+
+
+# Campos de los que depende Conversation.department
+_DEPARTMENT_FIELDS = {'funnel_type', 'lead', 'lead_id', 'contact', 'contact_id'}
+
+
+def _department_changed(instance):
+    """True si cambió algún campo del que depende department desde que se cargó (o es nueva)"""
+    return getattr(instance, '_loaded_department', None) != instance.department_key()
+
+
+@receiver(pre_save, sender=Conversation)
+def conversation_department(sender, instance, update_fields=None, **kwargs):
+    """Resuelve el departamento de la conversación al guardarla"""
+    # Sin cambios en funnel_type, lead o contacto no se cargan lead y contacto en cada save()
+    if update_fields is None and _department_changed(instance):
+        instance.department = ContactClassificationService.resolve_department(instance)
+
+
+@receiver(post_save, sender=Conversation)
+def conversation_department_partial(sender, instance, update_fields=None, **kwargs):
+    """save(update_fields=...) no guarda department: se actualiza aparte si cambió"""
+    if update_fields is not None:
+        if not _DEPARTMENT_FIELDS & set(update_fields):
+            return
+        if _department_changed(instance):
+            department = ContactClassificationService.resolve_department(instance)
+            if department != instance.department:
+                instance.department = department
+                Conversation.objects.filter(pk=instance.pk).update(department=department)
+    instance._loaded_department = instance.department_key()
+
+
+@receiver(post_save, sender=Lead)
+def lead_department(sender, instance, **kwargs):
+    """Actualiza el departamento de las conversaciones del lead (su case_type puede haber cambiado)"""
+    for conversation in instance.conversations.select_related('contact'):
+        department = ContactClassificationService.resolve_department(conversation)
+        if department != conversation.department:
+            Conversation.objects.filter(pk=conversation.pk).update(department=department)
+
+
+def _open_agent(agent_id, status):
+    return agent_id if status == 'active' else None
+
+
+@receiver(post_save, sender=Conversation)
+def conversation_agent_load(sender, instance, created, **kwargs):
+    """Mantiene los contadores de AgentLoad y asigna automáticamente las conversaciones nuevas"""
+    if created or hasattr(instance, '_loaded_assignment'):
+        old_agent, old_status = getattr(instance, '_loaded_assignment', (None, None))
+        old = _open_agent(old_agent, old_status)
+        new = _open_agent(instance.assigned_to_id, instance.status)
+        if old != new:
+            move_conversation(old, new)
+        instance._loaded_assignment = (instance.assigned_to_id, instance.status)
+    if created and instance.assigned_to_id is None:
+        auto_assign(instance)
+
+
+@receiver(post_delete, sender=Conversation)
+def conversation_agent_released(sender, instance, **kwargs):
+    """Descuenta la conversación borrada de la carga de su agente"""
+    move_conversation(_open_agent(instance.assigned_to_id, instance.status), None)
+
+
+@receiver(post_save, sender=User)
+def user_agent_load(sender, instance, update_fields=None, **kwargs):
+    """Sincroniza la disponibilidad del agente (rol, is_active, is_active_chat)"""
+    # El login guarda solo last_login: no cambia la disponibilidad
+    if update_fields is not None and not {'role', 'is_active', 'is_active_chat'} & set(update_fields):
+        return
+    sync_agent(instance)
+
@@ -0,0 +1,117 @@
+"""
+Subida de multimedia en streaming hacia el almacén por contenido
+
+MediaStoreUploadHandler recibe cada chunk del multipart y, en la misma
+pasada, lo escribe en el directorio temporal del almacén, actualiza el
+SHA-256 y comprueba el tamaño máximo. El tipo MIME se detecta con los
+primeros bytes. store_file() solo tiene que mover el temporal a su ruta
+definitiva: el archivo se escribe una vez y no se vuelve a leer.
+
+Las subidas que superan MEDIA_UPLOAD_MAX_SIZE se cortan en cuanto pasan
+el límite, sin recibir el resto del cuerpo.
+"""
+import hashlib
+import os
+import tempfile
+
+from django.conf import settings
+from django.core.files.uploadedfile import UploadedFile
+from django.core.files.uploadhandler import FileUploadHandler, StopUpload
+
+from .services.media_store import SNIFF_BYTES, TMP_DIR, sniff_content_type
+
+
+# Margen para los campos de texto y cabeceras del multipart
+MULTIPART_OVERHEAD = 64 * 1024
+
+
+def max_upload_size():
+    return getattr(settings, 'MEDIA_UPLOAD_MAX_SIZE', 50 * 1024 * 1024)
+
+
+def body_too_large(request):
+    """True si el Content-Length ya indica que el archivo supera el límite (se rechaza sin leer el cuerpo)"""
+    try:
+        content_length = int(request.META.get('CONTENT_LENGTH') or 0)
+    except ValueError:
+        return False
+    return content_length > max_upload_size() + MULTIPART_OVERHEAD
+
+
+class HashedUploadedFile(UploadedFile):
+    """Archivo subido ya guardado en el temporal del almacén, con su SHA-256"""
+
+    def __init__(self, file, tmp_path, name, content_type, size, sha256, charset=None, content_type_extra=None):
+        super().__init__(file, name, content_type, size, charset, content_type_extra)
+        self.tmp_path = tmp_path
+        self.sha256 = sha256
+        self.stored = False
+
+    def temporary_file_path(self):
+        return self.tmp_path
+
+    def close(self):
+        try:
+            self.file.close()
+        finally:
+            # Si la vista no lo guardó en el almacén, el temporal se descarta
+            if not self.stored:
+                try:
+                    os.remove(self.tmp_path)
+                except FileNotFoundError:
+                    pass
+
+
+class MediaStoreUploadHandler(FileUploadHandler):
+    """Upload handler que hashea, limita y escribe una sola vez en el almacén"""
+
+    def __init__(self, request=None, max_size=None):
+        super().__init__(request)
+        self.max_size = max_size or max_upload_size()
+        self.too_large = False
+
+    def new_file(self, *args, **kwargs):
+        super().new_file(*args, **kwargs)
+        tmp_dir = os.path.join(settings.MEDIA_ROOT, TMP_DIR)
+        os.makedirs(tmp_dir, exist_ok=True)
+        fd, self.tmp_path = tempfile.mkstemp(dir=tmp_dir)
+        self.file = os.fdopen(fd, 'w+b')
+        self.digest = hashlib.sha256()
+        self.head = b''
+
+    def receive_data_chunk(self, raw_data, start):
+        if start + len(raw_data) > self.max_size:
+            self.too_large = True
+            self._discard()
+            raise StopUpload(connection_reset=True)
+        if len(self.head) < SNIFF_BYTES:
+            self.head += raw_data[:SNIFF_BYTES - len(self.head)]
+        self.digest.update(raw_data)
+        self.file.write(raw_data)
+        # El chunk ya está guardado: los handlers por defecto no lo reciben
+        return None
+
+    def file_complete(self, file_size):
+        self.file.flush()
+        self.file.seek(0)
+        return HashedUploadedFile(
+            file=self.file,
+            tmp_path=self.tmp_path,
+            name=self.file_name,
+            content_type=sniff_content_type(self.head, self.file_name),
+            size=file_size,
+            sha256=self.digest.hexdigest(),
+            charset=self.charset,
+            content_type_extra=self.content_type_extra,
+        )
+
+    def upload_interrupted(self):
+        if hasattr(self, 'tmp_path'):
+            self._discard()
+
+    def _discard(self):
+        self.file.close()
+        try:
+            os.remove(self.tmp_path)
+        except FileNotFoundError:
+            pass
@@ -1,5 +1,6 @@
+from django.conf import settings
 from django.urls import path
-from . import views, webhook_views, google_contacts_views
+from . import views, webhook_views, google_contacts_views, export_views, performance_views, campaign_views, scheduled_views, media_views, archive_views
 
 urlpatterns = [
     # Autenticación
@@ -39,6 +40,7 @@ urlpatterns = [
     path('api/reminders/<int:reminder_id>/complete/', views.api_complete_reminder, name='api_complete_reminder'),
     path('api/templates/create/', views.api_create_template, name='api_create_template'),
     path('api/templates/list/', views.api_get_templates, name='api_get_templates'),
+    path('api/templates/<int:template_id>/render/', views.api_render_template, name='api_render_template'),
     path('api/conversations/<int:conversation_id>/funnel/', views.api_update_conversation_funnel, name='api_update_conversation_funnel'),
     path('api/send-file-message/', views.api_send_file_message, name='api_send_file_message'),
     path('api/conversations/<int:conversation_id>/messages/', views.api_conversation_messages, name='api_conversation_messages'),
@@ -50,11 +52,34 @@ urlpatterns = [
     path('api/conversations/search/', views.api_search_conversations, name='api_search_conversations'),
     path('api/search_unassigned/', views.api_search_unassigned, name='api_search_unassigned'),
     
+    # Exportaciones para BI (streaming)
+    path('api/export/<str:dataset>/', export_views.export_data_view, name='export_data'),
+
+    # Campañas de envío masivo
+    path('api/campaigns/', campaign_views.api_campaigns, name='api_campaigns'),
+    path('api/campaigns/create/', campaign_views.api_create_campaign, name='api_create_campaign'),
+    path('api/campaigns/<int:campaign_id>/', campaign_views.api_campaign_detail, name='api_campaign_detail'),
+    path('api/campaigns/<int:campaign_id>/<str:action>/', campaign_views.api_campaign_action, name='api_campaign_action'),
+
+    # Archivos multimedia (control de acceso, Range y X-Accel-Redirect)
+    path(f"{settings.MEDIA_URL.lstrip('/')}<path:path>", media_views.serve_media, name='serve_media'),
+
+    # Mensajes programados
+    path('api/conversations/<int:conversation_id>/scheduled/', scheduled_views.api_conversation_scheduled, name='api_conversation_scheduled'),
+    path('api/conversations/<int:conversation_id>/scheduled/create/', scheduled_views.api_schedule_message, name='api_schedule_message'),
+    path('api/scheduled-messages/<int:scheduled_id>/cancel/', scheduled_views.api_cancel_scheduled, name='api_cancel_scheduled'),
+    path('api/archive/search/', archive_views.api_search_archive, name='api_search_archive'),
+
+    # Instrumentación de rendimiento
+    path('api/performance/slow-requests/', performance_views.slow_requests_view, name='slow_requests'),
+    
     # WhatsApp API (Baileys - cuenta normal)
     path('api/whatsapp/status/', views.api_whatsapp_status, name='api_whatsapp_status'),
     path('api/whatsapp/qr/', views.api_whatsapp_qr, name='api_whatsapp_qr'),
     path('api/whatsapp/restart/', views.api_whatsapp_restart, name='api_whatsapp_restart'),
     path('api/whatsapp/send-message/', views.api_send_whatsapp_message, name='api_send_whatsapp_message'),
+    path('api/messages/<int:message_id>/retry/', views.api_retry_message, name='api_retry_message'),
+    path('api/telegram/media/<str:file_id>/', views.api_telegram_media, name='telegram_media'),
     path('api/whatsapp/qr-updated/', views.api_whatsapp_qr_updated, name='api_whatsapp_qr_updated'),
     path('api/whatsapp/connected/', views.api_whatsapp_connected, name='api_whatsapp_connected'),
     
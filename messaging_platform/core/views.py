@@ -1,19 +1,35 @@
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth import authenticate, login, logout
 from django.contrib.auth.decorators import login_required
-from django.http import JsonResponse
-from django.views.decorators.http import require_http_methods
-from django.views.decorators.csrf import csrf_exempt
-from django.db.models import Count, Q, Avg, Min, Max, Subquery, OuterRef
-from django.db import models
+from django.http import JsonResponse, StreamingHttpResponse
+from django.views.decorators.http import require_http_methods, condition
+from django.views.decorators.csrf import csrf_exempt, csrf_protect
+from django.db.models import Count, Q, Avg, Min, Max
+from django.db import models, transaction
+from django.conf import settings
+from django.core.cache import cache
 from django.utils import timezone
-from datetime import timedelta
+from datetime import datetime, timedelta
 from .models import (
     User, Platform, Contact, Lead, Conversation, 
     Message, Template, Reminder, ActivityLog, APIConfiguration, RecoveryCase
 )
 from .decorators import admin_required, support_or_sales_required, sales_required, support_required
-from .services import ContactClassificationService
+from .media_views import can_view_message_media
+from .services import ContactClassificationService, conversation_queries
+from .services.outbox_service import enqueue_message, retry_message
+from .services.bridge_status import get_bridge_status, set_bridge_status
+from .services.http_clients import get_api_client
+from .services.media_derivatives import media_previews
+from .services.archive_service import conversation_messages
+from .services.media_store import store_file
+from .upload_handlers import MediaStoreUploadHandler, body_too_large, max_upload_size
+from .services.scheduler_service import schedule_recovery_outreach
+from .services.telegram_media import FILE_URL_KEY, resolve_file_url
+from .services.template_service import (
+    CompiledTemplate, TemplateRenderError, compile_template, render_bulk, render_template
+)
+import hmac
 import json
 
 
@@ -78,22 +94,10 @@ def dashboard_view(request):
     avg_response_time = sum(response_times) / len(response_times) if response_times else 0
     
     # Recordatorios pendientes del usuario
-    pending_reminders = Reminder.objects.filter(
-        user=request.user,
-        is_completed=False,
-        reminder_date__gte=timezone.now()
-    ).order_by('reminder_date')[:5]
+    pending_reminders = conversation_queries.pending_reminders(request.user)
     
-    # Filtrar conversaciones según el rol del usuario
-    if request.user.role == 'admin':
-        # Admin ve todas las conversaciones
-        base_conversations = Conversation.objects.filter(status='active')
-    elif request.user.role == 'sales':
-        # Ventas ve solo conversaciones de ventas/recuperación
-        base_conversations = Conversation.objects.filter(status='active', funnel_type='sales')
-    else:  # support
-        # Soporte ve solo conversaciones de soporte
-        base_conversations = Conversation.objects.filter(status='active', funnel_type='support')
+    # Filtrar conversaciones según el rol del usuario (admin: todas; ventas y soporte: su departamento)
+    base_conversations = conversation_queries.dashboard_conversations(request.user)
     
     if request.user.role == 'admin' or request.user.is_superuser:
         # Admin ve todas las conversaciones
@@ -101,9 +105,7 @@ def dashboard_view(request):
         unanswered_conversations = base_conversations.filter(needs_response=True).count()
         
         # Conversaciones recientes - ordenadas por actualización más reciente primero
-        recent_conversations = base_conversations.select_related(
-            'contact', 'contact__platform', 'assigned_to'
-        ).order_by('-updated_at', '-needs_response', '-last_message_at')[:50]
+        recent_conversations = conversation_queries.recent_conversations(base_conversations, 50)
         
         # Para compatibilidad con template
         assigned_conversations = []
@@ -135,9 +137,7 @@ def dashboard_view(request):
         )
         
         # Conversaciones recientes: ordenadas por actualización más reciente primero
-        recent_conversations = base_conversations.select_related(
-            'contact', 'contact__platform', 'assigned_to'
-        ).order_by('-updated_at', '-needs_response', '-last_message_at')[:100]
+        recent_conversations = conversation_queries.recent_conversations(base_conversations, 100)
         
         # Conteo de conversaciones disponibles
         available_count = available_conversations_queryset.count()
@@ -291,23 +291,8 @@ def lead_detail_view(request, lead_id):
 @login_required
 def chat_view(request):
     """Vista de chat con búsqueda"""
-    conversations = Conversation.objects.select_related(
-        'contact', 'contact__platform', 'assigned_to'
-    ).filter(status='active')
-    
-    # Filtrar por departamento según el rol del usuario
-    from .services.classification_service import ContactClassificationService
-    classification_service = ContactClassificationService()
-    
-    if request.user.role == 'admin' or request.user.is_superuser:
-        # Admin ve todas las conversaciones
-        pass  # No aplicar filtro adicional
-    elif request.user.role == 'support':
-        # Soporte ve solo conversaciones de soporte
-        conversations = conversations.filter(funnel_type='support')
-    elif request.user.role == 'sales':
-        # Ventas ve solo conversaciones de ventas
-        conversations = conversations.filter(funnel_type='sales')
+    # Activas del departamento del rol (admin: todas), primero las que necesitan respuesta
+    conversations = conversation_queries.chat_conversations(request.user)
     
     # Búsqueda avanzada por nombre o número de teléfono
     search_query = request.GET.get('search', '').strip()
@@ -348,8 +333,6 @@ def chat_view(request):
             
             conversations = conversations.filter(filters)
     
-    # Ordenar: primero las que necesitan respuesta, luego por último mensaje
-    conversations = conversations.order_by('-needs_response', '-last_message_at')
     platforms = Platform.objects.filter(is_active=True)
     
     # Calcular estadísticas correctas
@@ -381,10 +364,12 @@ def chat_view(request):
 def conversation_detail_view(request, conversation_id):
     """Vista de detalle de conversación con mensajes"""
     conversation = get_object_or_404(Conversation, id=conversation_id)
-    messages = conversation.messages.select_related('sender_user').order_by('created_at')
     
     # Marcar mensajes como leídos
-    messages.filter(is_read=False, sender_type='contact').update(is_read=True)
+    conversation_queries.unread_contact_messages(conversation).update(is_read=True)
+    
+    # Miniaturas en lugar de los archivos completos (incluye los mensajes archivados)
+    messages = media_previews(conversation_messages(conversation))
     
     # Agregar información del remitente para cada mensaje
     for message in messages:
@@ -406,12 +391,26 @@ def conversation_detail_view(request, conversation_id):
     }
     
     return render(request, 'conversation_detail.html', context)
+def serialize_outbox_message(message):
+    """Datos de un mensaje saliente para las respuestas de envío"""
+    return {
+        'id': message.id,
+        'content': message.content,
+        'sender_type': message.sender_type,
+        'message_type': message.message_type,
+        'media_url': message.media_url,
+        'created_at': message.created_at.isoformat(),
+        'delivery_status': message.delivery_status,
+        'delivery_error': message.delivery_error,
+    }
+
+
 @login_required
 def api_conversation_messages(request, conversation_id):
     """API para obtener mensajes de una conversación (para auto-refresh)"""
     try:
         conversation = get_object_or_404(Conversation, id=conversation_id)
-        messages = conversation.messages.select_related('sender_user').order_by('created_at')
+        messages = media_previews(conversation_messages(conversation))
         
         messages_data = []
         for msg in messages:
@@ -421,8 +420,12 @@ def api_conversation_messages(request, conversation_id):
                 'sender_type': msg.sender_type,
                 'message_type': msg.message_type,
                 'media_url': msg.media_url,
+                'thumbnail_url': msg.thumbnail_url,
+                'placeholder': msg.media_placeholder,
                 'created_at': msg.created_at.isoformat(),
-                'sender_name': msg.sender_user.username if msg.sender_user else conversation.contact.display_name
+                'sender_name': msg.sender_user.username if msg.sender_user else conversation.contact.display_name,
+                'delivery_status': msg.delivery_status,
+                'delivery_error': msg.delivery_error
             })
         
         return JsonResponse({
@@ -493,17 +496,7 @@ def funnels_view(request):
     
     funnel_data = []
     for i, (stage_code, stage_name) in enumerate(stages):
-        conversations = Conversation.objects.filter(
-            funnel_type=funnel_type,
-            funnel_stage=stage_code,
-            status='active'
-        ).select_related('contact', 'contact__platform', 'assigned_to').annotate(
-            last_message_preview=Subquery(
-                Message.objects.filter(
-                    conversation=OuterRef('pk')
-                ).order_by('-created_at').values('content')[:1]
-            )
-        )
+        conversations = conversation_queries.funnel_conversations(funnel_type, stage_code)
         
         # Determinar etapas anterior y siguiente para los botones de navegación
         prev_stage = stages[i-1][0] if i > 0 else None
@@ -529,24 +522,8 @@ def funnels_view(request):
 @login_required
 def inbox_view(request):
     """Vista independiente para clasificar conversaciones sin asignar"""
-    # Filtrar conversaciones según el rol del usuario
-    if request.user.role == 'admin' or request.user.is_superuser:
-        # Admin ve todas las conversaciones sin asignar
-        base_conversations = Conversation.objects.filter(status='active')
-    elif request.user.role == 'support':
-        # Soporte ve solo conversaciones de soporte sin asignar
-        base_conversations = Conversation.objects.filter(status='active', funnel_type='support')
-    elif request.user.role == 'sales':
-        # Ventas ve solo conversaciones de ventas sin asignar
-        base_conversations = Conversation.objects.filter(status='active', funnel_type='sales')
-    else:
-        # Otros roles no ven nada
-        base_conversations = Conversation.objects.none()
-    
-    # Obtener solo conversaciones sin asignar a usuario
-    unassigned_conversations = base_conversations.filter(
-        assigned_to__isnull=True
-    ).select_related('contact', 'contact__platform', 'assigned_to')
+    # Conversaciones sin asignar del departamento del rol (admin: todas), con el último mensaje
+    unassigned_conversations = conversation_queries.unassigned_conversations(request.user)
     
     # Búsqueda avanzada por nombre o número de teléfono (igual que en chat_view)
     search_query = request.GET.get('search', '').strip()
@@ -587,14 +564,6 @@ def inbox_view(request):
             
             unassigned_conversations = unassigned_conversations.filter(filters)
     
-    unassigned_conversations = unassigned_conversations.annotate(
-        last_message_preview=Subquery(
-            Message.objects.filter(
-                conversation=OuterRef('pk')
-            ).order_by('-created_at').values('content')[:1]
-        )
-    ).order_by('-last_message_at')
-    
     # Obtener agentes disponibles según el departamento
     if request.user.role == 'admin' or request.user.is_superuser:
         # Admin puede asignar a cualquier usuario
@@ -860,22 +829,34 @@ def api_create_recovery_case(request):
         parsed_date = None
         if target_recovery_date:
             try:
-                from datetime import datetime
                 parsed_date = datetime.strptime(target_recovery_date, '%Y-%m-%d').date()
             except ValueError:
                 parsed_date = None
         
-        # Crear el caso de recuperación
-        recovery_case = RecoveryCase.objects.create(
-            contact=conversation.contact,
-            conversation=conversation,
-            created_by=request.user,
-            assigned_to=assigned_to,
-            reason=reason,
-            reason_notes=reason_notes,
-            recovery_strategy=recovery_strategy,
-            target_recovery_date=parsed_date
-        )
+        outreach_message = (data.get('outreach_message') or '').strip()
+        if outreach_message and not parsed_date:
+            return JsonResponse({
+                'success': False,
+                'error': 'Para programar el contacto se requiere una fecha objetivo válida'
+            }, status=400)
+        
+        with transaction.atomic():
+            # Crear el caso de recuperación
+            recovery_case = RecoveryCase.objects.create(
+                contact=conversation.contact,
+                conversation=conversation,
+                created_by=request.user,
+                assigned_to=assigned_to,
+                reason=reason,
+                reason_notes=reason_notes,
+                recovery_strategy=recovery_strategy,
+                target_recovery_date=parsed_date
+            )
+            
+            # Contacto programado para la fecha objetivo (opcional); si falla no se crea el caso
+            if outreach_message:
+                outreach_time = datetime.strptime(data.get('outreach_time') or '09:00', '%H:%M').time()
+                schedule_recovery_outreach(recovery_case, outreach_message, request.user, at=outreach_time)
         
         # Actualizar la conversación para moverla al embudo de recuperación
         conversation.funnel_type = 'recovery'
@@ -978,6 +959,9 @@ def api_create_template(request):
         if platform_id:
             platform = get_object_or_404(Platform, id=platform_id)
         
+        # Validar las variables antes de guardar
+        CompiledTemplate(content or '')
+        
         template = Template.objects.create(
             name=name,
             content=content,
@@ -1071,7 +1055,7 @@ def api_get_conversation_messages(request, conversation_id):
     """API para obtener mensajes de una conversación"""
     try:
         conversation = get_object_or_404(Conversation, id=conversation_id)
-        messages = conversation.messages.select_related('sender_user').order_by('created_at')
+        messages = media_previews(conversation_messages(conversation))
         
         messages_data = [{
             'id': msg.id,
@@ -1080,8 +1064,12 @@ def api_get_conversation_messages(request, conversation_id):
             'message_type': msg.message_type,
             'content': msg.content,
             'media_url': msg.media_url,
+            'thumbnail_url': msg.thumbnail_url,
+            'placeholder': msg.media_placeholder,
             'is_read': msg.is_read,
-            'created_at': msg.created_at.isoformat()
+            'created_at': msg.created_at.isoformat(),
+            'delivery_status': msg.delivery_status,
+            'delivery_error': msg.delivery_error
         } for msg in messages]
         
         return JsonResponse({
@@ -1095,25 +1083,110 @@ def api_get_conversation_messages(request, conversation_id):
         }, status=400)
 
 
-@login_required
-def api_get_templates(request):
-    """API para obtener plantillas"""
-    platform_id = request.GET.get('platform_id')
-    
+def _active_templates(request):
     templates = Template.objects.filter(is_active=True)
+    platform_id = request.GET.get('platform_id')
+    if platform_id:
+        templates = templates.filter(Q(platform_id=platform_id) | Q(platform__isnull=True))
+    return templates
+
+
+def _templates_etag(request):
+    """ETag del listado: cambia al crear, editar, desactivar o borrar plantillas"""
+    if not request.user.is_authenticated:
+        return None
+    # Las desactivadas también cuentan: desactivar cambia su updated_at
+    templates = Template.objects.all()
+    platform_id = request.GET.get('platform_id')
     if platform_id:
         templates = templates.filter(Q(platform_id=platform_id) | Q(platform__isnull=True))
+    summary = templates.aggregate(count=Count('id'), last_id=Max('id'), last_update=Max('updated_at'))
+    last_update = summary['last_update'].timestamp() if summary['last_update'] else 0
+    return f"tpl-{platform_id or 'all'}-{summary['count']}-{summary['last_id']}-{last_update}"
+
+
+@login_required
+@condition(etag_func=_templates_etag)
+def api_get_templates(request):
+    """API para obtener plantillas (con ETag: el cliente recibe 304 si no cambiaron)"""
+    templates_data = []
+    for t in _active_templates(request):
+        try:
+            variables = compile_template(t).variables
+        except TemplateRenderError:
+            variables = []
+        templates_data.append({
+            'id': t.id,
+            'name': t.name,
+            'content': t.content,
+            'category': t.category,
+            'variables': variables
+        })
     
-    templates_data = [{
-        'id': t.id,
-        'name': t.name,
-        'content': t.content,
-        'category': t.category
-    } for t in templates]
+    response = JsonResponse({
+        'success': True,
+        'templates': templates_data
+    })
+    # El navegador guarda la respuesta pero la revalida siempre con If-None-Match
+    response['Cache-Control'] = 'private, no-cache'
+    return response
+
+
+@login_required
+@require_http_methods(["POST"])
+def api_render_template(request, template_id):
+    """
+    API para personalizar una plantilla para uno o muchos contactos
+
+    Body JSON: contact_ids (lista, máx. TEMPLATE_RENDER_MAX_CONTACTS) o conversation_id
+    """
+    template = get_object_or_404(Template, id=template_id, is_active=True)
+    
+    try:
+        data = json.loads(request.body or '{}')
+    except json.JSONDecodeError:
+        return JsonResponse({'success': False, 'error': 'JSON inválido'}, status=400)
+    
+    if not isinstance(data, dict):
+        return JsonResponse({'success': False, 'error': 'JSON inválido'}, status=400)
+    
+    if data.get('conversation_id'):
+        try:
+            conversation_id = int(data['conversation_id'])
+        except (TypeError, ValueError):
+            return JsonResponse({'success': False, 'error': 'conversation_id debe ser un número'}, status=400)
+        conversation = get_object_or_404(Conversation, id=conversation_id)
+        contacts = [conversation.contact_id]
+    else:
+        contacts = data.get('contact_ids') or []
+        if not isinstance(contacts, list):
+            return JsonResponse({'success': False, 'error': 'contact_ids debe ser una lista'}, status=400)
+        max_contacts = getattr(settings, 'TEMPLATE_RENDER_MAX_CONTACTS', 5000)
+        if len(contacts) > max_contacts:
+            return JsonResponse({
+                'success': False,
+                'error': f'Máximo {max_contacts} contactos por petición'
+            }, status=400)
+        try:
+            contacts = [int(contact_id) for contact_id in contacts]
+        except (TypeError, ValueError):
+            return JsonResponse({'success': False, 'error': 'contact_ids debe contener números'}, status=400)
+    
+    try:
+        if not contacts:
+            rendered = [{'contact_id': None, 'text': render_template(template, agent=request.user)}]
+        else:
+            rendered = [
+                {'contact_id': contact_id, 'text': text}
+                for contact_id, text in render_bulk(template, contacts, agent=request.user)
+            ]
+    except TemplateRenderError as e:
+        return JsonResponse({'success': False, 'error': str(e)}, status=400)
     
     return JsonResponse({
         'success': True,
-        'templates': templates_data
+        'template_id': template.id,
+        'rendered': rendered
     })
 
 
@@ -1242,6 +1315,17 @@ def api_send_whatsapp_message(request):
             except Conversation.DoesNotExist:
                 pass
         
+        if conversation:
+            # Outbox: se guarda en cola y se responde sin esperar al bridge
+            queued = enqueue_message(conversation, message, sender_user=request.user)
+            ActivityLog.objects.create(
+                user=request.user,
+                conversation=conversation,
+                action='send_whatsapp_message',
+                description=f'Mensaje en cola para {to_number}'
+            )
+            return JsonResponse({'success': True, 'queued': True, 'message': serialize_outbox_message(queued)})
+        
         from .services.whatsapp_service import WhatsAppService
         service = WhatsAppService()
         result = service.send_message(to_number, message, conversation)
@@ -1265,6 +1349,79 @@ def api_send_whatsapp_message(request):
         }, status=500)
 
 
+@login_required
+@require_http_methods(["POST"])
+def api_retry_message(request, message_id):
+    """API para reintentar el envío de un mensaje fallido del outbox"""
+    message = get_object_or_404(Message.objects.select_related('conversation'), id=message_id, sender_type='agent')
+    
+    # Solo el autor del mensaje, el agente de la conversación o un administrador
+    user = request.user
+    if not (user.role == 'admin' or user.is_superuser
+            or user.id in (message.sender_user_id, message.conversation.assigned_to_id)):
+        return JsonResponse({'success': False, 'error': 'No tienes permiso para reintentar este mensaje'}, status=403)
+    
+    if not retry_message(message):
+        return JsonResponse({
+            'success': False,
+            'error': f'Solo se pueden reintentar mensajes fallidos (estado actual: {message.delivery_status})'
+        }, status=400)
+    
+    ActivityLog.objects.create(
+        user=request.user,
+        conversation=message.conversation,
+        action='retry_message',
+        description=f'Reintento de envío del mensaje {message.id}'
+    )
+    
+    return JsonResponse({'success': True, 'message': serialize_outbox_message(message)})
+
+
+@login_required
+@require_http_methods(["GET"])
+def api_telegram_media(request, file_id):
+    """
+    Archivo de un mensaje de Telegram (resolución diferida del file_id)
+
+    La URL de descarga se obtiene de la caché o con getFile al primer acceso.
+    Con TELEGRAM_MEDIA_PROXY el archivo se transmite por Django para no exponer
+    el token del bot; si no, se redirige a Telegram. Como en /media/, solo
+    quien ve en el chat una conversación con ese archivo.
+    """
+    if not can_view_message_media(request.user, media_file_id=file_id):
+        return JsonResponse({'success': False, 'error': 'Archivo no encontrado'}, status=404)
+    
+    file_url = resolve_file_url(file_id)
+    if not file_url:
+        return JsonResponse({'success': False, 'error': 'No se pudo obtener el archivo de Telegram'}, status=502)
+    
+    if not getattr(settings, 'TELEGRAM_MEDIA_PROXY', True):
+        return redirect(file_url)
+    
+    try:
+        upstream = get_api_client('telegram').get(file_url, stream=True, timeout=30)
+    except Exception as e:
+        return JsonResponse({'success': False, 'error': str(e)}, status=502)
+    if upstream.status_code != 200:
+        upstream.close()
+        # La URL pudo caducar antes de tiempo: se resolverá de nuevo en la siguiente petición
+        cache.delete(FILE_URL_KEY.format(file_id))
+        return JsonResponse({'success': False, 'error': 'No se pudo obtener el archivo de Telegram'}, status=502)
+    
+    def stream():
+        try:
+            yield from upstream.iter_content(chunk_size=64 * 1024)
+        finally:
+            upstream.close()
+    
+    response = StreamingHttpResponse(stream(), content_type=upstream.headers.get('Content-Type', 'application/octet-stream'))
+    if upstream.headers.get('Content-Length'):
+        response['Content-Length'] = upstream.headers['Content-Length']
+    # El contenido de un file_id no cambia
+    response['Cache-Control'] = 'private, max-age=86400'
+    return response
+
+
 # Webhooks para recibir notificaciones del bridge de Baileys
 @csrf_exempt
 @require_http_methods(["POST"])
@@ -1294,18 +1451,17 @@ def api_whatsapp_connected(request):
 @login_required
 def api_whatsapp_status(request):
     """API para obtener el estado de WhatsApp"""
-    from .services.whatsapp_service import WhatsAppService
-    
-    service = WhatsAppService()
-    
     try:
-        is_configured = service.is_configured()
-        is_connected = service.is_connected() if is_configured else False
+        # Lectura desde la caché: nunca espera al bridge
+        status = get_bridge_status()
         
         return JsonResponse({
             'success': True,
-            'configured': is_configured,
-            'connected': is_connected
+            'configured': bool(status['reachable']),
+            'connected': status['connected'],
+            'qr_available': status['qr_available'],
+            'updated_at': status['updated_at'],
+            'stale': status['stale']
         })
     except Exception as e:
         return JsonResponse({
@@ -1340,13 +1496,28 @@ def api_whatsapp_restart(request):
     return JsonResponse(result)
 
 
+def _valid_bridge_callback(request):
+    """True si el callback trae el secreto compartido con el bridge (WHATSAPP_BRIDGE_CALLBACK_SECRET)"""
+    secret = getattr(settings, 'WHATSAPP_BRIDGE_CALLBACK_SECRET', '')
+    received = request.headers.get('X-Bridge-Secret', '')
+    return bool(secret) and hmac.compare_digest(received.encode(), secret.encode())
+
+
 @csrf_exempt
 @require_http_methods(["POST"])
 def api_whatsapp_connected(request):
     """Webhook para notificar que WhatsApp se conectó"""
+    if not _valid_bridge_callback(request):
+        return JsonResponse({'status': 'error', 'message': 'No autorizado'}, status=403)
     try:
         data = json.loads(request.body.decode('utf-8'))
         
+        # Estado empujado por el bridge a la caché compartida
+        connected = data.get('status', 'connected') == 'connected'
+        set_bridge_status(connected, source='callback')
+        if not connected:
+            return JsonResponse({'status': 'success'})
+        
         # Log de conexión
         ActivityLog.objects.create(
             action='whatsapp_connected',
@@ -1362,9 +1533,14 @@ def api_whatsapp_connected(request):
 @require_http_methods(["POST"])
 def api_whatsapp_qr_updated(request):
     """Webhook para notificar actualización de QR"""
+    if not _valid_bridge_callback(request):
+        return JsonResponse({'status': 'error', 'message': 'No autorizado'}, status=403)
     try:
         data = json.loads(request.body.decode('utf-8'))
         
+        # Nuevo QR: el bridge está activo pero sin sesión (el QR se pide al bridge al mostrarlo)
+        set_bridge_status(False, qr_available=True, source='callback')
+        
         # Log de QR actualizado
         ActivityLog.objects.create(
             action='whatsapp_qr_updated',
@@ -1727,15 +1903,25 @@ def api_search_unassigned(request):
         }, status=400)
 
 
+@csrf_exempt
 @login_required
 @require_http_methods(["POST"])
 def api_send_file_message(request):
     """API para enviar mensajes con archivos multimedia"""
+    # El handler se instala antes de leer el cuerpo; el CSRF se comprueba después
+    if body_too_large(request):
+        return JsonResponse({'success': False, 'error': _upload_too_large_error()}, status=413)
+    request.upload_handlers = [MediaStoreUploadHandler(request)]
+    return _send_file_message(request)
+
+
+def _upload_too_large_error():
+    return f'El archivo es demasiado grande (máximo {max_upload_size() // (1024 * 1024)}MB)'
+
+
+@csrf_protect
+def _send_file_message(request):
     try:
-        import os
-        from django.core.files.storage import default_storage
-        from django.conf import settings
-        
         print("📁 Upload request received")
         print(f"📋 POST data: {dict(request.POST)}")
         print(f"📎 FILES data: {list(request.FILES.keys())}")
@@ -1748,6 +1934,8 @@ def api_send_file_message(request):
         uploaded_file = request.FILES.get('file')
         
         if not uploaded_file:
+            if request.upload_handlers[0].too_large:
+                return JsonResponse({'success': False, 'error': _upload_too_large_error()}, status=413)
             return JsonResponse({'success': False, 'error': 'No se recibió archivo'})
         
         if not conversation_id:
@@ -1755,11 +1943,6 @@ def api_send_file_message(request):
             
         conversation = get_object_or_404(Conversation, id=conversation_id)
         
-        # Validar tamaño del archivo (máximo 50MB)
-        max_size = 50 * 1024 * 1024  # 50MB
-        if uploaded_file.size > max_size:
-            return JsonResponse({'success': False, 'error': 'El archivo es demasiado grande (máximo 50MB)'})
-        
         # Validar tipo de archivo
         allowed_types = {
             'image': ['jpg', 'jpeg', 'png', 'gif', 'webp'],
@@ -1772,17 +1955,9 @@ def api_send_file_message(request):
         if file_type not in allowed_types or file_extension not in allowed_types[file_type]:
             return JsonResponse({'success': False, 'error': f'Tipo de archivo no permitido: {file_extension}'})
         
-        # Generar nombre único para el archivo
-        from datetime import datetime
-        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-        unique_filename = f"{file_type}_{timestamp}_{uploaded_file.name}"
-        
-        # Guardar archivo en la carpeta media
-        file_path = f"attachments/{unique_filename}"
-        saved_path = default_storage.save(file_path, uploaded_file)
-        
-        # Crear URL del archivo
-        file_url = f"{settings.MEDIA_URL}{saved_path}"
+        # Almacén por contenido: un archivo ya subido antes no se vuelve a escribir
+        blob, created = store_file(uploaded_file)
+        file_url = blob.url
         
         # Determinar el tipo de mensaje basado en el archivo
         message_type_map = {
@@ -1794,142 +1969,26 @@ def api_send_file_message(request):
         
         message_type = message_type_map.get(file_type, 'text')
         
-        # **ENVIAR ARCHIVO A TRAVÉS DEL WHATSAPP BRIDGE** 
-        from .services.whatsapp_service import WhatsAppService
+        # Outbox: el archivo se envía en segundo plano, el agente no espera al bridge
+        content = message_text or f"{file_type.title()} enviado: {uploaded_file.name}"
+        message = enqueue_message(conversation, content, sender_user=request.user,
+                                  message_type=message_type, media_url=file_url)
         
-        # Obtener el número de teléfono del contacto
-        contact_phone = conversation.contact.phone
-        if not contact_phone:
-            return JsonResponse({'success': False, 'error': 'No se encontró número de teléfono del contacto'})
-        
-        # Crear URL completa del archivo para el bridge
-        # Como accedemos desde red local, usar la IP configurada
-        base_url = "http://192.168.1.176:8000"
-        full_media_url = f"{base_url}{file_url}"
-        
-        # Enviar a través del WhatsApp Bridge usando endpoint directo
-        import requests
-        bridge_url = "http://localhost:3000"
-        
-        payload = {
-            'to': contact_phone,
-            'type': file_type,  # image, video, audio, document
-            'media_url': full_media_url,
-            'message': message_text or f"{file_type.title()} enviado: {uploaded_file.name}",
-            'filename': uploaded_file.name
-        }
-        
-        print(f"📤 Enviando archivo a WhatsApp Bridge:")
-        print(f"   📱 Destino: {contact_phone}")
-        print(f"   📎 Tipo: {file_type}")
-        print(f"   🔗 URL: {full_media_url}")
-        print(f"   📝 Mensaje: {payload['message']}")
+        ActivityLog.objects.create(
+            user=request.user,
+            conversation=conversation,
+            action='send_file',
+            description=f'Archivo en cola para envío: {uploaded_file.name} ({file_type})'
+        )
         
-        try:
-            # Enviar a WhatsApp Bridge
-            response = requests.post(f"{bridge_url}/send-message", json=payload, timeout=30)
-            response_data = response.json()
-            
-            print(f"📡 Respuesta del Bridge: {response.status_code} - {response_data}")
-            
-            if response.status_code == 200 and response_data.get('success'):
-                # Éxito: Guardar mensaje en BD con ID del bridge
-                import uuid
-                platform_message_id = response_data.get('message_id', f"agent_{timestamp}_{str(uuid.uuid4())[:8]}")
-                
-                # Crear mensaje en la base de datos
-                message = Message.objects.create(
-                    conversation=conversation,
-                    platform_message_id=platform_message_id,
-                    sender_type='agent',
-                    sender_user=request.user,
-                    content=message_text or f"{file_type.title()} enviado: {uploaded_file.name}",
-                    message_type=message_type,
-                    media_url=file_url
-                )
-                
-                # Actualizar conversación
-                conversation.last_message_at = timezone.now()
-                conversation.last_response_at = timezone.now()
-                conversation.is_answered = True
-                conversation.needs_response = False
-                conversation.save()
-                
-                # Log de actividad
-                ActivityLog.objects.create(
-                    user=request.user,
-                    conversation=conversation,
-                    action='send_file',
-                    description=f'Archivo enviado a WhatsApp: {uploaded_file.name} ({file_type})'
-                )
-                
-                return JsonResponse({
-                    'success': True,
-                    'message': 'Archivo enviado exitosamente a WhatsApp',
-                    'file_url': file_url,
-                    'message_id': message.id,
-                    'whatsapp_message_id': platform_message_id
-                })
-            else:
-                # Error del Bridge: guardar solo localmente como fallback
-                error_msg = response_data.get('error', 'Error desconocido del bridge')
-                print(f"❌ Error del WhatsApp Bridge: {error_msg}")
-                
-                # Generar platform_message_id local
-                import uuid
-                platform_message_id = f"agent_{timestamp}_{str(uuid.uuid4())[:8]}"
-                
-                # Crear mensaje en la base de datos (solo local)
-                message = Message.objects.create(
-                    conversation=conversation,
-                    platform_message_id=platform_message_id,
-                    sender_type='agent',
-                    sender_user=request.user,
-                    content=f"⚠️ {message_text or f'{file_type.title()} enviado: {uploaded_file.name}'} (Solo guardado localmente - Error WhatsApp: {error_msg})",
-                    message_type=message_type,
-                    media_url=file_url
-                )
-                
-                # Actualizar conversación parcialmente
-                conversation.last_message_at = timezone.now()
-                conversation.save()
-                
-                return JsonResponse({
-                    'success': False,
-                    'error': f'Error al enviar a WhatsApp: {error_msg}. Archivo guardado solo localmente.',
-                    'file_url': file_url,
-                    'message_id': message.id
-                })
-                
-        except requests.RequestException as e:
-            # Error de conexión: guardar solo localmente
-            print(f"❌ Error de conexión con WhatsApp Bridge: {str(e)}")
-            
-            # Generar platform_message_id local
-            import uuid
-            platform_message_id = f"agent_{timestamp}_{str(uuid.uuid4())[:8]}"
-            
-            # Crear mensaje en la base de datos (solo local)
-            message = Message.objects.create(
-                conversation=conversation,
-                platform_message_id=platform_message_id,
-                sender_type='agent',
-                sender_user=request.user,
-                content=f"⚠️ {message_text or f'{file_type.title()} enviado: {uploaded_file.name}'} (Solo guardado localmente - Bridge no disponible)",
-                message_type=message_type,
-                media_url=file_url
-            )
-            
-            # Actualizar conversación parcialmente
-            conversation.last_message_at = timezone.now()
-            conversation.save()
-            
-            return JsonResponse({
-                'success': False,
-                'error': f'WhatsApp Bridge no disponible: {str(e)}. Archivo guardado solo localmente.',
-                'file_url': file_url,
-                'message_id': message.id
-            })
+        return JsonResponse({
+            'success': True,
+            'queued': True,
+            'message': serialize_outbox_message(message),
+            'file_url': file_url,
+            'deduplicated': not created,
+            'message_id': message.id
+        })
         
     except Exception as e:
         return JsonResponse({
@@ -2099,7 +2158,15 @@ def conversation_count_view(request):
 def upload_media_view(request):
     """Endpoint para subir archivos multimedia desde WhatsApp Bridge"""
     try:
+        # Tamaño, hash y tipo se comprueban mientras llega el archivo (MediaStoreUploadHandler)
+        if body_too_large(request):
+            return JsonResponse({'success': False, 'error': _upload_too_large_error()}, status=413)
+        handler = MediaStoreUploadHandler(request)
+        request.upload_handlers = [handler]
+        
         if 'media_file' not in request.FILES:
+            if handler.too_large:
+                return JsonResponse({'success': False, 'error': _upload_too_large_error()}, status=413)
             return JsonResponse({
                 'success': False,
                 'error': 'No se proporcionó archivo multimedia'
@@ -2107,29 +2174,14 @@ def upload_media_view(request):
         
         uploaded_file = request.FILES['media_file']
         
-        # Validar tamaño del archivo (máximo 50MB)
-        if uploaded_file.size > 50 * 1024 * 1024:
-            return JsonResponse({
-                'success': False,
-                'error': 'El archivo es demasiado grande (máximo 50MB)'
-            }, status=400)
-        
-        # Generar nombre único para el archivo
-        from datetime import datetime
-        from django.core.files.storage import default_storage
         from django.conf import settings
         import os
         
-        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-        file_extension = os.path.splitext(uploaded_file.name)[1]
-        unique_filename = f"whatsapp_{timestamp}_{uploaded_file.name}"
-        
-        # Guardar archivo en la carpeta media
-        file_path = f"attachments/{unique_filename}"
-        saved_path = default_storage.save(file_path, uploaded_file)
+        # Almacén por contenido: un archivo ya recibido antes no se vuelve a escribir
+        blob, created = store_file(uploaded_file)
         
         # Crear URL completa del archivo
-        media_url = f"{settings.MEDIA_URL}{saved_path}"
+        media_url = blob.url
         if hasattr(settings, 'MEDIA_DOMAIN') and settings.MEDIA_DOMAIN:
             media_url = f"{settings.MEDIA_DOMAIN}{media_url}"
         elif request.get_host():
@@ -2140,8 +2192,10 @@ def upload_media_view(request):
             'success': True,
             'message': 'Archivo subido exitosamente',
             'media_url': media_url,
-            'filename': unique_filename,
-            'size': uploaded_file.size
+            'filename': os.path.basename(blob.path),
+            'size': blob.size,
+            'sha256': blob.sha256,
+            'deduplicated': not created
         })
         
     except Exception as e:
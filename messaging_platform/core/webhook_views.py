@@ -6,6 +6,7 @@ from .services.whatsapp_service import WhatsAppService
 from .services.facebook_service import FacebookService
 from .services.telegram_service import TelegramService
 from .services import ContactClassificationService
+from .services.outbox_service import enqueue_message
 
 
 @csrf_exempt
@@ -137,6 +138,16 @@ def send_message_api(request):
             except Conversation.DoesNotExist:
                 pass
         
+        # Con conversación: outbox (se responde sin esperar a la plataforma)
+        if conversation:
+            message_obj = enqueue_message(conversation, message)
+            return JsonResponse({
+                'success': True,
+                'queued': True,
+                'message_id': message_obj.id,
+                'delivery_status': message_obj.delivery_status
+            })
+        
         # Enviar según la plataforma
         if platform == 'whatsapp':
             service = WhatsAppService()
@@ -25,9 +25,15 @@ const recentMessagesCache = new Map();
 // URL del Django backend
 const DJANGO_BASE_URL = 'http://localhost:8000';
 
+// Secreto compartido con Django para los callbacks de estado (WHATSAPP_BRIDGE_CALLBACK_SECRET)
+const BRIDGE_CALLBACK_SECRET = process.env.BRIDGE_CALLBACK_SECRET || '';
+
 // Directorio para archivos multimedia temporales
 const MEDIA_DIR = path.join(__dirname, 'media');
 
+// MEDIA_ROOT de Django visto desde el bridge (modo de hand-off 'path')
+const SHARED_MEDIA_ROOT = process.env.SHARED_MEDIA_ROOT || '';
+
 // Asegurar que exista el directorio de media
 fs.ensureDirSync(MEDIA_DIR);
 
@@ -352,6 +358,18 @@ async function processMediaMessage(message) {
 /**
  * Inicializar conexión de WhatsApp
  */
+// Notificar a Django cambios de estado (se guardan en su caché compartida)
+async function notifyDjangoStatus(endpoint, data) {
+    try {
+        await axios.post(`${DJANGO_BASE_URL}${endpoint}`, {
+            ...data,
+            timestamp: new Date().toISOString()
+        }, { timeout: 5000, headers: { 'X-Bridge-Secret': BRIDGE_CALLBACK_SECRET } });
+    } catch (error) {
+        console.error(`⚠️ No se pudo notificar ${endpoint} a Django:`, error.message);
+    }
+}
+
 async function initializeWhatsApp() {
     try {
         // Usar autenticación multi-archivo
@@ -370,11 +388,14 @@ async function initializeWhatsApp() {
                 console.log('📱 Código QR generado');
                 qrCodeData = qr;
                 qrcode.generate(qr, { small: true });
+                // Solo el aviso: Django pide el QR a /qr cuando un administrador lo muestra
+                notifyDjangoStatus('/api/whatsapp/qr-updated/', {});
             }
             
             if (connection === 'close') {
                 isConnected = false;
                 console.log('❌ Conexión perdida');
+                notifyDjangoStatus('/api/whatsapp/connected/', { status: 'disconnected' });
                 
                 const shouldReconnect = (lastDisconnect?.error)?.output?.statusCode !== DisconnectReason.loggedOut;
                 
@@ -386,6 +407,7 @@ async function initializeWhatsApp() {
                 isConnected = true;
                 qrCodeData = null;
                 console.log('✅ WhatsApp conectado exitosamente!');
+                notifyDjangoStatus('/api/whatsapp/connected/', { status: 'connected' });
             }
         });
 
@@ -679,9 +701,60 @@ app.get('/qr', (req, res) => {
     }
 });
 
+// Normalizar número para envío a JID (CON SOPORTE INTERNACIONAL)
+function toTargetJid(to) {
+    if (to.includes('@')) {
+        return to;
+    }
+    
+    // Convertir número formateado a JID - ahora con soporte internacional
+    const cleanNumber = to.replace(/\D/g, '');
+    
+    // Validar longitud mínima y máxima para números internacionales
+    if (cleanNumber.length >= 10 && cleanNumber.length <= 15) {
+        // Verificar si es un código de país reconocido
+        const countryCode = detectCountryCode(cleanNumber);
+        const targetJid = `${cleanNumber}@s.whatsapp.net`;
+        if (countryCode && INTERNATIONAL_COUNTRIES[countryCode]) {
+            console.log(`✅ Número ${INTERNATIONAL_COUNTRIES[countryCode].name} válido para envío: ${targetJid}`);
+        } else {
+            // Fallback para números no reconocidos pero con longitud válida
+            console.log(`⚠️ Número internacional no reconocido, enviando de todos modos: ${targetJid}`);
+        }
+        return targetJid;
+    }
+    throw new Error('Número no válido para envío: longitud incorrecta');
+}
+
+// Contenido de Baileys para un archivo: media es { url } (ruta local o http) o { stream }
+function buildMediaContent(type, media, message, filename) {
+    if (type === 'image') {
+        return { image: media, caption: message, fileName: filename || 'image.jpg' };
+    } else if (type === 'video') {
+        return { video: media, caption: message, fileName: filename || 'video.mp4' };
+    } else if (type === 'audio') {
+        return { audio: media, fileName: filename || 'audio.mp3' };
+    } else if (type === 'document') {
+        return { document: media, fileName: filename || 'document.pdf', caption: message };
+    }
+    throw new Error(`Tipo de multimedia no soportado: ${type}`);
+}
+
+// Solo se aceptan rutas dentro del directorio compartido con Django
+function resolveSharedMediaPath(mediaPath) {
+    if (!SHARED_MEDIA_ROOT) {
+        throw new Error('SHARED_MEDIA_ROOT no está configurado en el bridge');
+    }
+    const resolved = path.resolve(SHARED_MEDIA_ROOT, mediaPath);
+    if (!resolved.startsWith(path.resolve(SHARED_MEDIA_ROOT) + path.sep)) {
+        throw new Error('Ruta de archivo fuera del directorio compartido');
+    }
+    return resolved;
+}
+
 app.post('/send-message', async (req, res) => {
     try {
-        const { to, message = '', type = 'text', media_url, filename } = req.body;
+        const { to, message = '', type = 'text', media_url, media_path, filename } = req.body;
         
         if (!to) {
             return res.status(400).json({
@@ -705,32 +778,9 @@ app.post('/send-message', async (req, res) => {
             });
         }
         
-        // Normalizar número para envío (CON SOPORTE INTERNACIONAL)
-        let targetJid;
-        if (to.includes('@')) {
-            targetJid = to;
-        } else {
-            // Convertir número formateado a JID - ahora con soporte internacional
-            const cleanNumber = to.replace(/\D/g, '');
-            
-            // Validar longitud mínima y máxima para números internacionales
-            if (cleanNumber.length >= 10 && cleanNumber.length <= 15) {
-                // Verificar si es un código de país reconocido
-                const countryCode = detectCountryCode(cleanNumber);
-                if (countryCode && INTERNATIONAL_COUNTRIES[countryCode]) {
-                    targetJid = `${cleanNumber}@s.whatsapp.net`;
-                    console.log(`✅ Número ${INTERNATIONAL_COUNTRIES[countryCode].name} válido para envío: ${targetJid}`);
-                } else {
-                    // Fallback para números no reconocidos pero con longitud válida
-                    targetJid = `${cleanNumber}@s.whatsapp.net`;
-                    console.log(`⚠️ Número internacional no reconocido, enviando de todos modos: ${targetJid}`);
-                }
-            } else {
-                throw new Error('Número no válido para envío: longitud incorrecta');
-            }
-        }
+        const targetJid = toTargetJid(to);
         
-        console.log("📤 Enviando mensaje:", { to: targetJid, message, type, media_url });
+        console.log("📤 Enviando mensaje:", { to: targetJid, message, type, media_url, media_path });
         
         let sentMessage;
         
@@ -738,57 +788,27 @@ app.post('/send-message', async (req, res) => {
         if (type === 'text') {
             // Mensaje de texto simple
             sentMessage = await sock.sendMessage(targetJid, { text: message });
-        } else if (media_url) {
-            // Mensaje multimedia
-            console.log(`📎 Enviando ${type} desde URL: ${media_url}`);
+        } else if (media_path || media_url) {
+            // Mensaje multimedia: Baileys lee el archivo o la URL en streaming (sin cargarlo entero en memoria)
+            let source;
+            if (media_path) {
+                source = resolveSharedMediaPath(media_path);
+                console.log(`📎 Enviando ${type} desde almacenamiento compartido: ${source}`);
+            } else {
+                source = media_url;
+                console.log(`📎 Enviando ${type} desde URL: ${media_url}`);
+            }
             
             try {
-                // Descargar el archivo desde la URL
-                const axios = require('axios');
-                console.log(`🌐 Descargando archivo desde: ${media_url}`);
-                const response = await axios.get(media_url, { responseType: 'arraybuffer' });
-                const mediaBuffer = Buffer.from(response.data);
-                console.log(`📦 Archivo descargado, tamaño: ${mediaBuffer.length} bytes`);
-                
-                // Preparar mensaje multimedia según el tipo
-                let messageContent;
-                
-                if (type === 'image') {
-                    messageContent = {
-                        image: mediaBuffer,
-                        caption: message,
-                        fileName: filename || 'image.jpg'
-                    };
-                } else if (type === 'video') {
-                    messageContent = {
-                        video: mediaBuffer,
-                        caption: message,
-                        fileName: filename || 'video.mp4'
-                    };
-                } else if (type === 'audio') {
-                    messageContent = {
-                        audio: mediaBuffer,
-                        fileName: filename || 'audio.mp3'
-                    };
-                } else if (type === 'document') {
-                    messageContent = {
-                        document: mediaBuffer,
-                        fileName: filename || 'document.pdf',
-                        caption: message
-                    };
-                } else {
-                    throw new Error(`Tipo de multimedia no soportado: ${type}`);
-                }
-                
+                const messageContent = buildMediaContent(type, { url: source }, message, filename);
                 console.log(`📤 Enviando ${type} a ${targetJid}`);
                 sentMessage = await sock.sendMessage(targetJid, messageContent);
-                
             } catch (mediaError) {
                 console.error(`❌ Error procesando multimedia:`, mediaError);
                 throw new Error(`Error procesando archivo multimedia: ${mediaError.message}`);
             }
         } else {
-            throw new Error('Para mensajes multimedia se requiere media_url');
+            throw new Error('Para mensajes multimedia se requiere media_url o media_path');
         }
         
         console.log(`✅ Mensaje ${type} enviado exitosamente:`, sentMessage.key.id);
@@ -809,6 +829,53 @@ app.post('/send-message', async (req, res) => {
     }
 });
 
+// Envío de archivo en streaming: el cuerpo de la petición es el archivo y se
+// pasa a Baileys por chunks, sin escribirlo ni cargarlo entero en memoria
+app.post('/send-media-stream', async (req, res) => {
+    try {
+        const { to, message = '', type, filename } = req.query;
+        
+        if (!to || !type) {
+            req.resume();
+            return res.status(400).json({
+                success: false,
+                error: 'Faltan parámetros: to, type'
+            });
+        }
+        
+        if (!isConnected || !sock) {
+            req.resume();
+            return res.status(500).json({
+                success: false,
+                error: 'WhatsApp no está conectado'
+            });
+        }
+        
+        const targetJid = toTargetJid(to);
+        console.log(`📤 Enviando ${type} en streaming a ${targetJid} (${req.headers['content-length'] || '?'} bytes)`);
+        
+        const sentMessage = await sock.sendMessage(
+            targetJid, buildMediaContent(type, { stream: req }, message, filename)
+        );
+        
+        console.log(`✅ Mensaje ${type} enviado exitosamente:`, sentMessage.key.id);
+        
+        res.json({
+            success: true,
+            message_id: sentMessage.key.id,
+            target: targetJid,
+            type: type
+        });
+    } catch (error) {
+        console.error('❌ Error enviando archivo en streaming:', error);
+        req.resume();
+        res.status(500).json({
+            success: false,
+            error: error.message
+        });
+    }
+});
+
 app.post('/restart', async (req, res) => {
     try {
         if (sock) {